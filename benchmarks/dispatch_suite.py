@@ -0,0 +1,286 @@
+'''
+Measures the sample dispatch path of tobiiresearch end to end:
+
+    tobii_pro.__subscription_callback -> TobiiProCallback.__call__ -> EyeTracker.__subscription_callback
+        -> GazeData(...) / EyeImageData(...) / ExternalSignalData(...) -> user callbacks
+
+The chain is driven through the simulated backend with synthetic payloads shaped like the native gaze, eye image and
+external signal dictionaries. For every stream, delivery mode and number of subscribers (1, 2 and 8) it reports:
+
+    samples_per_second      throughput of the whole chain
+    ns_per_sample           total and per stage; stages are timed on their own and the tobii_pro and EyeTracker
+                            layers are what remains when the inner stages are subtracted. simulator_emit is the cost
+                            of the simulated backend's emit delivering to a no-op callback, which the native module
+                            does not have; it is taken out of the tobii_pro layer
+    objects_per_sample      container objects created per sample that stay alive while a callback keeps the data,
+                            counted with the garbage collector
+    latency_us              distribution of single sample dispatch times with the garbage collector enabled
+    gc_pauses_us            distribution of garbage collector pauses; automatic collection is switched off and the
+                            collections it would have run at the generation thresholds are run and timed explicitly,
+                            so this works on every Python version
+    contention              throughput while another thread subscribes and unsubscribes a callback every
+                            millisecond, and the slowdown relative to the undisturbed run
+
+The results are written as JSON, to stdout or to the given file, so runs of different versions can be compared.
+
+Usage: python benchmarks/dispatch_suite.py [samples] [output.json]
+'''
+
+import gc
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import timeit
+
+os.environ["TOBII_RESEARCH_BACKEND"] = "simulated"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from tobiiresearch.interop import tobii_pro_simulated  # noqa: E402
+from tobiiresearch.implementation import EyeTracker as eyetracker_module  # noqa: E402
+from tobiiresearch.implementation.EyeTracker import EyeTracker  # noqa: E402
+
+from gaze_data import gaze_dictionary  # noqa: E402
+
+SUBSCRIBER_COUNTS = (1, 2, 8)
+BATCH_SIZE = 60
+
+
+def eye_image_dictionary(index):
+    '''Returns a dictionary shaped like the one the native module delivers for eye images.'''
+    return {"device_time_stamp": index,
+            "system_time_stamp": index,
+            "camera_id": index % 2,
+            "image_type": "eye_image_type_cropped",
+            # cropped images are a few kilobytes of GIF data
+            "image_data": b"G" * 4096}
+
+
+def external_signal_dictionary(index):
+    '''Returns a dictionary shaped like the one the native module delivers for external signals.'''
+    return {"value": index % 2,
+            "change_type": "external_signal_change_type_value_changed",
+            "device_time_stamp": index,
+            "system_time_stamp": index}
+
+
+STREAMS = (("gaze", eyetracker_module.EYETRACKER_GAZE_DATA, gaze_dictionary),
+           ("eye_image", eyetracker_module.EYETRACKER_EYE_IMAGES, eye_image_dictionary),
+           ("external_signal", eyetracker_module.EYETRACKER_EXTERNAL_SIGNAL, external_signal_dictionary))
+
+# (name, as_dictionary, batch_size)
+MODES = (("object", False, None),
+         ("dictionary", True, None),
+         ("batched", False, BATCH_SIZE))
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+    return {"count": len(values), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "p999": at(0.999),
+            "max": values[-1]}
+
+
+def _best_ns(function, samples, repeat=5):
+    return min(timeit.Timer(function).repeat(repeat, samples)) / samples * 1e9
+
+
+class _Case(object):
+    '''One stream, delivery mode and number of subscribers on a fresh simulated eye tracker.'''
+
+    def __init__(self, stream, mode, subscribers):
+        self.stream_name, self.subscription_type, self.make_payload = stream
+        self.mode_name, self.as_dictionary, self.batch_size = mode
+        self.subscribers = subscribers
+        self.type_index = eyetracker_module._subscription_types[self.subscription_type]["type_index"]
+        self.data_class = eyetracker_module._subscription_types[self.subscription_type]["data_class"]
+        self.address = tobii_pro_simulated.add_device(
+            serial_number="BENCH-{0}-{1}-{2}".format(self.stream_name, self.mode_name, subscribers), streaming=False)
+        self.eyetracker = EyeTracker(self.address)
+        self.kept = None
+        # distinct functions, the EyeTracker keys its subscriptions by callback
+        self.callbacks = [self.__make_callback() for _ in range(subscribers)]
+        for callback in self.callbacks:
+            self.eyetracker.subscribe_to(self.subscription_type, callback, as_dictionary=self.as_dictionary,
+                                         batch_size=self.batch_size)
+        # the external signal subscription delivers an initial value right away
+        self.payload = self.make_payload(0)
+
+    def __make_callback(self):
+        def callback(data):
+            if self.kept is not None:
+                self.kept.append(data)
+        return callback
+
+    def close(self):
+        for callback in self.callbacks:
+            self.eyetracker.unsubscribe_from(self.subscription_type, callback)
+        tobii_pro_simulated.remove_device(self.address)
+
+    def dispatch(self):
+        tobii_pro_simulated.emit(self.type_index, self.address, self.payload)
+
+    def stages(self, samples):
+        total = _best_ns(self.dispatch, samples)
+        result = {"total": total}
+        if self.batch_size is not None:
+            # a batch is built from many samples, per stage numbers would not add up
+            return result
+        eyetracker_dispatch = getattr(self.eyetracker, "_EyeTracker__subscription_callback")
+        payload, subscription_type = self.payload, self.subscription_type
+        eyetracker = _best_ns(lambda: eyetracker_dispatch(subscription_type, payload), samples)
+        if self.as_dictionary:
+            # every dictionary subscriber gets its own copy
+            copies = self.subscribers
+            data_class = _best_ns(lambda: [dict(payload) for _ in range(copies)], samples)
+            data = dict(payload)
+        else:
+            data_class = _best_ns(lambda: self.data_class(payload), samples)
+            data = self.data_class(payload)
+        callbacks = self.callbacks
+        user = _best_ns(lambda: [callback(data) for callback in callbacks], samples)
+        emit = _emit_ns(self.type_index, payload, samples)
+        result.update({"simulator_emit": emit,
+                       "tobii_pro": max(total - eyetracker - emit, 0.0),
+                       "eyetracker": max(eyetracker - data_class - user, 0.0),
+                       "data_class": data_class,
+                       "user_callbacks": user})
+        return result
+
+    def objects_per_sample(self, samples):
+        self.kept = []
+        gc.collect()
+        gc.disable()
+        try:
+            before = len(gc.get_objects())
+            for _ in range(samples):
+                self.dispatch()
+            after = len(gc.get_objects())
+        finally:
+            gc.enable()
+            self.kept = None
+        # the list that kept the data is one object too
+        return (after - before - 1) / float(samples)
+
+    def latencies(self, samples):
+        timer = timeit.default_timer
+        dispatch = self.dispatch
+        latencies = []
+        gc.collect()
+        for _ in range(samples):
+            start = timer()
+            dispatch()
+            latencies.append((timer() - start) * 1e6)
+        return _percentiles(latencies)
+
+    def contention(self, samples, undisturbed):
+        stop = threading.Event()
+        extra = self.__make_callback()
+
+        def churn():
+            while not stop.is_set():
+                self.eyetracker.subscribe_to(self.subscription_type, extra, as_dictionary=self.as_dictionary,
+                                             batch_size=self.batch_size)
+                self.eyetracker.unsubscribe_from(self.subscription_type, extra)
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=churn)
+        thread.start()
+        try:
+            disturbed = _best_ns(self.dispatch, samples, repeat=3)
+        finally:
+            stop.set()
+            thread.join()
+        return {"samples_per_second": 1e9 / disturbed, "ns_per_sample": disturbed,
+                "slowdown": disturbed / undisturbed}
+
+
+def _emit_ns(type_index, payload, samples):
+    '''Times the simulated backend's emit delivering payload to a callback that does nothing.'''
+    address = tobii_pro_simulated.add_device(serial_number="BENCH-EMIT-{0}".format(type_index), streaming=False)
+    try:
+        tobii_pro_simulated.subscribe_to(type_index, address, lambda data: None)
+        return _best_ns(lambda: tobii_pro_simulated.emit(type_index, address, payload), samples)
+    finally:
+        tobii_pro_simulated.remove_device(address)
+
+
+def _gc_pauses(case, samples):
+    # gc.callbacks only exists from Python 3.3 on, so instead of watching the automatic collector its work is done
+    # here: after every sample the generation counts are checked against the thresholds the way the interpreter does,
+    # and the collection it would start is run and timed
+    thresholds = gc.get_threshold()
+    timer = timeit.default_timer
+    pauses = []
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    case.kept = []
+    try:
+        for _ in range(samples):
+            case.dispatch()
+            # keep memory flat while still creating work for the collector
+            if len(case.kept) > 10000:
+                del case.kept[:]
+            counts = gc.get_count()
+            for generation in (2, 1, 0):
+                if thresholds[generation] and counts[generation] > thresholds[generation]:
+                    start = timer()
+                    gc.collect(generation)
+                    pauses.append((timer() - start) * 1e6)
+                    break
+    finally:
+        case.kept = None
+        if enabled:
+            gc.enable()
+    return _percentiles(pauses)
+
+
+def run_case(stream, mode, subscribers, samples):
+    case = _Case(stream, mode, subscribers)
+    try:
+        stages = case.stages(samples)
+        return {"stream": case.stream_name,
+                "mode": case.mode_name,
+                "subscribers": subscribers,
+                "samples_per_second": 1e9 / stages["total"],
+                "ns_per_sample": stages,
+                "objects_per_sample": case.objects_per_sample(max(samples // 10, 1)),
+                "latency_us": case.latencies(samples),
+                "gc_pauses_us": _gc_pauses(case, samples),
+                "contention": case.contention(samples, stages["total"])}
+    finally:
+        case.close()
+
+
+def main(samples=20000, output=None):
+    results = []
+    for stream in STREAMS:
+        for mode in MODES:
+            for subscribers in SUBSCRIBER_COUNTS:
+                result = run_case(stream, mode, subscribers, samples)
+                results.append(result)
+                sys.stderr.write("{0:<16} {1:<11} {2:>2} subscribers {3:>12.0f} samples/s\n".format(
+                    result["stream"], result["mode"], subscribers, result["samples_per_second"]))
+    report = {"python": platform.python_version(),
+              "implementation": platform.python_implementation(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "samples": samples,
+              "results": results}
+    if output is None:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, sys.argv[2] if len(sys.argv) > 2 else None)
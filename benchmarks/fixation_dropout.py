@@ -0,0 +1,80 @@
+'''
+Checks that the online fixation detector does not mistake single eye dropouts for saccades.
+
+The simulated eye tracker produces a stream without saccades and blinks, once with binocular data only and once with
+single eye dropouts. The participant keeps looking at the same spot, so every fixation end the detector reports is
+spurious, and the fixations should last as long with dropouts as without. For each stream it reports:
+
+    fixation_ends           number of fixation ends
+    mean_fixation_ms        mean duration of the ended fixations
+    peak_velocity           highest velocity in deg/s, binocular and single eye samples separately
+    median_velocity         median velocity in deg/s, binocular and single eye samples separately
+
+Exits with status 1 if the dropouts cause spurious fixation ends.
+
+Usage: python benchmarks/fixation_dropout.py [samples] [seed]
+'''
+
+import json
+import os
+import sys
+
+os.environ["TOBII_RESEARCH_BACKEND"] = "simulated"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from tobiiresearch.interop import tobii_pro_simulated  # noqa: E402
+from fixationdetector import FixationDetector, FIXATION_END  # noqa: E402
+
+FREQUENCY = 600.0
+DROPOUTS = (0.0, 0.01, 0.05)
+
+
+def _median(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run(samples, seed, dropout):
+    address = tobii_pro_simulated.add_device(streaming=False, seed=seed, gaze_output_frequency=FREQUENCY,
+                                             saccade_rate=0.0, blink_rate=0.0, dropout=dropout)
+    detector = FixationDetector()
+    velocities = {2: [], 1: []}
+
+    def on_gaze(data):
+        detector.onGazeData(data)
+        eyes = data["left_gaze_point_validity"] + data["right_gaze_point_validity"]
+        if eyes and detector.velocity is not None:
+            velocities[eyes].append(detector.velocity)
+
+    try:
+        tobii_pro_simulated.subscribe_to(tobii_pro_simulated._gaze_data, address, on_gaze)
+        tobii_pro_simulated.generate(address, samples)
+    finally:
+        tobii_pro_simulated.remove_device(address)
+
+    ends = [event for event in detector.getEvents() if event.kind == FIXATION_END]
+    return {"dropout": dropout,
+            "fixation_ends": len(ends),
+            "mean_fixation_ms": sum(event.duration for event in ends) / len(ends) if ends else None,
+            "peak_velocity": {"binocular": max(velocities[2]) if velocities[2] else None,
+                              "single_eye": max(velocities[1]) if velocities[1] else None},
+            "median_velocity": {"binocular": _median(velocities[2]),
+                                "single_eye": _median(velocities[1])}}
+
+
+def main(samples=3000, seed=3):
+    results = [run(samples, seed, dropout) for dropout in DROPOUTS]
+    for result in results:
+        print(json.dumps(result, sort_keys=True))
+    baseline = results[0]["fixation_ends"]
+    failed = [result for result in results[1:] if result["fixation_ends"] > baseline]
+    if failed:
+        print("Single eye dropouts caused spurious fixation ends.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:]]))
@@ -0,0 +1,85 @@
+'''
+Measures the construction cost of GazeData objects.
+
+For each access pattern the time per sample and the number of objects allocated per sample are reported. Objects are
+counted with the garbage collector, so only container objects (instances, tuples, dicts, ...) are included; that is
+what matters for collection pauses.
+
+Usage: python benchmarks/gaze_data.py [samples]
+'''
+
+import gc
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from tobiiresearch.implementation.GazeData import GazeData  # noqa: E402
+
+
+def gaze_dictionary(index):
+    '''Returns a dictionary shaped like the one the native module delivers for gaze data.'''
+    data = {"device_time_stamp": index, "system_time_stamp": index}
+    for eye in ("left", "right"):
+        data[eye + "_gaze_point_on_display_area"] = (0.5, 0.5)
+        data[eye + "_gaze_point_in_user_coordinate_system"] = (10.0, 150.0, 20.0)
+        data[eye + "_gaze_point_validity"] = 1
+        data[eye + "_pupil_diameter"] = 3.5
+        data[eye + "_pupil_validity"] = 1
+        data[eye + "_gaze_origin_in_user_coordinate_system"] = (30.0, 10.0, 600.0)
+        data[eye + "_gaze_origin_in_trackbox_coordinate_system"] = (0.5, 0.5, 0.5)
+        data[eye + "_gaze_origin_validity"] = 1
+    return data
+
+
+def construct(data):
+    return GazeData(data)
+
+
+def construct_and_read_gaze_point(data):
+    gaze_data = GazeData(data)
+    gaze_data.left_eye.gaze_point.position_on_display_area
+    gaze_data.right_eye.gaze_point.position_on_display_area
+    return gaze_data
+
+
+def construct_and_read_everything(data):
+    gaze_data = GazeData(data)
+    for eye in (gaze_data.left_eye, gaze_data.right_eye):
+        eye.gaze_point.position_on_display_area
+        eye.pupil.diameter
+        eye.gaze_origin.position_in_user_coordinates
+    return gaze_data
+
+
+def objects_per_sample(function, samples):
+    data = [gaze_dictionary(i) for i in range(samples)]
+    gc.collect()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        kept = [function(x) for x in data]
+        after = len(gc.get_objects())
+    finally:
+        gc.enable()
+    # The list holding the results is one object too.
+    return (after - before - 1) / float(len(kept))
+
+
+def time_per_sample(function, samples):
+    data = gaze_dictionary(0)
+    timer = timeit.Timer(lambda: function(data))
+    return min(timer.repeat(5, samples)) / samples * 1e9
+
+
+def main(samples=100000):
+    print("{0:<32} {1:>12} {2:>16}".format("access pattern", "ns/sample", "objects/sample"))
+    for function in (construct, construct_and_read_gaze_point, construct_and_read_everything):
+        print("{0:<32} {1:>12.1f} {2:>16.2f}".format(function.__name__,
+                                                      time_per_sample(function, samples),
+                                                      objects_per_sample(function, samples // 10)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,94 @@
+'''
+Checks that gaze recordings read back with the samples that were written.
+
+A recording of two tracking segments with events in each is written as a binary recording, converted to the comma
+separated layout with GazeRecording.toCsv and read back with readCsv. The samples read back must match the ones written,
+with the event lines skipped, and both files must convert to a GazeDataArray of the same length.
+
+Exits with status 1 if a check fails.
+
+Usage: python benchmarks/recording_roundtrip.py [samples per segment]
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from gazebuffer import GAZE_DTYPE  # noqa: E402
+from gazerecording import BinaryGazeSink, GazeRecording, readCsv, gazeDataArray  # noqa: E402
+
+# The CSV keeps four decimals of the normalized gaze points and ms times
+TOLERANCE = 1e-3
+
+
+def segment(count, start, rng):
+    samples = np.zeros(count, dtype=GAZE_DTYPE)
+    samples["TimeStamp"] = start + np.arange(count) * 1667
+    for eye in ("Left", "Right"):
+        samples["GazePointX" + eye] = rng.uniform(0, 1, count)
+        samples["GazePointY" + eye] = rng.uniform(0, 1, count)
+        samples["Pupil" + eye] = rng.uniform(2, 5, count)
+        samples["EyePositionX" + eye] = rng.uniform(-30, 30, count)
+        samples["EyePositionY" + eye] = rng.uniform(150, 200, count)
+        samples["EyePositionZ" + eye] = rng.uniform(550, 650, count)
+        samples["Validity" + eye] = rng.choice([0, 4], count, p=[0.9, 0.1])
+    return samples
+
+
+def main(count=100):
+    rng = np.random.RandomState(1)
+    directory = tempfile.mkdtemp()
+    try:
+        binary = os.path.join(directory, "recording.gaze")
+        csv = os.path.join(directory, "recording.csv")
+        segments = [segment(count, 10 ** 12, rng), segment(count, 10 ** 12 + 10 ** 7, rng)]
+        sink = BinaryGazeSink(binary, (1920, 1080))
+        for samples in segments:
+            start = int(samples["TimeStamp"][0])
+            sink.startSegment(start)
+            sink.writeSamples(samples, start)
+            sink.writeEvents([(start + 5000, "stimulus on"), (start + 9000, "response, left")], start)
+        sink.close()
+
+        with GazeRecording(binary) as recording:
+            recording.toCsv(csv)
+            from_binary = recording.toGazeDataArray()
+        read = readCsv(csv)
+        from_csv = gazeDataArray(read)
+
+        failures = []
+        written = np.concatenate(segments)
+        if len(read) != len(written):
+            failures.append("readCsv returned %d samples, %d were written." % (len(read), len(written)))
+        else:
+            for name in GAZE_DTYPE.names[1:]:
+                if np.abs(read[name] - written[name]).max() > TOLERANCE:
+                    failures.append("Column %s differs." % name)
+            # times are relative to each segment in the CSV
+            for i in range(len(segments)):
+                part = slice(i * count, (i + 1) * count)
+                times = read["TimeStamp"][part] - read["TimeStamp"][part][0]
+                expected = written["TimeStamp"][part] - written["TimeStamp"][part][0]
+                if np.abs(times - expected).max() > 1:
+                    failures.append("Time stamps of segment %d differ." % (i + 1))
+        if len(from_binary) != len(written) or len(from_csv) != len(written):
+            failures.append("The GazeDataArrays have %d and %d samples, %d were written." % (
+                len(from_binary), len(from_csv), len(written)))
+    finally:
+        shutil.rmtree(directory)
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        return 1
+    print("%d samples and %d events read back." % (2 * count, 4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:]]))
@@ -0,0 +1,76 @@
+'''
+Measures the cost of tobii_pro.__subscription_callback, the function the native module calls for every sample.
+
+The lock free snapshot dispatch is compared with the previous implementation, which took the global callback lock and
+copied the registered callbacks into a new list for every sample. The native module is replaced by a stub, only the
+Python side of the dispatch is measured.
+
+Usage: python benchmarks/tobii_pro_dispatch.py [samples]
+'''
+
+import os
+import sys
+import threading
+import timeit
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+
+def _install_native_stub():
+    stub = types.ModuleType("tobiiresearch.interop.tobii_pro_internal")
+    stub.startup = lambda: None
+    stub.cleanup = lambda: None
+    stub.subscribe_to = lambda subscription_type, address, callback: (0,)
+    stub.unsubscribe_from = lambda subscription_type, address: (0,)
+    sys.modules[stub.__name__] = stub
+    import tobiiresearch.interop
+    tobiiresearch.interop.tobii_pro_internal = stub
+
+
+_install_native_stub()
+
+from tobiiresearch.interop import tobii_pro  # noqa: E402
+
+_ADDRESS = "tet-tcp://benchmark"
+_TYPE_INDEX = 1
+
+
+class _Tracker(object):
+    address = _ADDRESS
+
+
+def _locked_dispatch(callbacks, lock):
+    # The dispatch as it was before the snapshots were introduced.
+    def dispatch(subscription_type, address, data):
+        copied = []
+        with lock:
+            for callback in callbacks.get((subscription_type, address), {}).itervalues():
+                copied.append(callback)
+        for callback in copied:
+            callback(data)
+    return dispatch
+
+
+def _measure(dispatch, samples):
+    data = {"system_time_stamp": 0}
+    timer = timeit.Timer(lambda: dispatch(_TYPE_INDEX, _ADDRESS, data))
+    return min(timer.repeat(5, samples)) / samples * 1e9
+
+
+def main(samples=200000):
+    snapshot_dispatch = getattr(tobii_pro, "__subscription_callback")
+    print("{0:>11} {1:>14} {2:>14} {3:>8}".format("subscribers", "locked ns", "snapshot ns", "speedup"))
+    for count in (1, 2, 8):
+        trackers = [_Tracker() for _ in range(count)]
+        for tracker in trackers:
+            tobii_pro.subscribe_to(_TYPE_INDEX, "gaze data", tracker, lambda data: None)
+        locked = _measure(_locked_dispatch(getattr(tobii_pro, "__callbacks"), threading.RLock()), samples)
+        snapshot = _measure(snapshot_dispatch, samples)
+        print("{0:>11} {1:>14.1f} {2:>14.1f} {3:>7.2f}x".format(count, locked, snapshot, locked / snapshot))
+        for tracker in trackers:
+            tobii_pro.unsubscribe_from(_TYPE_INDEX, tracker)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+#
+# Local store of eye tracker calibrations
+# - a calibration is kept as the opaque bytes from
+#   EyeTracker.retrieve_calibration_data, keyed by the tracker's serial
+#   number and firmware version, the display area and the participant, so
+#   a returning participant on the same setup gets their calibration back
+#   with apply_calibration_data instead of calibrating again
+# - every entry is two files in the store directory, the blob and a small
+#   JSON description; both are written to a temporary file first and then
+#   renamed, so a crash never leaves half an entry
+# - entries expire after maxAge seconds, and entries whose validation
+#   accuracy is worse than maxAccuracy degrees are neither saved nor
+#   handed out; a reapplied calibration that fails validation is evicted
+# - TobiiController (Tobii SDK 3.0) uses the store through
+#   tobiicontroller.StoredCalibrationTracker
+#
+
+import hashlib
+import json
+import os
+import time
+
+from tobiiresearch.implementation.Errors import \
+    EyeTrackerConnectionFailedError, EyeTrackerInternalError, \
+    EyeTrackerLicenseError
+
+
+# Calibrations older than this many seconds are not reapplied
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+# Failures of the eye tracker rather than of the stored calibration
+_trackerErrors = (EyeTrackerConnectionFailedError, EyeTrackerInternalError,
+                  EyeTrackerLicenseError)
+
+
+def displayAreaKey(displayArea):
+    # the display area corners (mm) rounded to a tenth of a millimetre, so
+    # the same setup gives the same key
+    return [[round(value, 1) for value in corner]
+            for corner in (displayArea.top_left, displayArea.top_right,
+                           displayArea.bottom_left)]
+
+
+def trackerKey(eyetracker, participant):
+    # the store key for a tobiiresearch EyeTracker and a participant ID
+    return {'serialNumber': eyetracker.serial_number,
+            'firmwareVersion': eyetracker.firmware_version,
+            'displayArea': displayAreaKey(eyetracker.get_display_area()),
+            'participant': unicode(participant)}
+
+
+def _replace(fileName, data, mode):
+    # os.rename does not overwrite on Windows
+    temporary = fileName + '.tmp'
+    with open(temporary, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.rename(temporary, fileName)
+    except OSError:
+        os.remove(fileName)
+        os.rename(temporary, fileName)
+
+
+class CalibrationStore(object):
+    """Saves calibration blobs and hands them out again for the same key.
+
+    Keys are dictionaries of JSON values, normally from trackerKey. With a
+    tobiiresearch EyeTracker:
+
+        store = CalibrationStore('calibrations')
+        if not store.applyTo(eyetracker, participant):
+            calibrate()
+            store.saveFrom(eyetracker, participant, accuracy=report.accuracy)
+
+    maxAge is in seconds (None keeps entries forever), maxAccuracy the
+    worst mean validation accuracy in degrees that is still kept (None
+    keeps entries whatever their accuracy). Entries saved without an
+    accuracy are always kept until they expire."""
+
+    def __init__(self, directory, maxAge=DEFAULT_MAX_AGE, maxAccuracy=None):
+        self.directory = directory
+        self.maxAge = maxAge
+        self.maxAccuracy = maxAccuracy
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True)).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def _usable(self, info):
+        if self.maxAge is not None and \
+                time.time() - info['saved'] > self.maxAge:
+            return False
+        return (self.maxAccuracy is None or info['accuracy'] is None or
+                info['accuracy'] <= self.maxAccuracy)
+
+    def save(self, key, blob, accuracy=None):
+        # stores the blob for key, replacing an earlier one; returns False
+        # (and stores nothing) if the accuracy is too poor to keep
+        if blob is None:
+            raise ValueError("There is no calibration to save.")
+        info = {'key': key, 'saved': time.time(), 'accuracy': accuracy,
+                'size': len(blob)}
+        if not self._usable(info):
+            return False
+        path = self._path(key)
+        _replace(path + '.bin', bytes(blob), 'wb')
+        _replace(path + '.json', json.dumps(info, sort_keys=True), 'w')
+        return True
+
+    def info(self, key):
+        # returns the description of the entry for key, or None
+        try:
+            with open(self._path(key) + '.json') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def load(self, key):
+        # returns the blob for key, or None if there is none or it expired;
+        # an expired entry is removed
+        info = self.info(key)
+        if info is None:
+            return None
+        if not self._usable(info):
+            self.evict(key)
+            return None
+        try:
+            with open(self._path(key) + '.bin', 'rb') as f:
+                blob = f.read()
+        except IOError:
+            return None
+        if len(blob) != info['size']:
+            self.evict(key)
+            return None
+        return blob
+
+    def evict(self, key):
+        # removes the entry for key, e.g. after the reapplied calibration
+        # failed validation
+        self._remove(self._path(key))
+
+    def _remove(self, path):
+        for fileName in (path + '.json', path + '.bin'):
+            if os.path.exists(fileName):
+                os.remove(fileName)
+
+    def prune(self):
+        # removes every expired entry, returns how many were removed
+        removed = 0
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, fileName)) as f:
+                    info = json.load(f)
+            except (IOError, ValueError):
+                continue
+            if not self._usable(info):
+                self._remove(os.path.join(self.directory, fileName[:-5]))
+                removed += 1
+        return removed
+
+    def saveFrom(self, eyetracker, participant, accuracy=None):
+        # stores the calibration the eye tracker is using now, after it
+        # was accepted
+        return self.save(trackerKey(eyetracker, participant),
+                         eyetracker.retrieve_calibration_data(), accuracy)
+
+    def applyTo(self, eyetracker, participant):
+        # applies the stored calibration for this tracker, display and
+        # participant; returns False if there is none or the tracker did
+        # not take it, so the participant is calibrated instead
+        try:
+            key = trackerKey(eyetracker, participant)
+        except _trackerErrors:
+            return False
+        blob = self.load(key)
+        if blob is None:
+            return False
+        try:
+            eyetracker.apply_calibration_data(blob)
+        except ValueError:
+            # not a calibration this tracker accepts (any more)
+            self.evict(key)
+            return False
+        except _trackerErrors:
+            # the tracker failed, the calibration may still be good
+            return False
+        return True
+
+    def evictFor(self, eyetracker, participant):
+        self.evict(trackerKey(eyetracker, participant))
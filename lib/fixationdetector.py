@@ -0,0 +1,370 @@
+#!/usr/bin/python
+#
+# Online fixation detection for gaze contingent paradigms
+# - every sample is classified as it arrives (I-VT), with an optional
+#   dispersion cap (I-DT) on top; the work per sample is constant
+# - velocities are angular, computed from the gaze origin to the gaze
+#   point in the user coordinate system, so they do not depend on the
+#   viewing distance
+# - every eye is followed on its own and the eyes' velocities are averaged,
+#   so losing one eye for a sample does not move the gaze ray
+# - works with the tobiiresearch gaze subscription (GazeData objects or
+#   dictionaries) as well as with TobiiController's gaze listeners
+#
+# The latency/accuracy tradeoff is set with two parameters:
+#   window       time span (ms) the velocity is computed over; a longer
+#                window smooths out noise but delays saccade detection by
+#                up to the window length
+#   minDuration  how long (ms) gaze has to stay below the velocity
+#                threshold before a fixation start is reported
+#
+
+import collections
+import math
+import threading
+
+
+STATE_UNKNOWN = 'unknown'
+STATE_FIXATION = 'fixation'
+STATE_SACCADE = 'saccade'
+
+FIXATION_START = 'fixation start'
+FIXATION_END = 'fixation end'
+
+
+class FixationEvent(object):
+    """A fixation start or end.
+
+    Times are eye tracker timestamps in microseconds, duration is in ms,
+    centroid is the mean gaze point in normalized display area coordinates
+    ((0, 0) is top left) and dispersion is (horizontal + vertical extent)
+    in degrees. For start events the values cover the samples seen up to
+    the moment the fixation was recognized."""
+
+    def __init__(self, kind, startTime, endTime, centroid, dispersion,
+                 sampleCount):
+        self.kind = kind
+        self.startTime = startTime
+        self.endTime = endTime
+        self.centroid = centroid
+        self.dispersion = dispersion
+        self.sampleCount = sampleCount
+
+    @property
+    def duration(self):
+        return (self.endTime - self.startTime) / 1000.0
+
+    def __repr__(self):
+        return ('FixationEvent(%r, start=%d, duration=%.1f ms, '
+                'centroid=(%.4f, %.4f), dispersion=%.2f deg)') % (
+                    self.kind, self.startTime, self.duration,
+                    self.centroid[0], self.centroid[1], self.dispersion)
+
+
+def displayAreaPoint(displayArea, point):
+    # maps a normalized display area point to the user coordinate system,
+    # displayArea is a tobiiresearch DisplayArea
+    topLeft = displayArea.top_left
+    topRight = displayArea.top_right
+    bottomLeft = displayArea.bottom_left
+    return tuple(topLeft[i] + point[0] * (topRight[i] - topLeft[i]) +
+                 point[1] * (bottomLeft[i] - topLeft[i]) for i in range(3))
+
+
+def _direction(origin, point):
+    # unit vector from the eye to the gaze point
+    dx = point[0] - origin[0]
+    dy = point[1] - origin[1]
+    dz = point[2] - origin[2]
+    length = math.sqrt(dx * dx + dy * dy + dz * dz)
+    if length == 0.0:
+        return None
+    return (dx / length, dy / length, dz / length)
+
+
+def _azimuthElevation(direction):
+    return (math.degrees(math.atan2(direction[0], -direction[2])),
+            math.degrees(math.atan2(direction[1], -direction[2])))
+
+
+def _dispersion(extents):
+    # mean over the eyes of (horizontal + vertical extent)
+    return sum((maxAz - minAz) + (maxEl - minEl)
+               for minAz, maxAz, minEl, maxEl in extents.values()) / \
+        float(len(extents))
+
+
+def _angle(a, b):
+    # angle between two unit vectors in degrees; atan2 stays accurate for
+    # the very small angles between consecutive samples
+    cx = a[1] * b[2] - a[2] * b[1]
+    cy = a[2] * b[0] - a[0] * b[2]
+    cz = a[0] * b[1] - a[1] * b[0]
+    return math.degrees(math.atan2(math.sqrt(cx * cx + cy * cy + cz * cz),
+                                   a[0] * b[0] + a[1] * b[1] + a[2] * b[2]))
+
+
+class FixationDetector(object):
+    """Classifies a gaze stream into fixations and saccades as it arrives.
+
+    Feed samples with addSample, or attach one of the adapters:
+
+        eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA,
+                                detector.onGazeData, as_dictionary=True)
+        controller.addGazeListener(detector.onControllerGaze)
+
+    Fixation events go to `callback` on the eye tracker's thread, and are
+    also kept in a queue for getEvents, so the experiment thread can poll
+    them between flips."""
+
+    def __init__(self, velocityThreshold=30.0, minDuration=60.0,
+                 maxDispersion=None, window=20.0, maxGap=75.0,
+                 displayArea=None, callback=None, maxEvents=1000):
+        # velocityThreshold in deg/s, window, minDuration and maxGap in ms,
+        # maxDispersion in degrees (None disables the cap); with a
+        # displayArea the 2D gaze points are mapped onto it instead of using
+        # the tracker's 3D gaze points
+        if window <= 0:
+            raise ValueError("The velocity window must be longer than 0 ms.")
+        self.window = window
+        self.velocityThreshold = velocityThreshold
+        self.minDuration = minDuration
+        self.maxDispersion = maxDispersion
+        self.maxGap = maxGap
+        self.displayArea = displayArea
+        self.callback = callback
+        self.events = collections.deque(maxlen=maxEvents)
+        self.lock = threading.Lock()
+        # eye index -> deque of (timeStamp, direction)
+        self._directions = {}
+        self.reset()
+
+    def reset(self):
+        # forgets the stream so far, e.g. between trials
+        with self.lock:
+            self._directions.clear()
+            self._lastValid = None
+            self.state = STATE_UNKNOWN
+            self.velocity = None
+            self._clearCandidate()
+
+    def _clearCandidate(self):
+        self._count = 0
+        self._start = None
+        self._end = None
+        self._sumX = self._sumY = 0.0
+        # eye index -> (minAz, maxAz, minEl, maxEl)
+        self._extents = {}
+        self._fixating = False
+
+    def _addToCandidate(self, timeStamp, point, directions):
+        # returns False if the sample would push the candidate over the
+        # dispersion cap; the extents are kept per eye, so they do not
+        # jump when an eye is lost
+        extents = dict(self._extents)
+        for eye, direction in directions.items():
+            az, el = _azimuthElevation(direction)
+            extent = extents.get(eye)
+            if extent is None:
+                extents[eye] = (az, az, el, el)
+            else:
+                extents[eye] = (min(extent[0], az), max(extent[1], az),
+                                min(extent[2], el), max(extent[3], el))
+        if (self.maxDispersion is not None and self._count and
+                _dispersion(extents) > self.maxDispersion):
+            return False
+        self._extents = extents
+        if self._start is None:
+            self._start = timeStamp
+        self._end = timeStamp
+        self._count += 1
+        self._sumX += point[0]
+        self._sumY += point[1]
+        return True
+
+    def _event(self, kind):
+        return FixationEvent(kind, self._start, self._end,
+                             (self._sumX / self._count,
+                              self._sumY / self._count),
+                             _dispersion(self._extents), self._count)
+
+    def _endCandidate(self, emitted):
+        if self._fixating:
+            emitted.append(self._event(FIXATION_END))
+        self._clearCandidate()
+
+    def addSample(self, timeStamp, point, point3D, origin3D):
+        # timeStamp in microseconds; point is the normalized display area
+        # gaze point, point3D and origin3D are in the user coordinate system
+        # (mm). Pass None for point to report a sample without valid gaze.
+        # Returns the events the sample caused.
+        if point is None:
+            return self._addRays(timeStamp, [None])
+        return self._addRays(timeStamp, [(point, point3D, origin3D)])
+
+    def _addRays(self, timeStamp, rays):
+        # rays holds one (point, point3D, origin3D) per eye, None for an eye
+        # without valid gaze
+        emitted = []
+        with self.lock:
+            directions = {}
+            points = []
+            for eye, ray in enumerate(rays):
+                if ray is None:
+                    continue
+                point, point3D, origin3D = ray
+                if self.displayArea is not None:
+                    point3D = displayAreaPoint(self.displayArea, point)
+                direction = _direction(origin3D, point3D)
+                if direction is not None:
+                    directions[eye] = direction
+                    points.append(point)
+
+            # short gaps (blinks, dropouts) are bridged, longer ones end the
+            # fixation
+            if (self._lastValid is not None and
+                    (timeStamp - self._lastValid) / 1000.0 > self.maxGap):
+                self._endCandidate(emitted)
+                self._directions.clear()
+                self._lastValid = None
+                self.state = STATE_UNKNOWN
+                self.velocity = None
+
+            if directions:
+                self._lastValid = timeStamp
+                n = float(len(points))
+                point = (sum(p[0] for p in points) / n,
+                         sum(p[1] for p in points) / n)
+                self._classify(timeStamp, point, directions,
+                               self._velocities(timeStamp, directions),
+                               emitted)
+
+        for event in emitted:
+            self.events.append(event)
+            if self.callback is not None:
+                self.callback(event)
+        return emitted
+
+    def _velocities(self, timeStamp, directions):
+        # angular velocity of every eye over its own history; returns None
+        # if no eye has anything to compare with yet
+        velocities = None
+        for eye, direction in directions.items():
+            history = self._directions.get(eye)
+            if history is None:
+                history = self._directions[eye] = collections.deque()
+            elif (history and
+                  (timeStamp - history[-1][0]) / 1000.0 > self.maxGap):
+                # this eye was lost for longer than a bridged gap
+                history.clear()
+            # keep one sample at or beyond the window start, so the
+            # velocity always spans at least the window
+            history.append((timeStamp, direction))
+            while (len(history) > 2 and
+                   (timeStamp - history[1][0]) / 1000.0 >= self.window):
+                history.popleft()
+            if len(history) < 2:
+                continue
+            if velocities is None:
+                velocities = []
+            firstTime, firstDirection = history[0]
+            dt = (timeStamp - firstTime) / 1e6
+            if dt > 0:
+                velocities.append(_angle(firstDirection, direction) / dt)
+        return velocities
+
+    def _classify(self, timeStamp, point, directions, velocities, emitted):
+        if velocities is None:
+            self.velocity = None
+            # nothing to compare with yet, the sample only seeds a candidate
+            self._addToCandidate(timeStamp, point, directions)
+            return
+        if not velocities:
+            return
+        self.velocity = sum(velocities) / len(velocities)
+
+        if self.velocity >= self.velocityThreshold:
+            self._endCandidate(emitted)
+            self.state = STATE_SACCADE
+            return
+
+        if not self._addToCandidate(timeStamp, point, directions):
+            # gaze drifted too far: close this fixation and start anew
+            self._endCandidate(emitted)
+            self._addToCandidate(timeStamp, point, directions)
+        if (not self._fixating and
+                (self._end - self._start) / 1000.0 >= self.minDuration):
+            self._fixating = True
+            emitted.append(self._event(FIXATION_START))
+        self.state = STATE_FIXATION if self._fixating else STATE_UNKNOWN
+
+    @property
+    def fixating(self):
+        return self._fixating
+
+    def currentFixation(self):
+        # returns the ongoing fixation as a FixationEvent, or None
+        with self.lock:
+            if not self._fixating:
+                return None
+            return self._event(FIXATION_START)
+
+    def getEvents(self):
+        # returns and removes the events collected so far, oldest first
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    ########################################################################
+    # adapters
+    ########################################################################
+
+    def onGazeData(self, gazeData):
+        # callback for tobiiresearch EYETRACKER_GAZE_DATA subscriptions;
+        # accepts GazeData objects, dictionaries and batches of either
+        if isinstance(gazeData, list):
+            for sample in gazeData:
+                self.onGazeData(sample)
+            return
+        if isinstance(gazeData, dict):
+            eyes = [(gazeData[eye + '_gaze_point_on_display_area'],
+                     gazeData[eye + '_gaze_point_in_user_coordinate_system'],
+                     gazeData[eye + '_gaze_origin_in_user_coordinate_system'],
+                     gazeData[eye + '_gaze_point_validity'] and
+                     gazeData[eye + '_gaze_origin_validity'])
+                    for eye in ('left', 'right')]
+            timeStamp = gazeData['system_time_stamp']
+        else:
+            eyes = [(eye.gaze_point.position_on_display_area,
+                     eye.gaze_point.position_in_user_coordinates,
+                     eye.gaze_origin.position_in_user_coordinates,
+                     eye.gaze_point.validity and eye.gaze_origin.validity)
+                    for eye in (gazeData.left_eye, gazeData.right_eye)]
+            timeStamp = gazeData.system_time_stamp
+        self._addEyes(timeStamp, eyes)
+
+    def onControllerGaze(self, gaze):
+        # gaze listener for TobiiController (Tobii SDK 3.0 gaze data)
+        self._addEyes(gaze.Timestamp,
+                      [(gaze.LeftGazePoint2D, gaze.LeftGazePoint3D,
+                        gaze.LeftEyePosition3D, gaze.LeftValidity != 4),
+                       (gaze.RightGazePoint2D, gaze.RightGazePoint3D,
+                        gaze.RightEyePosition3D, gaze.RightValidity != 4)])
+
+    def _addEyes(self, timeStamp, eyes):
+        # hands every valid eye of one sample on as a gaze ray of its own
+        return self._addRays(timeStamp,
+                             [(_xyz(eye[0]), _xyz(eye[1]), _xyz(eye[2]))
+                              if eye[3] else None for eye in eyes])
+
+
+def _xyz(value):
+    # the Tobii SDK 3.0 hands out point objects, tobiiresearch tuples
+    if isinstance(value, tuple):
+        return value
+    if hasattr(value, 'z'):
+        return (value.x, value.y, value.z)
+    return (value.x, value.y)
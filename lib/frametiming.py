@@ -0,0 +1,195 @@
+#!/usr/bin/python
+#
+# Flip timing for the PsychoPy stimulus loops
+# - every win.flip() of a trial is timestamped right after it returns, in
+#   the eye tracker's system timebase (microseconds) when tobiiresearch is
+#   available, so frames line up with the gaze data
+# - per flip only a timestamp is stored in a preallocated list; intervals,
+#   dropped frames and the presented duration are worked out when the
+#   trial ends
+#
+
+import time
+
+
+# Room for this many flips per trial before the list has to grow; the
+# longest latency in the experiments is 60 frames
+DEFAULT_CAPACITY = 256
+
+# An interval longer than (1 + DEFAULT_TOLERANCE) frame periods counts as
+# a dropped frame
+DEFAULT_TOLERANCE = 0.5
+
+
+def systemClock():
+    # returns a function giving the current time in microseconds, on the
+    # eye tracker's system clock if tobiiresearch can be loaded
+    try:
+        from tobiiresearch.implementation.EyeTracker import \
+            get_system_time_stamp
+        get_system_time_stamp()
+        return get_system_time_stamp
+    except Exception:
+        # no native library for this platform, or no tobiiresearch at all
+        pass
+    try:
+        from psychopy import core
+        getTime = core.getTime
+    except ImportError:
+        getTime = time.time
+    return lambda: int(getTime() * 1e6)
+
+
+class FrameTrial(object):
+    """Flip timing of one trial.
+
+    timeStamps holds the time of every flip in microseconds, intervals the
+    time between consecutive flips in ms. presentedDuration (ms) is the
+    time from the first to the last flip, i.e. how long the stimulus shown
+    by the first flip actually stayed on screen, and presentedFrames the
+    same in frame periods. droppedFrames counts the frame periods lost to
+    late flips."""
+
+    def __init__(self, label, intendedFrames, timeStamps, framePeriod,
+                 tolerance):
+        self.label = label
+        self.intendedFrames = intendedFrames
+        self.timeStamps = timeStamps
+        self.framePeriod = framePeriod
+        self.intervals = [(b - a) / 1000.0
+                          for a, b in zip(timeStamps, timeStamps[1:])]
+        self.lateFlips = 0
+        self.droppedFrames = 0
+        limit = framePeriod * (1 + tolerance)
+        for interval in self.intervals:
+            if interval > limit:
+                self.lateFlips += 1
+                self.droppedFrames += max(
+                    int(round(interval / framePeriod)) - 1, 1)
+        if len(timeStamps) > 1:
+            self.presentedDuration = (timeStamps[-1] - timeStamps[0]) / 1000.0
+            self.presentedFrames = int(round(self.presentedDuration /
+                                             framePeriod))
+        else:
+            self.presentedDuration = 'NA'
+            self.presentedFrames = 'NA'
+
+    @property
+    def flips(self):
+        return len(self.timeStamps)
+
+    @property
+    def ok(self):
+        # True if the stimulus was on screen for the intended number of
+        # frames without a dropped frame
+        return (self.droppedFrames == 0 and
+                (self.intendedFrames is None or
+                 self.presentedFrames == self.intendedFrames))
+
+    def __repr__(self):
+        return ('FrameTrial(%r, intended=%s, presented=%s frames/%s ms, '
+                'dropped=%d)') % (self.label, self.intendedFrames,
+                                  self.presentedFrames,
+                                  self.presentedDuration, self.droppedFrames)
+
+
+class FrameTimer(object):
+    """Timestamps the flips of a PsychoPy window trial by trial.
+
+    Replace win.flip() in a timed loop with timer.flip():
+
+        timer.startTrial(latency)
+        for n in xrange(latency):
+            drawStimuli()
+            timer.flip()
+        drawNextScreen()
+        timer.flip()
+        frames = timer.endTrial()
+
+    The last flip is the one that takes the stimulus off the screen, so
+    the trial covers latency + 1 flips. Finished trials are kept in
+    `trials` for saveLog."""
+
+    def __init__(self, win, frameRate=None, tolerance=DEFAULT_TOLERANCE,
+                 clock=None, capacity=DEFAULT_CAPACITY):
+        # frameRate in Hz; without it the window measures its refresh rate
+        # once, here, and falls back to 60 Hz if that fails
+        self.win = win
+        if frameRate is None:
+            frameRate = win.getActualFrameRate()
+        if not frameRate:
+            frameRate = 60.0
+        self.framePeriod = 1000.0 / frameRate
+        self.tolerance = tolerance
+        self.clock = clock if clock is not None else systemClock()
+        self.capacity = capacity
+        self.trials = []
+        self.lastTrial = None
+        self._timeStamps = [0] * capacity
+        self._count = 0
+        self._label = None
+        self._intended = None
+        self._setupStart = None
+        self._setupTime = None
+        self.setupTime = None
+
+    def startSetup(self):
+        # marks the start of the work done before a trial's first flip,
+        # reported as setupTime (ms) by startTrial
+        self._setupStart = self.clock()
+
+    def endSetup(self):
+        # marks the end of that work when it happens well before the trial
+        # starts, e.g. stimuli prepared in the inter-trial interval
+        if self._setupStart is not None:
+            self._setupTime = (self.clock() - self._setupStart) / 1000.0
+            self._setupStart = None
+
+    def startTrial(self, intendedFrames=None, label=None):
+        self.endSetup()
+        self.setupTime = self._setupTime
+        self._setupTime = None
+        self._count = 0
+        self._intended = intendedFrames
+        self._label = label
+
+    def flip(self, clearBuffer=True):
+        result = self.win.flip(clearBuffer=clearBuffer)
+        now = self.clock()
+        if self._count < self.capacity:
+            self._timeStamps[self._count] = now
+        else:
+            self._timeStamps.append(now)
+        self._count += 1
+        return result
+
+    def endTrial(self):
+        # returns the FrameTrial of the flips since startTrial
+        trial = FrameTrial(self._label, self._intended,
+                           self._timeStamps[:self._count], self.framePeriod,
+                           self.tolerance)
+        trial.setupTime = self.setupTime
+        self.trials.append(trial)
+        self.lastTrial = trial
+        self._count = 0
+        return trial
+
+    def summary(self):
+        # returns (trials, trials with dropped frames, dropped frames)
+        bad = [trial for trial in self.trials if trial.droppedFrames]
+        return (len(self.trials), len(bad),
+                sum(trial.droppedFrames for trial in bad))
+
+    def saveLog(self, fileName):
+        # writes one tab separated line per flip of every trial
+        with open(fileName, 'w') as f:
+            f.write('trial\tlabel\tintendedFrames\tsetupTime\tflip\t'
+                    'timeStamp\tinterval\n')
+            for n, trial in enumerate(self.trials):
+                intervals = ['NA'] + trial.intervals
+                for i, timeStamp in enumerate(trial.timeStamps):
+                    f.write('%d\t%s\t%s\t%s\t%d\t%d\t%s\n' % (
+                        n + 1, trial.label, trial.intendedFrames,
+                        'NA' if trial.setupTime is None
+                        else '%.3f' % trial.setupTime,
+                        i, timeStamp, intervals[i]))
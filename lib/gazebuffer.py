@@ -0,0 +1,110 @@
+#!/usr/bin/python
+#
+# Fixed-capacity gaze sample storage for the Tobii controller
+# - samples are written in place into a preallocated numpy record array,
+#   so memory stays flat no matter how long a recording runs
+#
+
+import threading
+
+import numpy as np
+
+
+# One record per gaze sample, in the same order as the columns of the
+# data file written by TobiiController.flushData. Timestamps are kept as
+# the integer microseconds delivered by the eye tracker.
+GAZE_DTYPE = np.dtype([('TimeStamp', '<i8'),
+                       ('GazePointXLeft', '<f8'),
+                       ('GazePointYLeft', '<f8'),
+                       ('PupilLeft', '<f8'),
+                       ('EyePositionXLeft', '<f8'),
+                       ('EyePositionYLeft', '<f8'),
+                       ('EyePositionZLeft', '<f8'),
+                       ('ValidityLeft', '<i1'),
+                       ('GazePointXRight', '<f8'),
+                       ('GazePointYRight', '<f8'),
+                       ('PupilRight', '<f8'),
+                       ('EyePositionXRight', '<f8'),
+                       ('EyePositionYRight', '<f8'),
+                       ('EyePositionZRight', '<f8'),
+                       ('ValidityRight', '<i1')])
+
+# Five minutes at 600 Hz, roughly 30 MB
+DEFAULT_CAPACITY = 180000
+
+
+class GazeRingBuffer(object):
+    """Ring buffer of gaze samples backed by one preallocated record array.
+
+    The eye tracker callback thread appends samples, the experiment thread
+    reads the most recent sample or drains everything it has not read yet.
+    Samples that are overwritten before they were drained are counted in
+    `overflow`."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("The gaze buffer needs room for at least one "
+                             "sample.")
+        self.capacity = capacity
+        self.overflow = 0
+        self._data = np.zeros(capacity, dtype=GAZE_DTYPE)
+        self._written = 0
+        self._read = 0
+        self._firstTimeStamp = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        # number of samples currently held in the buffer
+        return min(self._written, self.capacity)
+
+    @property
+    def firstTimeStamp(self):
+        # timestamp of the first sample since the buffer was last cleared
+        return self._firstTimeStamp
+
+    @property
+    def unread(self):
+        # number of samples appended but not drained yet
+        return min(self._written - self._read, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._written = 0
+            self._read = 0
+            self.overflow = 0
+            self._firstTimeStamp = None
+
+    def append(self, sample):
+        # sample is a tuple with one value per field of GAZE_DTYPE
+        with self._lock:
+            self._data[self._written % self.capacity] = sample
+            if self._written == 0:
+                self._firstTimeStamp = sample[0]
+            self._written += 1
+
+    def latest(self):
+        # returns a copy of the most recent sample, or None if there is none
+        with self._lock:
+            if self._written == 0:
+                return None
+            return self._data[(self._written - 1) % self.capacity].copy()
+
+    def drain(self):
+        # returns a copy of all samples that were not drained before, oldest
+        # first, and marks them as read
+        with self._lock:
+            unread = self._written - self._read
+            if unread > self.capacity:
+                # the oldest unread samples have been overwritten already
+                self.overflow += unread - self.capacity
+                unread = self.capacity
+            start = (self._written - unread) % self.capacity
+            stop = start + unread
+            if stop <= self.capacity:
+                samples = self._data[start:stop].copy()
+            else:
+                samples = np.concatenate(
+                    (self._data[start:],
+                     self._data[:stop - self.capacity]))
+            self._read = self._written
+        return samples
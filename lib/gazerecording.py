@@ -0,0 +1,316 @@
+#!/usr/bin/python
+#
+# Binary gaze recordings for the Tobii controller
+# - samples are stored as fixed-width GAZE_DTYPE records straight from the
+#   gaze buffer, timestamps stay integer microseconds
+# - a reader maps the file into memory and hands out numpy views, so even
+#   very long recordings open instantly
+#
+# File layout:
+#   8 bytes   magic 'PSYGAZE1'
+#   4 bytes   little endian length of the json metadata that follows
+#   n bytes   json metadata (date, time, resolution, record fields), padded
+#             with spaces so the records start on a 16 byte boundary
+#   ...       GAZE_DTYPE records until the end of the file
+#
+# Events and tracking segment starts are appended to a sidecar file with
+# the same name plus '.events', holding EVENT_DTYPE records. Events are
+# stored UTF-8 encoded and can be at most EVENT_LENGTH bytes long.
+#
+# Binary and comma separated recordings can be turned into a tobiiresearch
+# GazeDataArray, e.g. to play a past session back with GazeReplay.
+#
+
+import datetime
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from gazebuffer import GAZE_DTYPE
+from gazewriter import CsvGazeSink, GAZE_COLUMNS
+from tobiiresearch.implementation.GazeDataArray import GazeDataArray
+
+
+MAGIC = 'PSYGAZE1'
+EVENTS_SUFFIX = '.events'
+
+EVENT_KIND_EVENT = 0
+EVENT_KIND_SEGMENT = 1
+
+# SampleIndex is the index of the first sample of the tracking segment the
+# record belongs to; for segment records TimeStamp is the segment's
+# first sample timestamp
+EVENT_DTYPE = np.dtype([('TimeStamp', '<i8'),
+                        ('SampleIndex', '<i8'),
+                        ('Kind', '<i1'),
+                        ('Event', 'S111')])
+EVENT_LENGTH = EVENT_DTYPE['Event'].itemsize
+
+_prefix = struct.Struct('<8sI')
+
+
+def encodeEvent(event):
+    # returns the event as a UTF-8 encoded str; raises ValueError if it is
+    # too long to be stored without being cut short
+    if isinstance(event, unicode):
+        event = event.encode('utf-8')
+    elif not isinstance(event, str):
+        event = str(event)
+    if len(event) > EVENT_LENGTH:
+        raise ValueError("The event %r is %d bytes long, a recording holds "
+                         "events of at most %d bytes." %
+                         (event, len(event), EVENT_LENGTH))
+    return event
+
+
+def _fieldList(dtype):
+    return [[name, dtype.fields[name][0].str] for name in dtype.names]
+
+
+class BinaryGazeSink(object):
+    """Writes gaze data as a binary recording. Has the same interface as
+    CsvGazeSink, so it can be given to a GazeDataWriter."""
+
+    def __init__(self, filename, resolution):
+        now = datetime.datetime.now()
+        metadata = json.dumps({'date': now.strftime('%Y/%m/%d'),
+                               'time': now.strftime('%H:%M:%S'),
+                               'resolution': [int(v) for v in resolution],
+                               'fields': _fieldList(GAZE_DTYPE)})
+        size = _prefix.size + len(metadata)
+        metadata += ' ' * (-size % 16)
+        self.filename = filename
+        self.file = open(filename, 'wb')
+        self.file.write(_prefix.pack(MAGIC, len(metadata)))
+        self.file.write(metadata)
+        self.eventFile = open(filename + EVENTS_SUFFIX, 'wb')
+        self.sampleCount = 0
+        self.segmentStart = 0
+
+    def startSegment(self, timeStampStart):
+        self.segmentStart = self.sampleCount
+        self._writeEvents([(timeStampStart, '')], EVENT_KIND_SEGMENT)
+
+    def writeSamples(self, samples, timeStampStart):
+        self.file.write(samples.astype(GAZE_DTYPE, copy=False).tobytes())
+        self.sampleCount += len(samples)
+
+    def writeEvents(self, events, timeStampStart):
+        self._writeEvents(events, EVENT_KIND_EVENT)
+
+    def _writeEvents(self, events, kind):
+        records = np.zeros(len(events), dtype=EVENT_DTYPE)
+        for record, (t, e) in zip(records, events):
+            record['TimeStamp'] = t
+            record['Event'] = encodeEvent(e)
+        records['SampleIndex'] = self.segmentStart
+        records['Kind'] = kind
+        self.eventFile.write(records.tobytes())
+
+    def flush(self):
+        self.file.flush()
+        self.eventFile.flush()
+
+    def close(self):
+        self.file.close()
+        self.eventFile.close()
+
+
+class GazeRecording(object):
+    """Read access to a binary gaze recording.
+
+    `samples` is a GAZE_DTYPE record array that maps the file directly;
+    nothing is copied until values are actually used. Timestamps are
+    expected to increase monotonically, as they do in recorded data."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'rb')
+        magic, length = _prefix.unpack(self.file.read(_prefix.size))
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError("%s is not a binary gaze recording." % filename)
+        self.metadata = json.loads(self.file.read(length))
+        if self.metadata['fields'] != _fieldList(GAZE_DTYPE):
+            self.file.close()
+            raise ValueError("%s uses an unknown sample layout." % filename)
+        offset = _prefix.size + length
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # a partly written last record (e.g. after a crash) is ignored
+        count = (len(self.map) - offset) // GAZE_DTYPE.itemsize
+        self.samples = np.frombuffer(self.map, dtype=GAZE_DTYPE,
+                                     count=count, offset=offset)
+        try:
+            self.events = np.fromfile(filename + EVENTS_SUFFIX,
+                                      dtype=EVENT_DTYPE)
+        except IOError:
+            self.events = np.zeros(0, dtype=EVENT_DTYPE)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def date(self):
+        return self.metadata['date']
+
+    @property
+    def time(self):
+        return self.metadata['time']
+
+    @property
+    def resolution(self):
+        return tuple(self.metadata['resolution'])
+
+    @property
+    def timestamps(self):
+        return self.samples['TimeStamp']
+
+    def column(self, name):
+        # returns a view of a single field, e.g. column('PupilLeft')
+        return self.samples[name]
+
+    def seek(self, timestamp):
+        # returns the index of the first sample at or after timestamp
+        return int(np.searchsorted(self.timestamps, timestamp, 'left'))
+
+    def between(self, start, stop):
+        # returns a view of the samples with start <= timestamp < stop
+        return self.samples[self.seek(start):self.seek(stop)]
+
+    def segments(self):
+        # returns a list of (first sample timestamp, samples, events), one
+        # per tracking segment
+        kinds = self.events['Kind']
+        starts = self.events[kinds == EVENT_KIND_SEGMENT]
+        userEvents = self.events[kinds == EVENT_KIND_EVENT]
+        if len(starts) == 0:
+            if len(self.samples) == 0:
+                return []
+            return [(int(self.timestamps[0]), self.samples, userEvents)]
+        bounds = list(starts['SampleIndex']) + [len(self.samples)]
+        result = []
+        for i, start in enumerate(starts):
+            events = userEvents[userEvents['SampleIndex'] ==
+                                start['SampleIndex']]
+            result.append((int(start['TimeStamp']),
+                           self.samples[bounds[i]:bounds[i + 1]],
+                           events))
+        return result
+
+    def toGazeDataArray(self, displayArea=None):
+        # returns all samples as a tobiiresearch GazeDataArray, see
+        # gazeDataArray
+        return gazeDataArray(self.samples, displayArea)
+
+    def toCsv(self, filename):
+        # writes the recording in the comma separated layout of
+        # TobiiController.flushData
+        sink = CsvGazeSink(filename, self.resolution,
+                           date=self.date, time=self.time)
+        try:
+            for timeStampStart, samples, events in self.segments():
+                sink.startSegment(timeStampStart)
+                sink.writeSamples(samples, timeStampStart)
+                sink.writeEvents(zip(events['TimeStamp'].tolist(),
+                                     events['Event'].tolist()),
+                                 timeStampStart)
+        finally:
+            sink.close()
+
+    def close(self):
+        # views of the samples must not be used after closing
+        self.samples = None
+        self.map.close()
+        self.file.close()
+
+
+def readCsv(filename):
+    # reads the samples of a comma separated recording (TobiiController with
+    # a .csv data file, or GazeRecording.toCsv) into a GAZE_DTYPE array;
+    # events are skipped. The file only holds times in ms since the start
+    # of each tracking segment, so the segments are laid end to end, the
+    # first starting at 0 and each following one sample interval after the
+    # end of the one before.
+    segments = []
+    with open(filename) as f:
+        for line in f:
+            fields = line.split(',')
+            if fields[0] == GAZE_COLUMNS[0]:
+                segments.append([])
+            elif (segments and len(fields) == len(GAZE_COLUMNS) and
+                    all(field.strip() for field in fields[1:])):
+                # event lines have as many fields, but only the time and
+                # the event are filled in
+                segments[-1].append(tuple(float(field) for field in fields))
+    samples = []
+    start = 0
+    for rows in segments:
+        if not rows:
+            continue
+        records = np.array(rows, dtype=[(name, '<f8')
+                                        for name in GAZE_COLUMNS])
+        segment = np.zeros(len(rows), dtype=GAZE_DTYPE)
+        for name in GAZE_COLUMNS[1:]:
+            segment[name] = records[name]
+        segment['TimeStamp'] = start + np.round(
+            records['TimeStamp'] * 1000).astype(np.int64)
+        samples.append(segment)
+        timeStamps = segment['TimeStamp']
+        interval = ((timeStamps[-1] - timeStamps[0]) // (len(segment) - 1)
+                    if len(segment) > 1 else 0)
+        start = int(timeStamps[-1] + interval)
+    if not samples:
+        return np.zeros(0, dtype=GAZE_DTYPE)
+    return np.concatenate(samples)
+
+
+def gazeDataArray(samples, displayArea=None):
+    # converts GAZE_DTYPE samples to a tobiiresearch GazeDataArray with the
+    # columns the gaze subscription delivers. The controller records Tobii
+    # SDK 3.0 data, so
+    # - validity codes 0 to 3 count as valid, 4 as invalid, for gaze point,
+    #   pupil and gaze origin alike; values of invalid eyes become NaN
+    # - TimeStamp is used as both device and system time stamp
+    # - the gaze origin in the track box is not recorded and is NaN
+    # - the 3D gaze point is the 2D gaze point mapped onto displayArea (a
+    #   tobiiresearch DisplayArea) if given, NaN otherwise
+    count = len(samples)
+    columns = {'device_time_stamp': samples['TimeStamp'].astype(np.int64),
+               'system_time_stamp': samples['TimeStamp'].astype(np.int64)}
+    for eye, suffix in (('left', 'Left'), ('right', 'Right')):
+        valid = samples['Validity' + suffix] != 4
+        point2D = np.column_stack((samples['GazePointX' + suffix],
+                                   samples['GazePointY' + suffix]))
+        point2D[~valid] = np.nan
+        if displayArea is not None:
+            topLeft = np.array(displayArea.top_left, dtype=float)
+            xAxis = np.array(displayArea.top_right) - topLeft
+            yAxis = np.array(displayArea.bottom_left) - topLeft
+            point3D = (topLeft + point2D[:, :1] * xAxis +
+                       point2D[:, 1:] * yAxis)
+        else:
+            point3D = np.full((count, 3), np.nan)
+        origin = np.column_stack([samples[name + suffix]
+                                  for name in ('EyePositionX', 'EyePositionY',
+                                               'EyePositionZ')])
+        origin[~valid] = np.nan
+        pupil = samples['Pupil' + suffix].astype(np.float64)
+        pupil[~valid] = np.nan
+        columns[eye + '_gaze_point_on_display_area'] = point2D
+        columns[eye + '_gaze_point_in_user_coordinate_system'] = point3D
+        columns[eye + '_gaze_point_validity'] = valid
+        columns[eye + '_pupil_diameter'] = pupil
+        columns[eye + '_pupil_validity'] = valid.copy()
+        columns[eye + '_gaze_origin_in_user_coordinate_system'] = origin
+        columns[eye + '_gaze_origin_in_trackbox_coordinate_system'] = \
+            np.full((count, 3), np.nan)
+        columns[eye + '_gaze_origin_validity'] = valid.copy()
+    return GazeDataArray(columns)
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+#
+# Calibration validation: accuracy and precision per target and eye
+# - gaze is collected per validation target while it is shown, and the
+#   whole set is evaluated at once with numpy when the last target is done
+# - angles are measured at the gaze origin, between the directions to the
+#   gaze point and to the target (accuracy) and between gaze directions
+#   (precision), so they do not depend on the viewing distance
+# - accuracy is the mean angular offset from the target, precision both
+#   the RMS of the sample to sample angles and the SD of the angles from
+#   the mean gaze direction, all in degrees
+#
+
+import numpy as np
+
+
+# One record per gaze sample; point is the index of the target shown.
+# Gaze points are normalized display area coordinates ((0, 0) is top
+# left), 3D gaze points and eye positions are in the user coordinate
+# system (mm).
+VALIDATION_DTYPE = np.dtype([('point', '<i4'),
+                             ('TimeStamp', '<i8')] +
+                            [(name + eye, '<f8')
+                             for eye in ('Left', 'Right')
+                             for name in ('GazePointX', 'GazePointY',
+                                          'GazePoint3DX', 'GazePoint3DY',
+                                          'GazePoint3DZ', 'EyePositionX',
+                                          'EyePositionY', 'EyePositionZ')] +
+                            [('ValidityLeft', '?'), ('ValidityRight', '?')])
+
+# One record per target in ValidationReport.points; angles in degrees,
+# valid is the fraction of samples with a valid eye and meanX/meanY the
+# mean gaze point (normalized)
+POINT_DTYPE = np.dtype([('x', '<f8'), ('y', '<f8'), ('samples', '<i4')] +
+                       [(name + eye, '<f8')
+                        for eye in ('Left', 'Right')
+                        for name in ('accuracy', 'rmsS2S', 'sd', 'valid',
+                                     'meanX', 'meanY')])
+
+EYES = ('Left', 'Right')
+
+
+class ValidationCollector(object):
+    """Collects the gaze samples of a validation, target by target.
+
+    Attach it as a gaze listener and call start(point) when the gaze
+    should count for a target and stop() when it should not any more:
+
+        controller.addGazeListener(collector.onControllerGaze)
+
+    Samples arriving while no target is active are dropped. Appending a
+    tuple is all the listener does on the tracker's thread."""
+
+    def __init__(self):
+        self.point = None
+        self._samples = []
+
+    def start(self, point):
+        self.point = point
+
+    def stop(self):
+        self.point = None
+
+    def clear(self):
+        self.point = None
+        self._samples = []
+
+    def samples(self):
+        # returns the collected samples as a VALIDATION_DTYPE array
+        return np.array(self._samples, dtype=VALIDATION_DTYPE)
+
+    def onControllerGaze(self, gaze):
+        # gaze listener for TobiiController (Tobii SDK 3.0 gaze data)
+        point = self.point
+        if point is None:
+            return
+        self._samples.append(
+            (point, gaze.Timestamp,
+             gaze.LeftGazePoint2D.x, gaze.LeftGazePoint2D.y,
+             gaze.LeftGazePoint3D.x, gaze.LeftGazePoint3D.y,
+             gaze.LeftGazePoint3D.z, gaze.LeftEyePosition3D.x,
+             gaze.LeftEyePosition3D.y, gaze.LeftEyePosition3D.z,
+             gaze.RightGazePoint2D.x, gaze.RightGazePoint2D.y,
+             gaze.RightGazePoint3D.x, gaze.RightGazePoint3D.y,
+             gaze.RightGazePoint3D.z, gaze.RightEyePosition3D.x,
+             gaze.RightEyePosition3D.y, gaze.RightEyePosition3D.z,
+             gaze.LeftValidity != 4, gaze.RightValidity != 4))
+
+    def onGazeData(self, gazeData):
+        # callback for tobiiresearch EYETRACKER_GAZE_DATA subscriptions
+        # with as_dictionary=True, single samples or batches
+        if isinstance(gazeData, list):
+            for sample in gazeData:
+                self.onGazeData(sample)
+            return
+        point = self.point
+        if point is None:
+            return
+        values = [point, gazeData['system_time_stamp']]
+        for eye in ('left', 'right'):
+            values.extend(gazeData[eye + '_gaze_point_on_display_area'])
+            values.extend(
+                gazeData[eye + '_gaze_point_in_user_coordinate_system'])
+            values.extend(
+                gazeData[eye + '_gaze_origin_in_user_coordinate_system'])
+        values.extend(bool(gazeData[eye + '_gaze_point_validity'] and
+                           gazeData[eye + '_gaze_origin_validity'])
+                      for eye in ('left', 'right'))
+        self._samples.append(tuple(values))
+
+
+class ValidationReport(object):
+    """Accuracy and precision of a validation.
+
+    `points` has one POINT_DTYPE record per target, in the order the
+    targets were given; values are NaN where an eye had no valid samples
+    (or, for rmsS2S, no two consecutive ones). accuracy, rmsS2S and sd are
+    the means over the targets per eye, as {'Left': ..., 'Right': ...}."""
+
+    def __init__(self, points):
+        self.points = points
+        self.accuracy = {}
+        self.rmsS2S = {}
+        self.sd = {}
+        for eye in EYES:
+            self.accuracy[eye] = _nanmean(points['accuracy' + eye])
+            self.rmsS2S[eye] = _nanmean(points['rmsS2S' + eye])
+            self.sd[eye] = _nanmean(points['sd' + eye])
+
+    def weakPoints(self, maxAccuracy=1.0, maxPrecision=0.5, minValid=0.5):
+        # returns the indices of the targets where an eye's accuracy or
+        # RMS-S2S precision (degrees) is worse than the limits, or where
+        # less than minValid of its samples were valid
+        points = self.points
+        weak = np.zeros(len(points), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for eye in EYES:
+                # comparisons with NaN are False, so missing values are weak
+                weak |= ~(points['accuracy' + eye] <= maxAccuracy)
+                weak |= ~(points['rmsS2S' + eye] <= maxPrecision)
+                weak |= ~(points['valid' + eye] >= minValid)
+        return np.flatnonzero(weak).tolist()
+
+    def ok(self, maxAccuracy=1.0, maxPrecision=0.5, minValid=0.5):
+        # True if no target is weak
+        return not self.weakPoints(maxAccuracy, maxPrecision, minValid)
+
+    def __str__(self):
+        lines = ['   x     y   eye    acc  rmsS2S    sd  valid']
+        row = '%.2f  %.2f  %-5s %5.2f  %5.2f  %5.2f  %4.0f%%'
+        for point in self.points:
+            for eye in EYES:
+                lines.append(row % (
+                    point['x'], point['y'], eye, point['accuracy' + eye],
+                    point['rmsS2S' + eye], point['sd' + eye],
+                    100 * point['valid' + eye]))
+        for eye in EYES:
+            lines.append('mean        %-5s %5.2f  %5.2f  %5.2f' % (
+                eye, self.accuracy[eye], self.rmsS2S[eye], self.sd[eye]))
+        return '\n'.join(lines)
+
+
+def _nanmean(values):
+    values = values[~np.isnan(values)]
+    return values.mean() if len(values) else float('nan')
+
+
+def _column(samples, eye, names):
+    return np.column_stack([samples[name + eye] for name in names])
+
+
+def _angles(a, b):
+    # angles between the rows of two (n, 3) arrays in degrees; atan2 stays
+    # accurate for the very small angles between consecutive samples
+    return np.degrees(np.arctan2(np.sqrt((np.cross(a, b) ** 2).sum(axis=1)),
+                                 (a * b).sum(axis=1)))
+
+
+def _perPoint(index, values, count):
+    # sums values per target
+    return np.bincount(index, values, minlength=count)
+
+
+def displayPlane(displayArea=None, samples=None):
+    # returns (origin, xAxis, yAxis) so that a normalized point (x, y) is
+    # origin + x * xAxis + y * yAxis in the user coordinate system. From a
+    # tobiiresearch DisplayArea if given, otherwise fitted (least squares)
+    # to the 2D and 3D gaze points of the valid samples.
+    if displayArea is not None:
+        topLeft = np.array(displayArea.top_left, dtype=float)
+        return (topLeft, np.array(displayArea.top_right) - topLeft,
+                np.array(displayArea.bottom_left) - topLeft)
+    points2D = []
+    points3D = []
+    for eye in EYES:
+        valid = samples['Validity' + eye]
+        points2D.append(_column(samples[valid], eye,
+                                ('GazePointX', 'GazePointY')))
+        points3D.append(_column(samples[valid], eye,
+                                ('GazePoint3DX', 'GazePoint3DY',
+                                 'GazePoint3DZ')))
+    points2D = np.concatenate(points2D)
+    if len(points2D) < 3:
+        raise ValueError("Too few valid samples to find the display plane.")
+    design = np.column_stack((np.ones(len(points2D)), points2D))
+    plane = np.linalg.lstsq(design, np.concatenate(points3D), rcond=-1)[0]
+    return plane[0], plane[1], plane[2]
+
+
+def computeValidation(targets, samples, displayArea=None):
+    # targets is a sequence of normalized (x, y) target positions, samples
+    # a VALIDATION_DTYPE array (e.g. from ValidationCollector.samples).
+    # With a displayArea gaze points are mapped onto it, otherwise the
+    # tracker's 3D gaze points are used. Returns a ValidationReport; without
+    # valid gaze (participant lost, stream not started) all its values are
+    # NaN, so every target is weak.
+    targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+    count = len(targets)
+    index = samples['point']
+    points = np.zeros(count, dtype=POINT_DTYPE)
+    points['x'] = targets[:, 0]
+    points['y'] = targets[:, 1]
+    points['samples'] = np.bincount(index, minlength=count)
+    try:
+        origin, xAxis, yAxis = displayPlane(displayArea, samples)
+    except ValueError:
+        for eye in EYES:
+            for name in ('accuracy', 'rmsS2S', 'sd', 'valid', 'meanX',
+                         'meanY'):
+                points[name + eye] = np.nan
+        return ValidationReport(points)
+    targets3D = (origin + targets[:, :1] * xAxis +
+                 targets[:, 1:] * yAxis)[index]
+    # consecutive samples for the same target, for RMS-S2S
+    sameTarget = index[1:] == index[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for eye in EYES:
+            valid = samples['Validity' + eye]
+            gaze2D = _column(samples, eye, ('GazePointX', 'GazePointY'))
+            if displayArea is not None:
+                gaze3D = (origin + gaze2D[:, :1] * xAxis +
+                          gaze2D[:, 1:] * yAxis)
+            else:
+                gaze3D = _column(samples, eye, ('GazePoint3DX',
+                                                'GazePoint3DY',
+                                                'GazePoint3DZ'))
+            eyes = _column(samples, eye, ('EyePositionX', 'EyePositionY',
+                                          'EyePositionZ'))
+            directions = gaze3D - eyes
+            directions /= np.sqrt((directions ** 2).sum(axis=1))[:, None]
+            validIndex = index[valid]
+            validCount = np.bincount(validIndex,
+                                     minlength=count).astype(float)
+            # accuracy: mean angle between gaze and target directions
+            offsets = _angles(directions[valid],
+                              targets3D[valid] - eyes[valid])
+            points['accuracy' + eye] = _perPoint(validIndex, offsets,
+                                                 count) / validCount
+            # precision: RMS of the angles between consecutive samples
+            pairs = sameTarget & valid[1:] & valid[:-1]
+            steps = _angles(directions[1:][pairs], directions[:-1][pairs])
+            pairIndex = index[1:][pairs]
+            points['rmsS2S' + eye] = np.sqrt(
+                _perPoint(pairIndex, steps ** 2, count) /
+                np.bincount(pairIndex, minlength=count))
+            # precision: SD of the angles from the mean gaze direction
+            meanDirections = np.column_stack(
+                [_perPoint(validIndex, directions[valid, axis], count)
+                 for axis in range(3)])
+            deviations = _angles(directions[valid], meanDirections[validIndex])
+            points['sd' + eye] = np.sqrt(
+                _perPoint(validIndex, deviations ** 2, count) / validCount)
+            points['valid' + eye] = validCount / points['samples']
+            for axis, name in enumerate(('meanX', 'meanY')):
+                points[name + eye] = _perPoint(
+                    validIndex, gaze2D[valid, axis], count) / validCount
+    return ValidationReport(points)
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+#
+# Background writer for the Tobii controller's gaze data
+# - chunks of samples are formatted and written on a separate thread
+#   while recording continues, so stopping tracking only costs a final
+#   flush
+#
+
+import datetime
+import threading
+import Queue
+
+
+GAZE_COLUMNS = ['TimeStamp',
+                'GazePointXLeft',
+                'GazePointYLeft',
+                'PupilLeft',
+                'EyePositionXLeft',
+                'EyePositionYLeft',
+                'EyePositionZLeft',
+                'ValidityLeft',
+                'GazePointXRight',
+                'GazePointYRight',
+                'PupilRight',
+                'EyePositionXRight',
+                'EyePositionYRight',
+                'EyePositionZRight',
+                'ValidityRight']
+
+# Chunks waiting to be written, each holding up to DEFAULT_CHUNK_SIZE samples
+DEFAULT_MAX_CHUNKS = 64
+DEFAULT_CHUNK_SIZE = 600
+
+
+class CsvGazeSink(object):
+    """Writes gaze data in the comma separated layout the controller has
+    always used: a short recording header, then per tracking segment a
+    column header, one line per sample and one line per event."""
+
+    _rowFormat = ', '.join(['%.4f'] * 7 + ['%d'] +
+                           ['%.4f'] * 6 + ['%d']) + '\n'
+    _eventFormat = '%.4f' + ', ' * 14 + '%s\n'
+
+    def __init__(self, filename, resolution, date=None, time=None):
+        # date and time default to now, they are only given when converting
+        # an earlier recording
+        now = datetime.datetime.now()
+        if date is None:
+            date = now.strftime('%Y/%m/%d')
+        if time is None:
+            time = now.strftime('%H:%M:%S')
+        self.filename = filename
+        self.file = open(filename, 'w+')
+        self.file.write('Recording date:\t' + date + '\n')
+        self.file.write('Recording time:\t' + time + '\n')
+        self.file.write('Recording resolution\t%d x %d\n\n' %
+                        tuple(resolution))
+
+    def startSegment(self, timeStampStart):
+        self.file.write(', '.join(GAZE_COLUMNS + ['Event']) + '\n')
+
+    def writeSamples(self, samples, timeStampStart):
+        # format the whole chunk at once; tolist() hands back plain python
+        # numbers, which is much cheaper than formatting numpy scalars
+        columns = [((samples['TimeStamp'] - timeStampStart) /
+                    1000.0).tolist()]
+        columns.extend(samples[name].tolist() for name in GAZE_COLUMNS[1:])
+        rowFormat = self._rowFormat
+        self.file.write(''.join([rowFormat % row for row in zip(*columns)]))
+
+    def writeEvents(self, events, timeStampStart):
+        self.file.write(''.join([self._eventFormat %
+                                 ((t - timeStampStart) / 1000.0, e)
+                                 for t, e in events]))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class GazeDataWriter(threading.Thread):
+    """Drains a bounded queue of gaze data chunks into a sink.
+
+    All methods that queue data are meant to be called from the recording
+    side; only the writer thread ever touches the sink."""
+
+    def __init__(self, sink, maxChunks=DEFAULT_MAX_CHUNKS):
+        threading.Thread.__init__(self, name='GazeDataWriter')
+        self.daemon = True
+        self.sink = sink
+        self.error = None
+        self._queue = Queue.Queue(maxChunks)
+        self._pending = 0
+        self._pendingLock = threading.Lock()
+        self.start()
+
+    @property
+    def backlog(self):
+        # number of samples queued but not written to the sink yet
+        return self._pending
+
+    def full(self):
+        return self._queue.full()
+
+    def startSegment(self, timeStampStart):
+        self._queue.put(('startSegment', (timeStampStart,)))
+
+    def writeSamples(self, samples, timeStampStart):
+        # blocks while the queue is full
+        with self._pendingLock:
+            self._pending += len(samples)
+        self._queue.put(('writeSamples', (samples, timeStampStart)))
+
+    def writeEvents(self, events, timeStampStart):
+        self._queue.put(('writeEvents', (list(events), timeStampStart)))
+
+    def flush(self):
+        self._queue.put(('flush', ()))
+
+    def close(self):
+        # writes everything still queued, closes the sink and waits for the
+        # writer thread to finish
+        self._queue.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            method, args = item
+            if self.error is None:
+                try:
+                    getattr(self.sink, method)(*args)
+                except Exception as e:
+                    # keep draining so the recording side never blocks,
+                    # the error is raised again on close
+                    self.error = e
+            if method == 'writeSamples':
+                with self._pendingLock:
+                    self._pending -= len(args[0])
+        try:
+            self.sink.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
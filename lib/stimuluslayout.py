@@ -0,0 +1,150 @@
+#!/usr/bin/python
+#
+# Non-overlapping stimulus layouts, computed before the session
+# - every trial's circle positions are drawn at once for the whole trial
+#   list with numpy; circles that collide with an earlier one are redrawn
+#   for all colliding trials together (on a ring they are drawn from the
+#   free positions directly), so presenting a trial only has to assign
+#   positions
+# - layouts are seeded per subject, so the same subject always gets the
+#   same layouts, and they are saved with the trial list
+#
+
+import json
+import math
+import zlib
+
+import numpy as np
+
+
+# Circle diameter (pix) used by the experiments; two circles do not
+# overlap when their centres are at least this far apart
+DEFAULT_SIZE = 70
+
+# Candidate positions drawn per circle before a layout starts over, and
+# the number of times it may start over
+DEFAULT_MAX_TRIES = 100
+
+
+def subjectSeed(subject, phase=''):
+    # a stable 32 bit seed for a subject (and phase, e.g. 'practice'), the
+    # same on every machine and Python version
+    return zlib.crc32(('%s:%s' % (subject, phase)).encode('utf-8')) & \
+        0xffffffff
+
+
+def _box(rng, count, extent, margin):
+    # anywhere in one of the four quadrants, at least margin from the axes
+    signs = rng.choice([-1.0, 1.0], (count, 2))
+    return signs * (extent * rng.random_sample((count, 2)) + margin)
+
+
+def _place(sample, count, numCircles, size, maxTries):
+    # sample(n) returns n candidate positions as an (n, 2) array. Circles
+    # are placed one after the other; a trial whose next circle finds no
+    # free spot in maxTries candidates (earlier circles can leave no room)
+    # starts over, up to maxTries times.
+    layouts = np.empty((count, numCircles, 2))
+    minDistance2 = float(size) ** 2
+    pending = np.arange(count)
+    for restart in xrange(maxTries):
+        failed = []
+        for circle in xrange(numCircles):
+            todo = pending
+            for attempt in xrange(maxTries):
+                layouts[todo, circle] = sample(len(todo))
+                if circle == 0:
+                    break
+                offsets = (layouts[todo, :circle] -
+                           layouts[todo, circle][:, np.newaxis])
+                distances2 = (offsets ** 2).sum(axis=2)
+                todo = todo[(distances2 < minDistance2).any(axis=1)]
+                if not len(todo):
+                    break
+            if len(todo) and circle:
+                failed.append(todo)
+                pending = np.setdiff1d(pending, todo)
+        if not failed:
+            return layouts
+        pending = np.concatenate(failed)
+    raise ValueError("Could not place %d circles of size %s without "
+                     "overlap." % (numCircles, size))
+
+
+def ringLayouts(count, numCircles, radius=150, size=DEFAULT_SIZE, seed=None,
+                maxTries=DEFAULT_MAX_TRIES):
+    # returns a (count, numCircles, 2) array of circle centres (pix) at a
+    # fixed distance from the screen centre, on whole degrees. There are
+    # only 360 candidates, so instead of rejecting collisions every circle
+    # is drawn from the degrees the earlier circles left free.
+    if numCircles * size > 2 * math.pi * radius:
+        raise ValueError("%d circles of size %s do not fit on a ring of "
+                         "radius %s." % (numCircles, size, radius))
+    rng = np.random.RandomState(seed)
+    angles = np.radians(np.arange(360))
+    positions = np.column_stack((radius * np.sin(angles),
+                                 radius * np.cos(angles)))
+    offsets = positions[:, np.newaxis] - positions[np.newaxis]
+    # blocked[a, b]: a circle at degree a leaves no room for one at b
+    blocked = (offsets ** 2).sum(axis=2) < float(size) ** 2
+    layouts = np.empty((count, numCircles), dtype=int)
+    pending = np.arange(count)
+    for restart in xrange(maxTries):
+        free = np.ones((len(pending), 360), dtype=bool)
+        placed = np.ones(len(pending), dtype=bool)
+        for circle in xrange(numCircles):
+            counts = free.sum(axis=1)
+            # earlier circles can leave no room, such trials start over
+            placed &= counts > 0
+            picks = (rng.random_sample(len(pending)) *
+                     counts).astype(int)
+            degrees = (free.cumsum(axis=1) > picks[:, np.newaxis]).argmax(
+                axis=1)
+            layouts[pending, circle] = degrees
+            free &= ~blocked[degrees]
+        pending = pending[~placed]
+        if not len(pending):
+            return positions[layouts]
+    raise ValueError("Could not place %d circles of size %s without "
+                     "overlap." % (numCircles, size))
+
+
+def boxLayouts(count, numCircles, extent=150, margin=25, size=DEFAULT_SIZE,
+               seed=None, maxTries=DEFAULT_MAX_TRIES):
+    # returns a (count, numCircles, 2) array of circle centres (pix)
+    # between margin and margin + extent from both axes
+    rng = np.random.RandomState(seed)
+    return _place(lambda n: _box(rng, n, extent, margin), count, numCircles,
+                  size, maxTries)
+
+
+def assignLayouts(trials, layouts):
+    # stores each trial's layout in the trial dictionary, as a tuple of
+    # (x, y) tuples of plain floats
+    if len(trials) != len(layouts):
+        raise ValueError("Got %d layouts for %d trials." %
+                         (len(layouts), len(trials)))
+    for trial, layout in zip(trials, layouts.tolist()):
+        trial['layout'] = tuple(tuple(pos) for pos in layout)
+    return trials
+
+
+def saveTrialList(fileName, trials, **info):
+    # writes the trial list, layouts included, as JSON; info holds extra
+    # values to keep with it, such as the seed
+    with open(fileName, 'w') as f:
+        json.dump({'info': info, 'trials': trials}, f, indent=1,
+                  sort_keys=True)
+
+
+def loadTrialList(fileName):
+    # returns (trials, info) as written by saveTrialList
+    with open(fileName) as f:
+        saved = json.load(f)
+    trials = []
+    for trial in saved['trials']:
+        trial = dict((str(key), value) for key, value in trial.items())
+        if 'layout' in trial:
+            trial['layout'] = tuple(tuple(pos) for pos in trial['layout'])
+        trials.append(trial)
+    return trials, saved['info']
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+#
+# Reusable PsychoPy stimuli
+# - creating a TextStim rasterizes its glyphs and creating a Circle builds
+#   its vertices, both right before time critical flips when done per
+#   trial; the pool creates each stimulus once and afterwards only updates
+#   the attributes that changed, such as position, color or text
+#
+
+from psychopy import visual
+
+
+class StimulusPool(object):
+    """Hands out the same stimulus objects again for the same key.
+
+    The keyword arguments of the first request for a key are passed to the
+    constructor. Later requests set the given attributes on the existing
+    object, and only those whose value differs from the last one set, so
+    an unchanged text is not rasterized again:
+
+        circle = pool.circle(('circle', 0), size=70, units='pix',
+                             pos=layout[0])
+        label = pool.text('trialNum', text=trialNum+1, pos=(0,-.8))
+
+    Attributes changed on the object directly are not tracked, so change
+    any attribute that is also passed to the pool through the pool."""
+
+    def __init__(self, win):
+        self.win = win
+        self.created = 0
+        self.reused = 0
+        self._stimuli = {}
+
+    def _get(self, stimulusClass, key, attributes):
+        key = (stimulusClass, key)
+        try:
+            stimulus, values = self._stimuli[key]
+        except KeyError:
+            stimulus = stimulusClass(self.win, **attributes)
+            self._stimuli[key] = (stimulus, dict(attributes))
+            self.created += 1
+            return stimulus
+        for name, value in attributes.items():
+            if name not in values or values[name] != value:
+                setattr(stimulus, name, value)
+                values[name] = value
+        self.reused += 1
+        return stimulus
+
+    def circle(self, key, **attributes):
+        return self._get(visual.Circle, key, attributes)
+
+    def text(self, key, **attributes):
+        if 'text' in attributes:
+            # TextStim shows numbers as text, compare them as text too
+            attributes['text'] = unicode(attributes['text'])
+        return self._get(visual.TextStim, key, attributes)
+
+    def clear(self):
+        self._stimuli.clear()
@@ -10,7 +10,9 @@
 
 from tobii.eye_tracking_io.basic import EyetrackerException
 
-import datetime
+import collections
+import threading
+import time
 
 import tobii.eye_tracking_io.mainloop
 import tobii.eye_tracking_io.browsing
@@ -18,7 +20,7 @@ import tobii.eye_tracking_io.eyetracker
 import tobii.eye_tracking_io.time.clock
 import tobii.eye_tracking_io.time.sync
 
-from tobii.eye_tracking_io.types import Point2D
+from tobii.eye_tracking_io.types import Point2D, Calibration
 
 import psychopy.visual
 import psychopy.event
@@ -28,16 +30,48 @@ from psychopy.tools.monitorunittools import deg2pix
 
 import numpy as np
 
+from gazebuffer import GazeRingBuffer, DEFAULT_CAPACITY
+from gazewriter import CsvGazeSink, GazeDataWriter, DEFAULT_CHUNK_SIZE
+from gazerecording import BinaryGazeSink, encodeEvent
+from gazevalidation import ValidationCollector, computeValidation
+from calibrationstore import trackerKey
+from tobiiresearch.implementation.Errors import EyeTrackerInternalError
+
+
+# the display area corners as StoredCalibrationTracker hands them to
+# calibrationstore, named like a tobiiresearch DisplayArea's
+DisplayCorners = collections.namedtuple('DisplayCorners',
+                                        'top_left top_right bottom_left')
+
 
 class TobiiController:
 
-    def __init__(self, win):
+    def __init__(self, win, bufferCapacity=DEFAULT_CAPACITY,
+                 chunkSize=DEFAULT_CHUNK_SIZE):
         self.eyetracker = None
+        self.eyetrackerInfo = None
         self.eyetrackers = {}
         self.win = win
-        self.gazeData = []
+        self.gazeBuffer = GazeRingBuffer(bufferCapacity)
         self.eventData = []
         self.datafile = None
+        # samples are handed to the datafile writer in chunks of this size
+        # while tracking is still running
+        self.chunkSize = chunkSize
+        self.chunkLock = threading.Lock()
+        self.segmentStarted = False
+        self.tracking = False
+        # the last calibration, from GetCalibration
+        self.calib = None
+        self.computeCalibration_succeeded = False
+        # functions called with every gaze sample on the tracker's thread,
+        # e.g. fixationdetector.FixationDetector.onControllerGaze; replaced
+        # rather than modified so on_gazedata can iterate it without a lock
+        self.gazeListeners = ()
+        # set while the browser knows at least one eye tracker, and once
+        # activate's connection attempt has finished
+        self.eyetrackerFound = threading.Event()
+        self.eyetrackerCreated = threading.Event()
 
         tobii.eye_tracking_io.init()
         self.clock = tobii.eye_tracking_io.time.clock.Clock()
@@ -46,11 +80,20 @@ class TobiiController:
         self.browser = tobii.eye_tracking_io.browsing.EyetrackerBrowser(
             self.mainloop_thread, self.on_eyetracker_browser_event)
 
-    def waitForFindEyeTracker(self):
-        while len(self.eyetrackers.keys()) == 0:
-            psychopy.core.wait(0.1)
+    def waitForFindEyeTracker(self, timeout=None):
+        # the browser runs in the background from the start, so this
+        # returns as soon as the first eye tracker has answered, or right
+        # away if one has already. Returns False if timeout (seconds) runs
+        # out first.
+        if timeout is not None:
+            deadline = psychopy.core.getTime() + timeout
+        while not self.eyetrackerFound.wait(0.01):
             if psychopy.event.getKeys(keyList=['escape']):
                 raise KeyboardInterrupt("You interrupted the script.")
+            if (timeout is not None and
+                    psychopy.core.getTime() >= deadline):
+                return False
+        return True
 
     def on_eyetracker_browser_event(self,
                                     event_type,
@@ -60,16 +103,21 @@ class TobiiController:
         # internal list of eyetracker_info objects
         if event_type is tobii.eye_tracking_io.browsing.EyetrackerBrowser.FOUND:
             self.eyetrackers[eyetracker_info.product_id] = eyetracker_info
+            self.eyetrackerFound.set()
             return False
 
         # Otherwise we remove the tracker from the treeview and the
         # eyetracker_info list...
-        del self.eyetrackers[eyetracker_info.product_id]
+        self.eyetrackers.pop(eyetracker_info.product_id, None)
 
         # ...and add it again if it is an update message
         if event_type is (tobii.eye_tracking_io.browsing.
                           EyetrackerBrowser.UPDATED):
             self.eyetrackers[eyetracker_info.product_id] = eyetracker_info
+        if self.eyetrackers:
+            self.eyetrackerFound.set()
+        else:
+            self.eyetrackerFound.clear()
         return False
 
     def destroy(self):
@@ -84,6 +132,7 @@ class TobiiController:
     def activate(self, eyetracker):
         eyetracker_info = self.eyetrackers[eyetracker]
         print "Connecting to:", eyetracker_info
+        self.eyetrackerCreated.clear()
         (tobii.eye_tracking_io.
          eyetracker.Eyetracker.
          create_async(self.mainloop_thread,
@@ -92,10 +141,11 @@ class TobiiController:
                                                              eyetracker,
                                                              eyetracker_info)))
 
-        while self.eyetracker is None:
-            psychopy.core.wait(0.1)
+        while not self.eyetrackerCreated.wait(0.01):
             if psychopy.event.getKeys(keyList=['escape']):
                 raise KeyboardInterrupt("You interrupted the script.")
+        if self.eyetracker is None:
+            raise ValueError("Could not connect to %s." % eyetracker_info)
         self.syncmanager = tobii.eye_tracking_io.time.sync.SyncManager(
             self.clock, eyetracker_info, self.mainloop_thread)
 
@@ -109,9 +159,12 @@ class TobiiController:
                        "<b>Details:</b> <i>%s</i>") % error
             else:
                 print "Could not connect to %s" % (eyetracker_info)
+            self.eyetrackerCreated.set()
             return False
 
         self.eyetracker = eyetracker
+        self.eyetrackerInfo = eyetracker_info
+        self.eyetrackerCreated.set()
 
     ############################################################################
     # calibration methods
@@ -146,9 +199,9 @@ class TobiiController:
                                             units='norm', lineWidth=3,
                                             width=0.5, height=0.5,
                                             autoDraw=True)
-        # Start tracking
-        self.datafile = None  # we don't want to save this data
-        self.startTracking()
+        # Start tracking; the data file is kept aside, we don't want to
+        # save this data
+        ownTracking = self.startGazeStream()
         psychopy.core.wait(0.1)
         self.response = []
         while not self.response:
@@ -176,7 +229,7 @@ class TobiiController:
             self.response = psychopy.event.getKeys(keyList=['space', 'escape'])
             psychopy.core.wait(0.01)
         # Once responded, stop tracking
-        self.stopTracking()
+        self.stopGazeStream(ownTracking)
         if 'escape' in self.response:
             raise KeyboardInterrupt("You interrupted the script manually.")
         else:
@@ -192,7 +245,19 @@ class TobiiController:
     def doCalibration(self, calibrationPoints=[(0.5, 0.5), (0.1, 0.9),
                                                (0.1, 0.1), (0.9, 0.9),
                                                (0.9, 0.1)],
-                      calinRadius=2.0, caloutRadius=None, moveFrames=60):
+                      calinRadius=2.0, caloutRadius=None, moveFrames=60,
+                      settleTime=0.2, settleMargin=150, maxSettleTime=1.0,
+                      redoPoints=None):
+        # redoPoints: collect only these of the calibrationPoints again;
+        # their old data is removed and the data of the other points is
+        # kept, see weakCalibrationPoints. By default the old calibration
+        # is cleared and every point is collected.
+        # settleTime, settleMargin and maxSettleTime: a point is added once
+        # gaze stayed within settleMargin pixels of it for settleTime
+        # seconds, or when maxSettleTime seconds passed since the dot
+        # arrived there (e.g. if the tracker sends no gaze while
+        # calibrating); the margin is wide because the old calibration is
+        # cleared first
         if self.eyetracker is None:
             return
 
@@ -203,7 +268,10 @@ class TobiiController:
             calibrationPoints = [(0.5, 0.5), (0.1, 0.9),
                                  (0.1, 0.1), (0.9, 0.9), (0.9, 0.1)]
 
-        self.points = np.random.permutation(calibrationPoints)
+        if redoPoints is None:
+            self.points = np.random.permutation(calibrationPoints)
+        else:
+            self.points = np.random.permutation(redoPoints)
 
         # Make the "outer" circle
         self.calout = psychopy.visual.Circle(self.win, radius=caloutRadius,
@@ -224,15 +292,29 @@ class TobiiController:
             psychopy.core.wait(0.1)
             if psychopy.event.getKeys(keyList=['escape']):
                 raise KeyboardInterrupt("You interrupted the script.")
-        self.deletecalibration_completed = False
-        # Clear out previous calibrations (tobii scanners
-        # sometimes store these across many sessions)
-        print "Delete old calibration..."
-        self.eyetracker.ClearCalibration(callback=self.on_calib_deleted)
-        while not self.deletecalibration_completed:
-            psychopy.core.wait(0.1)
-            if psychopy.event.getKeys(keyList=['escape']):
-                raise KeyboardInterrupt("You interrupted the script.")
+        if redoPoints is None:
+            self.deletecalibration_completed = False
+            # Clear out previous calibrations (tobii scanners
+            # sometimes store these across many sessions)
+            print "Delete old calibration..."
+            self.eyetracker.ClearCalibration(callback=self.on_calib_deleted)
+            while not self.deletecalibration_completed:
+                psychopy.core.wait(0.1)
+                if psychopy.event.getKeys(keyList=['escape']):
+                    raise KeyboardInterrupt("You interrupted the script.")
+        else:
+            # Only remove the data of the points that are collected again
+            print "Remove %d calibration point(s)..." % len(self.points)
+            for point in self.points:
+                p = Point2D()
+                p.x, p.y = point
+                self.remove_point_completed = threading.Event()
+                self.eyetracker.RemoveCalibrationPoint(
+                    p, callback=self.on_remove_completed)
+                while not self.remove_point_completed.wait(0.01):
+                    if psychopy.event.getKeys(keyList=['escape']):
+                        raise KeyboardInterrupt("You interrupted the "
+                                                "script.")
 
         # Draw instructions and wait for space key
         self.calmsg.text = ("Please focus your eyes on the green dot, and "
@@ -243,48 +325,18 @@ class TobiiController:
         self.win.flip()
         psychopy.event.waitKeys(keyList=['space'])
 
-        # Go through the calibration points
-        for self.point_index in range(len(self.points)):
-            # The dot starts at the previous point
-            self.calout.pos = \
-                self.acsd2pix((self.points[self.point_index - 1][0],
-                               self.points[self.point_index - 1][1]))
-            # The steps for the movement is new - old divided by frames
-            self.step = (self.acsd2pix((self.points[self.point_index][0],
-                                        self.points[self.point_index][1])) -
-                         self.calout.pos) / moveFrames
-
-            # Create a tobii 2D class
-            p = Point2D()
-            # Add the X and Y coordinates to the tobii point
-            p.x, p.y = self.points[self.point_index]
-
-            # Move the point in position (smooth pursuit)
-            for frame in range(moveFrames):
-                self.calout.pos += self.step
-                # draw & flip
-                self.win.flip()
-
-            # Shrink the outer point (gaze fixation)
-            for frame in range(moveFrames / 2):
-                self.calout.radius -= (caloutRadius -
-                                       calinRadius) / (moveFrames / 2)
-                self.win.flip()
-
-            # Add this point to the tobii
-            psychopy.core.wait(1)  # first wait to let the eyes settle (MIN 0.5)
-            self.add_point_completed = False  # this gets updated by callback
-            self.eyetracker.AddCalibrationPoint(p,
-                                                callback=self.on_add_completed)
-            # While this point is being added, do nothing:
-            while not self.add_point_completed:
-                psychopy.core.wait(0.1)
-                if psychopy.event.getKeys(keyList=['escape']):
-                    raise KeyboardInterrupt("You interrupted the script.")
-            psychopy.core.wait(0.5)  # wait before continuing
-
-            # Reset the radius of the large circle
-            self.calout.radius = caloutRadius
+        # Go through the calibration points. Gaze is checked while the dot
+        # shrinks; a point is added as soon as gaze has settled on it, and
+        # the dot moves on as soon as the tracker has added it.
+        ownTracking = self.startGazeStream()
+        try:
+            for self.point_index in range(len(self.points)):
+                self.calibratePoint(self.points[self.point_index - 1],
+                                    self.points[self.point_index],
+                                    calinRadius, caloutRadius, moveFrames,
+                                    settleTime, settleMargin, maxSettleTime)
+        finally:
+            self.stopGazeStream(ownTracking)
 
         # After calibration, make sure the stimuli aren't drawn
         self.calout.autoDraw = False
@@ -355,7 +407,7 @@ class TobiiController:
                                                                  d['right'].
                                                                  map_point.y)))
                                              ).draw()
-                for p in self.points:
+                for p in calibrationPoints:
                     psychopy.visual.Circle(self.win, radius=calinRadius,
                                            fillColor=1,
                                            units='pix',
@@ -383,6 +435,258 @@ class TobiiController:
 
         return retval
 
+    def doValidation(self, validationPoints=[(0.3, 0.3), (0.7, 0.3),
+                                             (0.3, 0.7), (0.7, 0.7),
+                                             (0.5, 0.1), (0.9, 0.5),
+                                             (0.5, 0.9), (0.1, 0.5)],
+                     radius=10, moveFrames=30, settleTime=0.5, sampleTime=1.0,
+                     displayArea=None):
+        # shows the validation points (acsd) in random order and collects
+        # gaze on each for sampleTime seconds, starting settleTime seconds
+        # after the dot arrived. The default points lie between the
+        # default calibration points, so the calibration is not validated
+        # on the points it was fitted to. Returns a gazevalidation.ValidationReport
+        # with the points in the order given; with a tobiiresearch
+        # displayArea the angles are computed on it, otherwise on the
+        # tracker's 3D gaze points.
+        if self.eyetracker is None:
+            return
+
+        collector = ValidationCollector()
+        dot = psychopy.visual.Circle(self.win, radius=radius,
+                                     lineColor=(0, 1.0, 0),
+                                     fillColor=(0.5, 1.0, 0.5),
+                                     units='pix', autoDraw=True,
+                                     pos=self.acsd2pix(validationPoints[0]))
+        previous = validationPoints[0]
+        ownTracking = self.startGazeStream()
+        self.addGazeListener(collector.onControllerGaze)
+        try:
+            for index in np.random.permutation(len(validationPoints)):
+                point = validationPoints[index]
+                # move the dot over (smooth pursuit)
+                start = np.array(self.acsd2pix(previous))
+                step = (np.array(self.acsd2pix(point)) - start) / moveFrames
+                for frame in range(1, moveFrames + 1):
+                    dot.pos = start + step * frame
+                    self.win.flip()
+                previous = point
+                arrived = psychopy.core.getTime()
+                collecting = False
+                while psychopy.core.getTime() - arrived < (settleTime +
+                                                           sampleTime):
+                    if (not collecting and
+                            psychopy.core.getTime() - arrived >= settleTime):
+                        collector.start(index)
+                        collecting = True
+                    self.win.flip()
+                    if psychopy.event.getKeys(keyList=['escape']):
+                        raise KeyboardInterrupt("You interrupted the script.")
+                collector.stop()
+        finally:
+            self.removeGazeListener(collector.onControllerGaze)
+            self.stopGazeStream(ownTracking)
+            dot.autoDraw = False
+        self.win.flip()
+
+        return computeValidation(validationPoints, collector.samples(),
+                                 displayArea)
+
+    def weakCalibrationPoints(self, calibrationPoints, minUsed=0.5):
+        # returns the calibrationPoints (acsd) that need their data collected
+        # again: those for which less than minUsed of either eye's samples
+        # were used in the last calibration, or that have no data at all.
+        # Returns every point if there is no calibration.
+        if self.calib is None or not self.computeCalibration_succeeded:
+            return list(calibrationPoints)
+        used = {}
+        for data in self.calib.plot_data:
+            key = (round(data.true_point.x, 4), round(data.true_point.y, 4))
+            counts = used.setdefault(key, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += data.left.status == 1
+            counts[2] += data.right.status == 1
+        weak = []
+        for point in calibrationPoints:
+            counts = used.get((round(point[0], 4), round(point[1], 4)))
+            if (counts is None or
+                    min(counts[1], counts[2]) < minUsed * counts[0]):
+                weak.append(tuple(point))
+        return weak
+
+    def nearestCalibrationPoints(self, points, calibrationPoints):
+        # returns the calibrationPoints (acsd) closest to any of points,
+        # e.g. to the weak points of a validation; a point halfway between
+        # calibration points gives all of them
+        nearest = set()
+        for x, y in points:
+            distances = [np.hypot(cx - x, cy - y)
+                         for cx, cy in calibrationPoints]
+            closest = min(distances)
+            nearest.update(tuple(c) for c, d in zip(calibrationPoints,
+                                                     distances)
+                           if d <= closest + 1e-6)
+        return [tuple(c) for c in calibrationPoints if tuple(c) in nearest]
+
+    def offerStoredCalibration(self, store, participant,
+                               validationPoints=[(0.3, 0.3), (0.7, 0.3),
+                                                 (0.3, 0.7), (0.7, 0.7),
+                                                 (0.5, 0.1), (0.9, 0.5),
+                                                 (0.5, 0.9), (0.1, 0.5)]):
+        # asks whether to reapply the calibration the calibrationstore.
+        # CalibrationStore holds for participant on this eye tracker and
+        # display. Returns True if it was reapplied and validates, False if
+        # the participant has to be calibrated; a reapplied calibration
+        # that fails validation is evicted.
+        if self.eyetracker is None:
+            return False
+        tracker = StoredCalibrationTracker(self)
+        try:
+            key = trackerKey(tracker, participant)
+        except EyeTrackerInternalError as e:
+            print "Could not look up a stored calibration:", e
+            return False
+        info = store.info(key)
+        if info is None or store.load(key) is None:
+            return False
+
+        msg = psychopy.visual.TextStim(self.win, color=0.0, units='norm',
+                                       height=0.07, pos=(0.0, -0.5))
+        msg.text = ("There is a calibration from %s for this participant.\n"
+                    "(Reapply:[a] Calibrate:[c] Abort:[ESC])" %
+                    time.strftime('%Y/%m/%d %H:%M',
+                                  time.localtime(info['saved'])))
+        msg.draw()
+        self.win.flip()
+        self.response = psychopy.event.waitKeys(keyList=['a', 'c', 'escape'])
+        self.win.flip()
+        if 'escape' in self.response:
+            raise KeyboardInterrupt("You interrupted the script.")
+        if 'c' in self.response:
+            return False
+
+        print "Reapply the stored calibration..."
+        if not store.applyTo(tracker, participant):
+            print "The stored calibration could not be applied."
+            return False
+        report = self.doValidation(validationPoints)
+        print report
+        if report.weakPoints():
+            store.evict(key)
+            return False
+        return True
+
+    def saveCalibration(self, store, participant, report=None):
+        # keeps the accepted calibration in store for participant's next
+        # session; report is its gazevalidation.ValidationReport. Returns
+        # False if it was not saved, the session goes on either way.
+        accuracy = None
+        if report is not None:
+            accuracy = float(np.mean([report.accuracy[eye]
+                                      for eye in ('Left', 'Right')]))
+        try:
+            return store.saveFrom(StoredCalibrationTracker(self),
+                                  participant, accuracy=accuracy)
+        except (ValueError, EyeTrackerInternalError) as e:
+            print "Could not save the calibration:", e
+            return False
+
+    def applyCalibration(self, data):
+        # makes the eye tracker use calibration data from an earlier
+        # GetCalibration (Calibration.rawData); raises ValueError if the
+        # data is no calibration and EyetrackerException if the tracker
+        # fails
+        try:
+            calib = Calibration(data)
+        except Exception:
+            # the SDK has no error of its own for data it cannot parse
+            raise ValueError("The data is not a calibration.")
+        self._request(self.eyetracker.SetCalibration, calib)
+        self.calib = calib
+        self.computeCalibration_succeeded = True
+
+    def getDisplayCorners(self):
+        # returns the top left, top right and bottom left corner of the
+        # display in the user coordinate system (mm), from the tracker's
+        # x configuration
+        config = self._request(self.eyetracker.GetXConfiguration)
+        return tuple((p.x, p.y, p.z) for p in (config.UpperLeft,
+                                               config.UpperRight,
+                                               config.LowerLeft))
+
+    def _request(self, method, *args):
+        # calls an asynchronous SDK method, waits for its callback and
+        # returns the response; raises EyetrackerException on an error
+        done = threading.Event()
+        result = {}
+
+        def callback(error, response):
+            result['error'] = error
+            result['response'] = response
+            done.set()
+            return False
+
+        method(*args, callback=callback)
+        while not done.wait(0.01):
+            if psychopy.event.getKeys(keyList=['escape']):
+                raise KeyboardInterrupt("You interrupted the script.")
+        if result['error']:
+            raise EyetrackerException(result['error'])
+        return result['response']
+
+    def calibratePoint(self, previous, point, calinRadius, caloutRadius,
+                       moveFrames, settleTime, settleMargin, maxSettleTime):
+        # moves the dot from the previous point (acsd) to point, shrinks it
+        # and adds the point once gaze has settled on it
+        target = self.acsd2pix((point[0], point[1]))
+        self.calout.radius = caloutRadius
+        self.calout.pos = self.acsd2pix((previous[0], previous[1]))
+        # The steps for the movement is new - old divided by frames
+        self.step = (target - self.calout.pos) / moveFrames
+
+        # Create a tobii 2D class
+        p = Point2D()
+        # Add the X and Y coordinates to the tobii point
+        p.x, p.y = point
+
+        # Move the point in position (smooth pursuit)
+        for frame in range(moveFrames):
+            self.calout.pos += self.step
+            # draw & flip
+            self.win.flip()
+
+        # From here on gaze is watched on the tracker's thread
+        settled = threading.Event()
+        check = self.fixationCheck(target, settled, bothEyes=False,
+                                   errorMargin=settleMargin,
+                                   dwellTime=settleTime)
+        self.addGazeListener(check)
+        arrived = psychopy.core.getTime()
+        try:
+            # Shrink the outer point (gaze fixation)
+            for frame in range(moveFrames / 2):
+                self.calout.radius -= (caloutRadius -
+                                       calinRadius) / (moveFrames / 2)
+                self.win.flip()
+            # Keep flipping until the eyes have settled (MIN settleTime)
+            while (not settled.is_set() and
+                   psychopy.core.getTime() - arrived < maxSettleTime):
+                self.win.flip()
+                if psychopy.event.getKeys(keyList=['escape']):
+                    raise KeyboardInterrupt("You interrupted the script.")
+        finally:
+            self.removeGazeListener(check)
+
+        # Add this point to the tobii; the display keeps running while the
+        # tracker collects data
+        self.add_point_completed = threading.Event()
+        self.eyetracker.AddCalibrationPoint(p,
+                                            callback=self.on_add_completed)
+        while not self.add_point_completed.is_set():
+            self.win.flip()
+            if psychopy.event.getKeys(keyList=['escape']):
+                raise KeyboardInterrupt("You interrupted the script.")
+
     # The following are given as callback functions to the tobii SDK
     def on_calib_deleted(self, error, r):
         if error:
@@ -400,11 +704,18 @@ class TobiiController:
 
     def on_add_completed(self, error, r):
         if error:
+            # the point simply has no data, ComputeCalibration tells
             print ("Add Calibration Point failed because of error "
                    "(0x%0x)" % error)
-            return False
+        self.add_point_completed.set()
+        return False
 
-        self.add_point_completed = True
+    def on_remove_completed(self, error, r):
+        if error:
+            # e.g. the point had no data, it is collected again anyway
+            print ("Remove Calibration Point failed because of error "
+                   "(0x%0x)" % error)
+        self.remove_point_completed.set()
         return False
 
     def on_calib_compute(self, error, r):
@@ -450,134 +761,270 @@ class TobiiController:
     ############################################################################
 
     def startTracking(self):
-        # creates a gaze data list and starts tobii tracking, appending
-        # each data point to the list
-        self.gazeData = []
+        # empties the gaze buffer and starts tobii tracking, writing
+        # each data point into the buffer
+        self.gazeBuffer.clear()
         self.eventData = []
+        self.segmentStarted = False
         self.eyetracker.events.OnGazeDataReceived += self.on_gazedata
         self.eyetracker.StartTracking()
+        self.tracking = True
 
     def stopTracking(self):
         # stops tobii tracking, writes data to file, and empties the
-        # gaze data list
+        # gaze buffer
         self.eyetracker.StopTracking()
         self.eyetracker.events.OnGazeDataReceived -= self.on_gazedata
+        self.tracking = False
         self.flushData()
-        self.gazeData = []
+        self.gazeBuffer.clear()
         self.eventData = []
 
     def on_gazedata(self, error, gaze):
-        # this gets called by tobii when its event OnGazeDataReceived fires
-        self.gazeData.append(gaze)
+        # this gets called by tobii when its event OnGazeDataReceived fires;
+        # the sample is copied into the preallocated buffer so no sdk
+        # objects are kept alive
+        self.gazeBuffer.append((gaze.Timestamp,
+                                gaze.LeftGazePoint2D.x,
+                                gaze.LeftGazePoint2D.y,
+                                gaze.LeftPupil,
+                                gaze.LeftEyePosition3D.x,
+                                gaze.LeftEyePosition3D.y,
+                                gaze.LeftEyePosition3D.z,
+                                gaze.LeftValidity,
+                                gaze.RightGazePoint2D.x,
+                                gaze.RightGazePoint2D.y,
+                                gaze.RightPupil,
+                                gaze.RightEyePosition3D.x,
+                                gaze.RightEyePosition3D.y,
+                                gaze.RightEyePosition3D.z,
+                                gaze.RightValidity))
+        for listener in self.gazeListeners:
+            listener(gaze)
+        # hand full chunks to the writer thread, but never wait for it here;
+        # if its queue is full the samples simply stay in the buffer
+        if (self.datafile is not None and
+                self.gazeBuffer.unread >= self.chunkSize and
+                not self.datafile.full()):
+            self.queueSamples()
+
+    def addGazeListener(self, listener):
+        # listener(gaze) is called with the Tobii SDK gaze data of every
+        # sample while tracking; it runs on the tracker's thread, so it
+        # must be quick
+        self.gazeListeners = self.gazeListeners + (listener,)
+
+    def removeGazeListener(self, listener):
+        self.gazeListeners = tuple(l for l in self.gazeListeners
+                                   if l != listener)
+
+    def queueSamples(self):
+        # moves the unread samples from the gaze buffer to the writer
+        with self.chunkLock:
+            datafile = self.datafile
+            if datafile is None or self.gazeBuffer.unread == 0:
+                return
+            timeStampStart = self.gazeBuffer.firstTimeStamp
+            if not self.segmentStarted:
+                datafile.startSegment(timeStampStart)
+                self.segmentStarted = True
+            datafile.writeSamples(self.gazeBuffer.drain(), timeStampStart)
 
     def getGazePosition(self, gaze):
-        # returns gaze position in pixl relative to center
-        return (self.acsd2pix((gaze.LeftGazePoint2D.x,
-                               gaze.LeftGazePoint2D.y)),
-                self.acsd2pix((gaze.RightGazePoint2D.x,
-                               gaze.RightGazePoint2D.y)))
+        # returns gaze position in pixl relative to center for a sample
+        # taken from the gaze buffer
+        return (self.acsd2pix((gaze['GazePointXLeft'],
+                               gaze['GazePointYLeft'])),
+                self.acsd2pix((gaze['GazePointXRight'],
+                               gaze['GazePointYRight'])))
 
     def getCurrentGazePosition(self):
         # returns the most recent gaze data point
         # format is ((left.x, left.y), (right.x, right.y))
-        if len(self.gazeData) == 0:
+        lastGaze = self.gazeBuffer.latest()
+        if lastGaze is None:
             return (None, None, None, None)
         else:
-            return self.getGazePosition(self.gazeData[-1])
+            return self.getGazePosition(lastGaze)
 
     def getCurrentGazeAverage(self):
         # returns the most recent average gaze position
         # x and y
-        if len(self.gazeData) == 0:
+        lastGaze = self.gazeBuffer.latest()
+        if lastGaze is None:
             return (None, None, None, None)
         else:
-            lastGaze = self.gazeData[-1]
-            if lastGaze.LeftValidity != 4 and lastGaze.RightValidity != 4:
+            if (lastGaze['ValidityLeft'] != 4 and
+                    lastGaze['ValidityRight'] != 4):
                 # return average data
-                return self.acsd2pix((np.mean((lastGaze.LeftGazePoint2D.x,
-                                               lastGaze.RightGazePoint2D.x)),
-                                      np.mean((lastGaze.LeftGazePoint2D.y,
-                                               lastGaze.RightGazePoint2D.y))))
-            elif lastGaze.LeftValidity != 4 and lastGaze.RightValidity == 4:
+                return self.acsd2pix((np.mean((lastGaze['GazePointXLeft'],
+                                               lastGaze['GazePointXRight'])),
+                                      np.mean((lastGaze['GazePointYLeft'],
+                                               lastGaze['GazePointYRight']))))
+            elif (lastGaze['ValidityLeft'] != 4 and
+                    lastGaze['ValidityRight'] == 4):
                 # only return left data
-                return self.acsd2pix(lastGaze.LeftGazePoint2D.x,
-                                     lastGaze.LeftGazePoint2D.y)
-            elif lastGaze.LeftValidity == 4 and lastGaze.RightValidity != 4:
+                return self.acsd2pix((lastGaze['GazePointXLeft'],
+                                      lastGaze['GazePointYLeft']))
+            elif (lastGaze['ValidityLeft'] == 4 and
+                    lastGaze['ValidityRight'] != 4):
                 # only return right data
-                return self.acsd2pix(lastGaze.RightGazePoint2D.x,
-                                     lastGaze.RightGazePoint2D.y)
+                return self.acsd2pix((lastGaze['GazePointXRight'],
+                                      lastGaze['GazePointYRight']))
 
     def getCurrentValidity(self):
-        if len(self.gazeData) == 0:
+        lastGaze = self.gazeBuffer.latest()
+        if lastGaze is None:
             return (None, None, None, None)
         else:
-            return (self.gazeData[-1].LeftValidity,
-                    self.gazeData[-1].RightValidity)
+            return (lastGaze['ValidityLeft'],
+                    lastGaze['ValidityRight'])
 
     def waitForFixation(self, fixationPoint=(0, 0),
-                        bothEyes=True, errorMargin=0.1):
+                        bothEyes=True, errorMargin=50, dwellTime=0.1,
+                        timeout=None):
         # this function waits until the eye tracker detects one (or both)
-        # eyes to be at a certain point, +- some margin of error
-        # fixation point should be given in pixels
-        # first, make sure data is not saved:
+        # eyes to be at a certain point, +- some margin of error, for at
+        # least dwellTime seconds. fixationPoint and errorMargin are given in
+        # pixels. Every sample is checked on the tracker's thread as it
+        # arrives, so this returns as soon as the dwell time is reached.
+        # Returns True on fixation and False if timeout (seconds) runs out.
+        fixated = threading.Event()
+        check = self.fixationCheck(fixationPoint, fixated, bothEyes,
+                                   errorMargin, dwellTime)
+
+        ownTracking = self.startGazeStream()
+        self.addGazeListener(check)
+        try:
+            if timeout is not None:
+                deadline = psychopy.core.getTime() + timeout
+            while not fixated.wait(0.01):
+                if psychopy.event.getKeys(keyList=['escape']):
+                    raise KeyboardInterrupt("You interrupted the script.")
+                if (timeout is not None and
+                        psychopy.core.getTime() >= deadline):
+                    return False
+            return True
+        finally:
+            self.removeGazeListener(check)
+            self.stopGazeStream(ownTracking)
+
+    def fixationCheck(self, fixationPoint, fixated, bothEyes=True,
+                      errorMargin=50, dwellTime=0.1):
+        # returns a gaze listener that sets the threading.Event fixated once
+        # one (or both) eyes stayed within errorMargin pixels of
+        # fixationPoint (pixels) for dwellTime seconds
+        # timestamp of the first sample of the current run inside the margin
+        inside = [None]
+
+        def check(gaze):
+            leftValid = gaze.LeftValidity != 4
+            rightValid = gaze.RightValidity != 4
+            if not (leftValid and rightValid or
+                    not bothEyes and (leftValid or rightValid)):
+                inside[0] = None
+                return
+            if leftValid and rightValid:
+                x = (gaze.LeftGazePoint2D.x + gaze.RightGazePoint2D.x) / 2
+                y = (gaze.LeftGazePoint2D.y + gaze.RightGazePoint2D.y) / 2
+            elif leftValid:
+                x, y = gaze.LeftGazePoint2D.x, gaze.LeftGazePoint2D.y
+            else:
+                x, y = gaze.RightGazePoint2D.x, gaze.RightGazePoint2D.y
+            x, y = self.acsd2pix((x, y))
+            if (abs(x - fixationPoint[0]) >= errorMargin or
+                    abs(y - fixationPoint[1]) >= errorMargin):
+                inside[0] = None
+                return
+            if inside[0] is None:
+                inside[0] = gaze.Timestamp
+            if gaze.Timestamp - inside[0] >= dwellTime * 1e6:
+                fixated.set()
+
+        return check
+
+    def startGazeStream(self):
+        # makes sure gaze listeners get samples; an ongoing recording keeps
+        # running, otherwise tracking is started without a data file so
+        # nothing is saved. Returns whether tracking was started here.
+        if self.tracking:
+            return False
         self.datafile_temp, self.datafile = self.datafile, None
-        self.startTracking()  # kick off tracking
-        psychopy.core.wait(0.5)  # allow the tracker to gather some data
-        while (abs(self.getCurrentGazeAverage()[0] -
-                   fixationPoint[0]) < errorMargin and
-               abs(self.getCurrentGazeAverage()[1] -
-                   fixationPoint[1]) < errorMargin and
-               (not bothEyes or (self.getCurrentValidity()[0] != 4 and
-                                 self.getCurrentValidity()[1] != 4))):
-            psychopy.core.wait(0.05)  # wait 50ms before checking again
-        self.stopTracking()  # stop tracking
-        # then restore data file so tracking can continue
-        self.datafile, self.datafile_temp = self.datafile_temp, None
+        self.startTracking()
+        return True
+
+    def stopGazeStream(self, ownTracking):
+        if ownTracking:
+            self.stopTracking()
+            # then restore data file so tracking can continue
+            self.datafile, self.datafile_temp = self.datafile_temp, None
 
     def getCurrentEyePosition(self):
         # returns the most recent eye position
-        if len(self.gazeData) == 0:
+        self.gaze = self.gazeBuffer.latest()
+        if self.gaze is None:
             return((None, None, None), (None, None, None))
         else:
-            self.gaze = self.gazeData[-1]
-            return ((self.gaze.LeftEyePosition3D.x,
-                     self.gaze.LeftEyePosition3D.y,
-                     self.gaze.LeftEyePosition3D.z),
-                    (self.gaze.RightEyePosition3D.x,
-                     self.gaze.RightEyePosition3D.y,
-                     self.gaze.RightEyePosition3D.z))
+            return ((self.gaze['EyePositionXLeft'],
+                     self.gaze['EyePositionYLeft'],
+                     self.gaze['EyePositionZLeft']),
+                    (self.gaze['EyePositionXRight'],
+                     self.gaze['EyePositionYRight'],
+                     self.gaze['EyePositionZRight']))
 
     def getCurrentPupilSize(self):
-        if len(self.gazeData) == 0:
-            return(none, none)
+        lastGaze = self.gazeBuffer.latest()
+        if lastGaze is None:
+            return(None, None)
         else:
-            return(self.gazeData[-1].LeftPupil,
-                   self.gazeData[-1].RightPupil)
-
-    def setDataFile(self, filename):
+            return(lastGaze['PupilLeft'],
+                   lastGaze['PupilRight'])
+
+    def setDataFile(self, filename, fileFormat='csv'):
+        # fileFormat is 'csv' for the text layout or 'binary' for a
+        # recording that can be opened with gazerecording.GazeRecording.
+        # A data file set before is closed first, with everything recorded
+        # for it so far.
+        if fileFormat not in ('csv', 'binary'):
+            raise ValueError("Unknown data file format %r." % fileFormat)
+        if self.datafile is not None:
+            self.closeDataFile()
         if filename is None:
-            self.datafile = None
+            return
+        print 'set datafile ' + filename
+        if fileFormat == 'csv':
+            sink = CsvGazeSink(filename, self.win.size)
         else:
-            print 'set datafile ' + filename
-            self.datafile = open(filename, 'w+')
-            self.datafile.write('Recording date:\t' +
-                                datetime.datetime.now().strftime('%Y/%m/%d') +
-                                '\n')
-            self.datafile.write('Recording time:\t' +
-                                datetime.datetime.now().strftime('%H:%M:%S') +
-                                '\n')
-            self.datafile.write('Recording resolution\t%d x %d\n\n' %
-                                tuple(self.win.size))
+            sink = BinaryGazeSink(filename, self.win.size)
+        # the file is written by a background thread from now on
+        writer = GazeDataWriter(sink)
+        with self.chunkLock:
+            self.datafile = writer
+            # samples of an ongoing recording go on under a header of
+            # their own in the new file
+            self.segmentStarted = False
 
     def closeDataFile(self):
         print 'datafile closed'
         if self.datafile is not None:
             self.flushData()
+            # waits until everything queued is on disk
             self.datafile.close()
 
         self.datafile = None
 
+    def getWriterBacklog(self):
+        # returns how many recorded samples are not written to disk yet,
+        # both those waiting in the gaze buffer and those queued for the
+        # writer thread
+        if self.datafile is None:
+            return 0
+        return self.gazeBuffer.unread + self.datafile.backlog
+
     def recordEvent(self, event):
+        # checked now rather than when the data is saved, where an event
+        # that does not fit into a recording would be cut short or fail
+        event = encodeEvent(event)
         t = self.syncmanager.convert_from_local_to_remote(self.clock.get_time())
         self.eventData.append((t, event))
 
@@ -585,53 +1032,22 @@ class TobiiController:
         if self.datafile is None:
             print "Data file is not set, data not saved."
             return
-        elif len(self.gazeData) == 0:
+        elif self.gazeBuffer.firstTimeStamp is None:
             print "No gazedata collected, no data saved."
             return
 
         print "Saving data."
-        self.datafile.write(', '.join(['TimeStamp',
-                                       'GazePointXLeft',
-                                       'GazePointYLeft',
-                                       'PupilLeft',
-                                       'EyePositionXLeft',
-                                       'EyePositionYLeft',
-                                       'EyePositionZLeft',
-                                       'ValidityLeft',
-                                       'GazePointXRight',
-                                       'GazePointYRight',
-                                       'PupilRight',
-                                       'EyePositionXRight',
-                                       'EyePositionYRight',
-                                       'EyePositionZRight',
-                                       'ValidityRight',
-                                       'Event']) + '\n')
-        timeStampStart = self.gazeData[0].Timestamp  # first timepoint is 0s
-        # Write eye info
-        for g in self.gazeData:
-            self.datafile.write(', '.join([
-                '%.4f' % ((g.Timestamp - timeStampStart) / 1000.0),
-                # Print the left eye data:
-                '%.4f' % g.LeftGazePoint2D.x,
-                '%.4f' % g.LeftGazePoint2D.y,
-                '%.4f' % g.LeftPupil,
-                '%.4f' % g.LeftEyePosition3D.x,
-                '%.4f' % g.LeftEyePosition3D.y,
-                '%.4f' % g.LeftEyePosition3D.z,
-                '%d' % g.LeftValidity,
-                # Print the right eye data:
-                '%.4f' % g.RightGazePoint2D.x,
-                '%.4f' % g.RightGazePoint2D.y,
-                '%.4f' % g.RightPupil,
-                '%.4f' % g.RightEyePosition3D.x,
-                '%.4f' % g.RightEyePosition3D.y,
-                '%.4f' % g.RightEyePosition3D.z,
-                '%d' % g.RightValidity
-            ]) + '\n')
+        # most samples have been queued while tracking was running, only
+        # the remainder is left to hand over
+        self.queueSamples()
+        if self.gazeBuffer.overflow:
+            print ("Gaze buffer overflowed, %d samples were "
+                   "lost.") % self.gazeBuffer.overflow
         # Write the additional event data added
-        for e in self.eventData:
-            self.datafile.write(('%.4f' + ', ' * 14 + '%s\n') %
-                                ((e[0] - timeStampStart) / 1000.0, e[1]))
+        if self.eventData:
+            self.datafile.writeEvents(self.eventData,
+                                      self.gazeBuffer.firstTimeStamp)
+            self.eventData = []
         # flush the python data buffer (data written to file)
         self.datafile.flush()
 
@@ -658,12 +1074,43 @@ class TobiiController:
         return ((xy[0] - 0.5) * self.win.size[0],
                 (0.5 - xy[1]) * self.win.size[1])
 
+
+class StoredCalibrationTracker(object):
+    """The part of the tobiiresearch EyeTracker interface that
+    calibrationstore.CalibrationStore uses, for the Tobii SDK 3.0 eye
+    tracker of a TobiiController. SDK errors are raised as
+    EyeTrackerInternalError, so the store falls back to calibrating."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.serial_number = controller.eyetrackerInfo.product_id
+        self.firmware_version = controller.eyetrackerInfo.firmware_version
+
+    def get_display_area(self):
+        try:
+            return DisplayCorners(*self.controller.getDisplayCorners())
+        except EyetrackerException as e:
+            raise EyeTrackerInternalError(e)
+
+    def retrieve_calibration_data(self):
+        # the calibration doCalibration fetched last, or None
+        calib = self.controller.calib
+        return None if calib is None else calib.rawData
+
+    def apply_calibration_data(self, data):
+        try:
+            self.controller.applyCalibration(data)
+        except EyetrackerException as e:
+            raise EyeTrackerInternalError(e)
+
+
 ############################################################################
 # run following codes if this file is executed directly
 ############################################################################
 
 if __name__ == "__main__":
     import sys
+    from calibrationstore import CalibrationStore
     screen = psychopy.monitors.Monitor(name='tobiix300', width=51, distance=60)
     screen.setSizePix([1920, 1080])
     screen.setWidth(51)
@@ -681,12 +1128,33 @@ if __name__ == "__main__":
 
     controller.setDataFile('testdata.csv')
 
-    # Run the calibration routine
-    while True:
-        ret = controller.doCalibration(
-            [(0.1, 0.1), (0.9, 0.1), (0.5, 0.5), (0.1, 0.9), (0.9, 0.9)])
+    # A returning participant can get their last calibration back
+    participant = sys.argv[1] if len(sys.argv) > 1 else 'test'
+    store = CalibrationStore('calibrations')
+    calibrationPoints = [(0.1, 0.1), (0.9, 0.1), (0.5, 0.5), (0.1, 0.9),
+                         (0.9, 0.9)]
+    calibrated = controller.offerStoredCalibration(store, participant)
+
+    # Otherwise run the calibration routine; a retry only collects the
+    # points again that failed, all of them if none did
+    redoPoints = None
+    while not calibrated:
+        ret = controller.doCalibration(calibrationPoints,
+                                       redoPoints=redoPoints)
         if ret == 'accept':
-            break
+            # accept the calibration only if it validates on points
+            # between the calibration points
+            report = controller.doValidation()
+            print report
+            weak = report.weakPoints()
+            if not weak:
+                controller.saveCalibration(store, participant, report)
+                break
+            redoPoints = controller.nearestCalibrationPoints(
+                [report.points[i] for i in weak], calibrationPoints)
+        elif ret == 'retry':
+            redoPoints = (controller.weakCalibrationPoints(calibrationPoints)
+                          or None)
         elif ret == 'abort':
             controller.destroy()
             raise KeyboardInterrupt("The calibration was aborted.")
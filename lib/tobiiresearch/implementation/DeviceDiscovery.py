@@ -0,0 +1,249 @@
+import threading
+import time
+
+from tobiiresearch.implementation.EyeTracker import EyeTracker
+from tobiiresearch.interop import tobii_pro
+
+##
+# An eye tracker answered for the first time.
+#
+# Value for the event argument of DeviceDiscovery callbacks.
+DISCOVERY_FOUND = "discovery_found"
+
+##
+# An eye tracker that was known answered with changed data, e.g. a new device name or firmware version.
+#
+# Value for the event argument of DeviceDiscovery callbacks.
+DISCOVERY_UPDATED = "discovery_updated"
+
+##
+# An eye tracker did not answer for longer than the time to live of the cache.
+#
+# Value for the event argument of DeviceDiscovery callbacks.
+DISCOVERY_REMOVED = "discovery_removed"
+
+_data_fields = ("address", "device_name", "serial_number", "model", "firmware_version", "device_capabilities")
+
+_default_discovery = None
+_default_discovery_lock = threading.Lock()
+
+
+def _same_data(a, b):
+    return all(getattr(a, field) == getattr(b, field) for field in _data_fields)
+
+
+class DeviceDiscovery(object):
+    '''Looks for eye trackers in the background and keeps what it found in a cache.
+
+    A thread browses for eye trackers every interval seconds, so looking up a known eye tracker never waits for
+    the network. An eye tracker that stops answering is kept for ttl seconds after it was last seen, so one missed
+    browse does not make it disappear. Callbacks are called as callback(event, eyetracker_data) with @ref
+    DISCOVERY_FOUND, @ref DISCOVERY_UPDATED or @ref DISCOVERY_REMOVED, on the discovery thread.
+
+    Start it as early as possible, e.g. with @ref get_device_discovery at the start of the process, and wait for
+    the first eye tracker when it is needed:
+
+        discovery = get_device_discovery()
+        ...
+        eyetracker = discovery.wait_for_eyetracker(timeout=10.0)
+    '''
+
+    def __init__(self, interval=1.0, ttl=10.0):
+        '''Creates a discovery service; call DeviceDiscovery.start to start browsing.
+
+        Args:
+        interval: Seconds between two browses.
+        ttl: Seconds an eye tracker stays in the cache after it last answered.
+
+        Raises:
+        ValueError
+        '''
+        if interval <= 0:
+            raise ValueError("The discovery interval must be larger than 0.")
+        if ttl < interval:
+            raise ValueError("The discovery ttl must be at least one interval.")
+        self.__interval = interval
+        self.__ttl = ttl
+        self.__lock = threading.RLock()
+        # address -> (TobiiProEyeTrackerData, time last seen)
+        self.__devices = {}
+        self.__callbacks = ()
+        self.__found = threading.Event()
+        self.__browsed = threading.Event()
+        self.__browses = 0
+        self.__last_error = None
+        self.__thread = None
+        self.__stop = None
+
+    @property
+    def browses(self):
+        '''Gets the number of browses done so far.
+        '''
+        return self.__browses
+
+    @property
+    def last_error(self):
+        '''Gets the exception raised by the last browse, or None if it succeeded.
+        '''
+        return self.__last_error
+
+    def start(self):
+        '''Starts browsing in the background. Does nothing if it is browsing already.
+        '''
+        with self.__lock:
+            if self.__thread is not None:
+                return
+            self.__stop = threading.Event()
+            self.__thread = threading.Thread(target=self.__run, args=(self.__stop,), name="DeviceDiscovery")
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def stop(self):
+        '''Stops browsing and waits for the browse in progress, if any. The cache is kept.
+        '''
+        with self.__lock:
+            thread, stop = self.__thread, self.__stop
+            self.__thread = None
+        if thread is not None:
+            stop.set()
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def add_callback(self, callback):
+        '''Calls callback(event, eyetracker_data) for every change of the cache, on the discovery thread.
+        '''
+        with self.__lock:
+            self.__callbacks = self.__callbacks + (callback,)
+
+    def remove_callback(self, callback):
+        with self.__lock:
+            self.__callbacks = tuple(c for c in self.__callbacks if c != callback)
+
+    def devices(self):
+        '''Gets the eye trackers in the cache.
+
+        Returns:
+        A tuple of TobiiProEyeTrackerData objects, ordered by address.
+        '''
+        with self.__lock:
+            return tuple(self.__devices[address][0] for address in sorted(self.__devices))
+
+    def get_device(self, address):
+        '''Gets the cached data of an eye tracker by address.
+
+        Returns:
+        A TobiiProEyeTrackerData object, or None if the eye tracker is not in the cache.
+        '''
+        with self.__lock:
+            entry = self.__devices.get(address)
+        return None if entry is None else entry[0]
+
+    def get_device_by_serial_number(self, serial_number):
+        '''Gets the cached data of an eye tracker by serial number.
+
+        Returns:
+        A TobiiProEyeTrackerData object, or None if the eye tracker is not in the cache.
+        '''
+        with self.__lock:
+            for data, _ in self.__devices.values():
+                if data.serial_number == serial_number:
+                    return data
+        return None
+
+    def get_eyetracker(self, address):
+        '''Creates an EyeTracker object from the cache, without asking the eye tracker for its data again.
+
+        Returns:
+        An EyeTracker object, or None if the eye tracker is not in the cache.
+        '''
+        data = self.get_device(address)
+        return None if data is None else EyeTracker(data)
+
+    def wait_for_device(self, timeout=None):
+        '''Blocks until the cache holds at least one eye tracker.
+
+        Args:
+        timeout: Seconds to wait at most, or None to wait as long as it takes.
+
+        Returns:
+        The TobiiProEyeTrackerData of the first eye tracker (by address), or None if the timeout ran out.
+        '''
+        if not self.__found.wait(timeout):
+            return None
+        devices = self.devices()
+        return devices[0] if devices else None
+
+    def wait_for_eyetracker(self, timeout=None):
+        '''Like DeviceDiscovery.wait_for_device, but returns an EyeTracker object or None.
+        '''
+        data = self.wait_for_device(timeout)
+        return None if data is None else EyeTracker(data)
+
+    def wait_for_browse(self, timeout=None):
+        '''Blocks until the first browse has completed, after which the cache holds everything that answered.
+
+        Returns:
+        True if a browse has completed, False if the timeout ran out.
+        '''
+        return self.__browsed.wait(timeout)
+
+    def browse(self):
+        '''Browses once on the calling thread and updates the cache.
+
+        Raises:
+        EyeTrackerInternalError
+        '''
+        found = tobii_pro.find_all_eyetrackers()
+        now = time.time()
+        events = []
+        with self.__lock:
+            for data in found:
+                entry = self.__devices.get(data.address)
+                if entry is None:
+                    events.append((DISCOVERY_FOUND, data))
+                elif not _same_data(entry[0], data):
+                    events.append((DISCOVERY_UPDATED, data))
+                else:
+                    data = entry[0]
+                self.__devices[data.address] = (data, now)
+            for address, (data, seen) in list(self.__devices.items()):
+                if now - seen > self.__ttl:
+                    del self.__devices[address]
+                    events.append((DISCOVERY_REMOVED, data))
+            if self.__devices:
+                self.__found.set()
+            else:
+                self.__found.clear()
+            self.__browses += 1
+            callbacks = self.__callbacks
+        self.__browsed.set()
+        for event, data in events:
+            for callback in callbacks:
+                try:
+                    callback(event, data)
+                except Exception:
+                    # a failing callback must not stop the discovery
+                    pass
+
+    def __run(self, stop):
+        while not stop.is_set():
+            try:
+                self.browse()
+                self.__last_error = None
+            except Exception as error:
+                self.__last_error = error
+            stop.wait(self.__interval)
+
+
+def get_device_discovery():
+    '''Gets the discovery service shared by the process, started on the first call.
+
+    Returns:
+    A started DeviceDiscovery object.
+    '''
+    global _default_discovery
+    with _default_discovery_lock:
+        if _default_discovery is None:
+            _default_discovery = DeviceDiscovery()
+            _default_discovery.start()
+        return _default_discovery
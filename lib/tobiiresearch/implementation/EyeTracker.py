@@ -236,6 +236,17 @@ class EyeTracker(object):
         self.__notification_subscriptions = {}
         self.__subscription_lock = threading.RLock()
         self.__subscriptions = {}
+        self.__subscription_batching = {}
+        # Immutable (callback, as_dictionary) tuples that are replaced whenever a subscription changes. Data is
+        # dispatched from these without holding a lock, so slow callbacks never block subscribe_to/unsubscribe_from.
+        self.__notification_snapshots = {}
+        self.__subscription_snapshots = {}
+        # Values of the property getters while the property cache is enabled, None while it is disabled.
+        self.__property_cache = None
+        self.__property_cache_lock = threading.Lock()
+        self.__property_cache_generation = 0
+        self.__property_cache_hits = 0
+        self.__property_cache_misses = 0
 
     def __del__(self):
         with self.__subscription_lock:
@@ -253,19 +264,159 @@ class EyeTracker(object):
         self.__firmware_version = data.firmware_version
         self.__device_capabilities = data.device_capabilities
 
+    @staticmethod
+    def __update_snapshot(subscriptions, snapshots, subscription_type):
+        if subscription_type in subscriptions:
+            snapshots[subscription_type] = tuple(subscriptions[subscription_type].iteritems())
+        else:
+            snapshots.pop(subscription_type, None)
+
     def __notification_callback(self, data):
-        with self.__notification_subscription_lock:
-            for callback, as_dictionary in\
-                    self.__notification_subscriptions.get(data["notification_type"], {}).iteritems():
-                data_class = dict if as_dictionary else _available_notification_subscriptions[data["notification_type"]]
-                callback(data_class(data))
+        notification_type = data["notification_type"]
+        # The property cache is invalidated here rather than by subscribed callbacks, so that unsubscribe_from
+        # can never remove the invalidation.
+        if self.__property_cache is not None and notification_type in self.__property_cache_invalidations:
+            self.__property_cache_invalidations[notification_type](self, data)
+        # The data object is created once and shared by all callbacks that don't want a dictionary.
+        data_object = None
+        for callback, as_dictionary in self.__notification_snapshots.get(notification_type, ()):
+            if as_dictionary:
+                callback(dict(data))
+            else:
+                if data_object is None:
+                    data_object = _available_notification_subscriptions[notification_type](data)
+                callback(data_object)
 
     def __subscription_callback(self, subscription_type, data):
-        global _subscription_types
-        with self.__subscription_lock:
-            for callback, as_dictionary in self.__subscriptions.get(subscription_type, {}).iteritems():
-                data_class = dict if as_dictionary else _subscription_types[subscription_type]["data_class"]
-                callback(data_class(data))
+        # The data object is created once and shared by all callbacks that don't want a dictionary.
+        data_object = None
+        for callback, as_dictionary in self.__subscription_snapshots.get(subscription_type, ()):
+            if as_dictionary:
+                callback(dict(data))
+            else:
+                if data_object is None:
+                    data_object = _subscription_types[subscription_type]["data_class"](data)
+                callback(data_object)
+
+    def __batch_subscription_callback(self, subscription_type, batch):
+        data_objects = None
+        for callback, as_dictionary in self.__subscription_snapshots.get(subscription_type, ()):
+            if as_dictionary:
+                callback([dict(data) for data in batch])
+            else:
+                if data_objects is None:
+                    data_class = _subscription_types[subscription_type]["data_class"]
+                    data_objects = [data_class(data) for data in batch]
+                callback(list(data_objects))
+
+    def __cached(self, name, getter):
+        if self.__property_cache is None:
+            return getter(self.__address)
+        with self.__property_cache_lock:
+            cache = self.__property_cache
+            if cache is not None and name in cache:
+                self.__property_cache_hits += 1
+                return cache[name]
+            self.__property_cache_misses += 1
+            generation = self.__property_cache_generation
+        value = getter(self.__address)
+        with self.__property_cache_lock:
+            # A notification that arrived during the round trip may have made the value stale already.
+            if self.__property_cache is not None and generation == self.__property_cache_generation:
+                self.__property_cache[name] = value
+        return value
+
+    def __invalidate(self, names=None, **values):
+        # Drops the given cached values, or all of them, and stores the new values handed in.
+        with self.__property_cache_lock:
+            if self.__property_cache is None:
+                return
+            self.__property_cache_generation += 1
+            if names is None:
+                self.__property_cache.clear()
+            else:
+                for name in names:
+                    self.__property_cache.pop(name, None)
+            self.__property_cache.update(values)
+
+    def __on_display_area_changed(self, data):
+        self.__invalidate(("display_area",), display_area=DisplayAreaChangedData(data).display_area)
+
+    def __on_track_box_changed(self, data):
+        self.__invalidate(("track_box",))
+
+    def __on_gaze_output_frequency_changed(self, data):
+        self.__invalidate(("gaze_output_frequency",), gaze_output_frequency=data["gaze_output_frequency"])
+
+    def __on_connection_restored(self, data):
+        # Anything may have changed while the connection was down.
+        self.__invalidate()
+
+    __property_cache_invalidations = {
+        EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED: __on_display_area_changed,
+        EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED: __on_track_box_changed,
+        EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED: __on_gaze_output_frequency_changed,
+        EYETRACKER_NOTIFICATION_CONNECTION_RESTORED: __on_connection_restored}
+
+    def __update_notification_stream(self):
+        # The notifications are needed while anyone subscribes to one of them or the property cache is enabled.
+        with self.__notification_subscription_lock:
+            wanted = len(self.__notification_subscriptions) > 0 or self.__property_cache is not None
+            with self.__subscription_lock:
+                subscribed = _EYETRACKER_NOTIFICATIONS in self.__subscriptions
+            if wanted and not subscribed:
+                self.subscribe_to(_EYETRACKER_NOTIFICATIONS, self.__notification_callback)
+            elif subscribed and not wanted:
+                self.unsubscribe_from(_EYETRACKER_NOTIFICATIONS, None)
+
+    def enable_property_cache(self):
+        '''Serves the property getters from memory instead of asking the eye tracker every time.
+
+        Covers get_display_area, get_track_box, get_gaze_output_frequency, get_eye_tracking_mode,
+        get_all_gaze_output_frequencies and get_all_eye_tracking_modes. The first call of a getter asks the eye
+        tracker, later calls return the same value until it is invalidated. Values are invalidated, or replaced
+        with the value delivered, by @ref EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED,
+        @ref EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED and @ref EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED,
+        all of them by @ref EYETRACKER_NOTIFICATION_CONNECTION_RESTORED, and the ones a setter or license call on
+        this object can change by that call. The eye tracker sends no notification when another program changes
+        the eye tracking mode, so a cached mode can be outdated then.
+
+        Calling it again while the cache is enabled does nothing.
+        '''
+        with self.__property_cache_lock:
+            if self.__property_cache is not None:
+                return
+            self.__property_cache = {}
+            self.__property_cache_generation += 1
+        self.__update_notification_stream()
+
+    def disable_property_cache(self):
+        '''Stops caching the property getters and drops the cached values. The hit and miss counters are kept.
+        '''
+        with self.__property_cache_lock:
+            if self.__property_cache is None:
+                return
+            self.__property_cache = None
+            self.__property_cache_generation += 1
+        self.__update_notification_stream()
+
+    @property
+    def property_cache_enabled(self):
+        '''Gets whether the property getters are served from the cache, see EyeTracker.enable_property_cache.
+        '''
+        return self.__property_cache is not None
+
+    @property
+    def property_cache_hits(self):
+        '''Gets the number of getter calls that were served from the property cache.
+        '''
+        return self.__property_cache_hits
+
+    @property
+    def property_cache_misses(self):
+        '''Gets the number of getter calls that had to ask the eye tracker while the property cache was enabled.
+        '''
+        return self.__property_cache_misses
 
     @property
     def address(self):
@@ -324,14 +475,18 @@ class EyeTracker(object):
         Tuple of FailedLicense objects for licenses that failed.
         Empty tuple if all licenses were successfully applied.
         '''
-        if isinstance(license_key_ring, bytes):
-            return tobii_pro.apply_licenses(self.__address, (license_key_ring,))
-        elif hasattr(license_key_ring, 'key_string'):
-            return tobii_pro.apply_licenses(self.__address, (license_key_ring.key_string,))
-        else:
-            return tobii_pro.apply_licenses(self.__address, tuple([(lambda key: key
-                                                                    if isinstance(key, bytes) else key.key_string)(key)
-                                                                   for key in license_key_ring]))
+        try:
+            if isinstance(license_key_ring, bytes):
+                return tobii_pro.apply_licenses(self.__address, (license_key_ring,))
+            elif hasattr(license_key_ring, 'key_string'):
+                return tobii_pro.apply_licenses(self.__address, (license_key_ring.key_string,))
+            else:
+                return tobii_pro.apply_licenses(self.__address,
+                                                tuple([key if isinstance(key, bytes) else key.key_string
+                                                       for key in license_key_ring]))
+        finally:
+            # Licenses can unlock frequencies and modes, so cached property values may no longer hold.
+            self.__invalidate()
 
     def clear_applied_licenses(self):
         '''Clears any previously applied licenses.
@@ -341,7 +496,10 @@ class EyeTracker(object):
         EyeTrackerInternalError
         EyeTrackerLicenseError
         '''
-        return tobii_pro.clear_applied_licenses(self.__address)
+        try:
+            return tobii_pro.clear_applied_licenses(self.__address)
+        finally:
+            self.__invalidate()
 
     def retrieve_calibration_data(self):
         '''Gets the calibration data used currently by the eye tracker.
@@ -383,7 +541,7 @@ class EyeTracker(object):
         Returns:
         Tuple of floats with all gaze output frequencies.
         '''
-        return tobii_pro.get_all_gaze_output_frequencies(self.__address)
+        return self.__cached("all_gaze_output_frequencies", tobii_pro.get_all_gaze_output_frequencies)
 
     def get_gaze_output_frequency(self):
         '''Gets the gaze output frequency of the eye tracker.
@@ -398,7 +556,7 @@ class EyeTracker(object):
         Returns:
         Float with the current gaze output frequency.
         '''
-        return tobii_pro.get_gaze_output_frequency(self.__address)
+        return self.__cached("gaze_output_frequency", tobii_pro.get_gaze_output_frequency)
 
     def set_gaze_output_frequency(self, gaze_output_frequency):
         '''Sets the gaze output frequency of the eye tracker.
@@ -414,7 +572,10 @@ class EyeTracker(object):
         EyeTrackerLicenseError
         ValueError
         '''
-        return tobii_pro.set_gaze_output_frequency(self.__address, gaze_output_frequency)
+        try:
+            return tobii_pro.set_gaze_output_frequency(self.__address, gaze_output_frequency)
+        finally:
+            self.__invalidate(("gaze_output_frequency",))
 
     def get_all_eye_tracking_modes(self):
         '''Gets a tuple of eye tracking modes supported by the eye tracker.
@@ -429,7 +590,7 @@ class EyeTracker(object):
         Returns:
         Tuple of strings with available eye tracking modes.
         '''
-        return tobii_pro.get_all_eye_tracking_modes(self.__address)
+        return self.__cached("all_eye_tracking_modes", tobii_pro.get_all_eye_tracking_modes)
 
     def get_eye_tracking_mode(self):
         '''Gets the eye tracking mode of the eye tracker.
@@ -444,7 +605,7 @@ class EyeTracker(object):
         Returns:
         String with the current eye tracking mode.
         '''
-        return tobii_pro.get_eye_tracking_mode(self.__address)
+        return self.__cached("eye_tracking_mode", tobii_pro.get_eye_tracking_mode)
 
     def set_eye_tracking_mode(self, eye_tracking_mode):
         '''Sets the eye tracking mode of the eye tracker.
@@ -460,7 +621,10 @@ class EyeTracker(object):
         EyeTrackerLicenseError
         ValueError
         '''
-        return tobii_pro.set_eye_tracking_mode(self.__address, eye_tracking_mode)
+        try:
+            return tobii_pro.set_eye_tracking_mode(self.__address, eye_tracking_mode)
+        finally:
+            self.__invalidate(("eye_tracking_mode",))
 
     def get_track_box(self):
         '''Gets the track box of the eye tracker.
@@ -475,7 +639,7 @@ class EyeTracker(object):
         Returns:
         Track box in the user coordinate system as a TrackBox object.
         '''
-        return tobii_pro.get_track_box(self.__address)
+        return self.__cached("track_box", tobii_pro.get_track_box)
 
     def get_display_area(self):
         ''' Gets the size and corners of the display area.
@@ -490,7 +654,7 @@ class EyeTracker(object):
         Returns:
         Display area in the user coordinate system as a DisplayArea object.
         '''
-        return tobii_pro.get_display_area(self.__address)
+        return self.__cached("display_area", tobii_pro.get_display_area)
 
     def set_device_name(self, device_name):
         '''Changes the device name. This is not supported by all eye trackers.
@@ -509,7 +673,7 @@ class EyeTracker(object):
         tobii_pro.set_device_name(self.__address, device_name)
         self.__init_from_data(tobii_pro.get_device(self.__address))
 
-    def subscribe_to(self, subscription_type, callback, as_dictionary=False):
+    def subscribe_to(self, subscription_type, callback, as_dictionary=False, batch_size=None, max_latency_ms=None):
         '''Subscribes to data for the eye tracker.
 
         See @ref find_all_eyetrackers or EyeTracker.__init__ on how to create an EyeTracker object.
@@ -524,6 +688,11 @@ class EyeTracker(object):
         subscription_type: Type of data to subscribe to.
         callback: Callback receiveing the data. See documentation of subscription types for details.
         as_dictionary: If True, the callback will receive a dictionary with values instead of a custom object.
+        batch_size: If set, the callback will receive a list of up to batch_size samples per call instead of one
+        sample per call. Not available for notifications. All callbacks subscribed to the same type of data on an
+        EyeTracker object must use the same batch_size and max_latency_ms.
+        max_latency_ms: If set together with batch_size, a batch is also delivered when its oldest sample is this many
+        milliseconds old, even if no more samples arrive. Such a batch is delivered from a timer thread.
         '''
         global _available_notification_subscriptions
         global _EYETRACKER_NOTIFICATIONS_BASE
@@ -532,17 +701,22 @@ class EyeTracker(object):
         if not callable(callback):
             _on_error_raise_exception(_invalid_parameter)
 
+        if (batch_size is not None and batch_size < 1) or (max_latency_ms is not None and batch_size is None):
+            _on_error_raise_exception(_invalid_parameter)
+
         # Special handling of notification subscribtions.
         if subscription_type in _available_notification_subscriptions.keys():
+            if batch_size is not None:
+                _on_error_raise_exception(_invalid_parameter)
             with self.__notification_subscription_lock:
                 # Subscribing more than once for the same type with the same callback is invalid.
                 if ((subscription_type in self.__notification_subscriptions and
                      callback in self.__notification_subscriptions[subscription_type])):
                     _on_error_raise_exception(_invalid_operation)
-                count = len(self.__notification_subscriptions)
                 self.__notification_subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
-                if count == 0:
-                    self.subscribe_to(_EYETRACKER_NOTIFICATIONS, self.__notification_callback)
+                self.__update_snapshot(self.__notification_subscriptions, self.__notification_snapshots,
+                                       subscription_type)
+                self.__update_notification_stream()
         else:
             if subscription_type not in _subscription_types:
                 _on_error_raise_exception(_invalid_parameter)
@@ -550,11 +724,25 @@ class EyeTracker(object):
                 # Subscribing more than once for the same type with the same callback is invalid.
                 if subscription_type in self.__subscriptions and callback in self.__subscriptions[subscription_type]:
                     _on_error_raise_exception(_invalid_operation)
+                # All callbacks for one type of data share the same batching.
+                if ((subscription_type in self.__subscriptions and
+                     self.__subscription_batching[subscription_type] != (batch_size, max_latency_ms))):
+                    _on_error_raise_exception(_invalid_operation)
                 self.__subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
+                self.__update_snapshot(self.__subscriptions, self.__subscription_snapshots, subscription_type)
                 if len(self.__subscriptions[subscription_type]) == 1:
-                    tobii_pro.subscribe_to(_subscription_types[subscription_type]["type_index"],
-                                           _subscription_types[subscription_type]["stream_name"],
-                                           self, lambda x, st=subscription_type: self.__subscription_callback(st, x))
+                    self.__subscription_batching[subscription_type] = (batch_size, max_latency_ms)
+                    if batch_size is None:
+                        tobii_pro.subscribe_to(_subscription_types[subscription_type]["type_index"],
+                                               _subscription_types[subscription_type]["stream_name"],
+                                               self, lambda x, st=subscription_type: self.__subscription_callback(st, x))
+                    else:
+                        tobii_pro.subscribe_to(_subscription_types[subscription_type]["type_index"],
+                                               _subscription_types[subscription_type]["stream_name"],
+                                               self,
+                                               lambda x, st=subscription_type: self.__batch_subscription_callback(st, x),
+                                               batch_size,
+                                               None if max_latency_ms is None else max_latency_ms / 1000.0)
 
     def unsubscribe_from(self, subscription_type, callback=None):
         '''Unsubscribes from data for the eye tracker.
@@ -582,17 +770,24 @@ class EyeTracker(object):
                         del self.__notification_subscriptions[subscription_type][callback]
                     if callback is None or len(self.__notification_subscriptions[subscription_type]) == 0:
                         del self.__notification_subscriptions[subscription_type]
-                    if len(self.__notification_subscriptions) == 0:
-                        self.unsubscribe_from(_EYETRACKER_NOTIFICATIONS, None)
+                    self.__update_snapshot(self.__notification_subscriptions, self.__notification_snapshots,
+                                           subscription_type)
+                    self.__update_notification_stream()
         else:
             if subscription_type not in _subscription_types:
                 _on_error_raise_exception(_invalid_parameter)
             with self.__subscription_lock:
                 if subscription_type in self.__subscriptions:
+                    # Deliver a partly filled batch before anyone stops listening.
+                    if self.__subscription_batching[subscription_type][0] is not None:
+                        tobii_pro.flush_subscription(_subscription_types[subscription_type]["type_index"], self)
                     if callback in self.__subscriptions[subscription_type]:
                         del self.__subscriptions[subscription_type][callback]
                     if callback is None or len(self.__subscriptions[subscription_type]) == 0:
                         del self.__subscriptions[subscription_type]
+                        del self.__subscription_batching[subscription_type]
+                    self.__update_snapshot(self.__subscriptions, self.__subscription_snapshots, subscription_type)
+                    if subscription_type not in self.__subscriptions:
                         tobii_pro.unsubscribe_from(_subscription_types[subscription_type]["type_index"], self)
 
 
@@ -4,6 +4,8 @@ class GazeOrigin(object):
     A GazeOrigin object is used as value for EyeData.gaze_origin.
     '''
 
+    __slots__ = ("__position_in_user_coordinates", "__position_in_track_box_coordinates", "__validity")
+
     def __init__(self,
                  gaze_origin_position_in_user_coordinates,
                  gaze_origin_position_in_track_box_coordinates,
@@ -45,6 +47,8 @@ class PupilData(object):
     A PupilData object is used as value for EyeData.pupil.
     '''
 
+    __slots__ = ("__diameter", "__validity")
+
     def __init__(self,
                  pupil_diameter,
                  pupil_validity):
@@ -77,6 +81,8 @@ class GazePoint(object):
     A GazePoint object is used as value for EyeData.gaze_point.
     '''
 
+    __slots__ = ("__position_on_display_area", "__position_in_user_coordinates", "__validity")
+
     def __init__(self,
                  gaze_point_position_on_display_area,
                  gaze_point_position_in_user_coordinates,
@@ -118,6 +124,9 @@ class EyeData(object):
     EyeData objects are used as values for GazeData.left_eye and GazeData.right_eye.
     '''
 
+    # The GazePoint, PupilData and GazeOrigin objects are only created when they are first accessed.
+    __slots__ = ("__values", "__gaze_point", "__pupil_data", "__gaze_origin")
+
     def __init__(self,
                  gaze_point_position_on_display_area,
                  gaze_point_position_in_user_coordinates,
@@ -127,32 +136,43 @@ class EyeData(object):
                  gaze_origin_position_in_user_coordinates,
                  gaze_origin_position_in_track_box_coordinates,
                  gaze_origin_validity):
-        self.__gaze_point = GazePoint(gaze_point_position_on_display_area,
-                                      gaze_point_position_in_user_coordinates,
-                                      gaze_point_validity)
-
-        self.__pupil_data = PupilData(pupil_diameter, pupil_validity)
-
-        self.__gaze_origin = GazeOrigin(gaze_origin_position_in_user_coordinates,
-                                        gaze_origin_position_in_track_box_coordinates,
-                                        gaze_origin_validity)
+        self.__values = (gaze_point_position_on_display_area,
+                         gaze_point_position_in_user_coordinates,
+                         gaze_point_validity,
+                         pupil_diameter,
+                         pupil_validity,
+                         gaze_origin_position_in_user_coordinates,
+                         gaze_origin_position_in_track_box_coordinates,
+                         gaze_origin_validity)
+        self.__gaze_point = None
+        self.__pupil_data = None
+        self.__gaze_origin = None
 
     @property
     def gaze_point(self):
         '''Gets the gaze point data as a GazePoint object.
         '''
+        if self.__gaze_point is None:
+            values = self.__values
+            self.__gaze_point = GazePoint(values[0], values[1], values[2])
         return self.__gaze_point
 
     @property
     def pupil(self):
         '''Gets the pupil data as a PupilData object.
         '''
+        if self.__pupil_data is None:
+            values = self.__values
+            self.__pupil_data = PupilData(values[3], values[4])
         return self.__pupil_data
 
     @property
     def gaze_origin(self):
         '''Gets the gaze origin data as a GazeOrigin object.
         '''
+        if self.__gaze_origin is None:
+            values = self.__values
+            self.__gaze_origin = GazeOrigin(values[5], values[6], values[7])
         return self.__gaze_origin
 
 
@@ -163,54 +183,58 @@ class GazeData(object):
     @ref EYETRACKER_GAZE_DATA.
     '''
 
+    # The dictionary from the eye tracker is kept as it is, the EyeData objects are only created when they are first
+    # accessed.
+    __slots__ = ("__data", "__left", "__right")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create GazeData objects yourself.")
 
-        self.__left = EyeData(
-            data["left_gaze_point_on_display_area"],
-            data["left_gaze_point_in_user_coordinate_system"],
-            data["left_gaze_point_validity"],
-            data["left_pupil_diameter"],
-            data["left_pupil_validity"],
-            data["left_gaze_origin_in_user_coordinate_system"],
-            data["left_gaze_origin_in_trackbox_coordinate_system"],
-            data["left_gaze_origin_validity"])
-
-        self.__right = EyeData(
-            data["right_gaze_point_on_display_area"],
-            data["right_gaze_point_in_user_coordinate_system"],
-            data["right_gaze_point_validity"],
-            data["right_pupil_diameter"],
-            data["right_pupil_validity"],
-            data["right_gaze_origin_in_user_coordinate_system"],
-            data["right_gaze_origin_in_trackbox_coordinate_system"],
-            data["right_gaze_origin_validity"])
-
-        self.__device_time_stamp = data["device_time_stamp"]
-
-        self.__system_time_stamp = data["system_time_stamp"]
+        self.__data = data
+        self.__left = None
+        self.__right = None
 
     @property
     def left_eye(self):
         '''Gets the gaze data for the left eye as an EyeData object.
         '''
+        if self.__left is None:
+            data = self.__data
+            self.__left = EyeData(data["left_gaze_point_on_display_area"],
+                                  data["left_gaze_point_in_user_coordinate_system"],
+                                  data["left_gaze_point_validity"],
+                                  data["left_pupil_diameter"],
+                                  data["left_pupil_validity"],
+                                  data["left_gaze_origin_in_user_coordinate_system"],
+                                  data["left_gaze_origin_in_trackbox_coordinate_system"],
+                                  data["left_gaze_origin_validity"])
         return self.__left
 
     @property
     def right_eye(self):
         '''Gets the gaze data for the right eye as an EyeData object.
         '''
+        if self.__right is None:
+            data = self.__data
+            self.__right = EyeData(data["right_gaze_point_on_display_area"],
+                                   data["right_gaze_point_in_user_coordinate_system"],
+                                   data["right_gaze_point_validity"],
+                                   data["right_pupil_diameter"],
+                                   data["right_pupil_validity"],
+                                   data["right_gaze_origin_in_user_coordinate_system"],
+                                   data["right_gaze_origin_in_trackbox_coordinate_system"],
+                                   data["right_gaze_origin_validity"])
         return self.__right
 
     @property
     def device_time_stamp(self):
         '''Gets the time stamp according to the eye tracker's internal clock.
         '''
-        return self.__device_time_stamp
+        return self.__data["device_time_stamp"]
 
     @property
     def system_time_stamp(self):
         '''Gets the time stamp according to the computer's internal clock.
         '''
-        return self.__system_time_stamp
+        return self.__data["system_time_stamp"]
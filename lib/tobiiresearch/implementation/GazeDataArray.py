@@ -0,0 +1,263 @@
+import operator
+
+import numpy
+
+# Name, dtype and number of values per sample of each column. The names are the keys of the dictionaries delivered
+# for @ref EYETRACKER_GAZE_DATA when subscribing with as_dictionary=True.
+_eye_columns = (("gaze_point_on_display_area", numpy.float64, 2),
+                ("gaze_point_in_user_coordinate_system", numpy.float64, 3),
+                ("gaze_point_validity", numpy.bool_, 1),
+                ("pupil_diameter", numpy.float64, 1),
+                ("pupil_validity", numpy.bool_, 1),
+                ("gaze_origin_in_user_coordinate_system", numpy.float64, 3),
+                ("gaze_origin_in_trackbox_coordinate_system", numpy.float64, 3),
+                ("gaze_origin_validity", numpy.bool_, 1))
+
+_columns = tuple([(eye + "_" + name, dtype, width) for eye in ("left", "right")
+                  for name, dtype, width in _eye_columns] +
+                 [("device_time_stamp", numpy.int64, 1),
+                  ("system_time_stamp", numpy.int64, 1)])
+
+
+def _shape(length, width):
+    return (length,) if width == 1 else (length, width)
+
+
+class GazePointArray(object):
+    '''Provides the gaze point columns of a GazeDataArray.
+
+    Mirrors GazePoint. A GazePointArray object is used as value for EyeDataArray.gaze_point.
+    '''
+
+    def __init__(self, columns, eye):
+        self.__columns = columns
+        self.__eye = eye
+
+    @property
+    def position_on_display_area(self):
+        '''Gets the normalized gaze point positions in 2D on the active display area as an (N, 2) array.
+        '''
+        return self.__columns[self.__eye + "_gaze_point_on_display_area"]
+
+    @property
+    def position_in_user_coordinates(self):
+        '''Gets the gaze point positions in 3D in the user coordinate system as an (N, 3) array.
+        '''
+        return self.__columns[self.__eye + "_gaze_point_in_user_coordinate_system"]
+
+    @property
+    def validity(self):
+        '''Gets the validity of the gaze point data as an (N,) bool array.
+        '''
+        return self.__columns[self.__eye + "_gaze_point_validity"]
+
+
+class PupilDataArray(object):
+    '''Provides the pupil columns of a GazeDataArray.
+
+    Mirrors PupilData. A PupilDataArray object is used as value for EyeDataArray.pupil.
+    '''
+
+    def __init__(self, columns, eye):
+        self.__columns = columns
+        self.__eye = eye
+
+    @property
+    def diameter(self):
+        '''Gets the diameters of the pupil in millimeters as an (N,) array.
+        '''
+        return self.__columns[self.__eye + "_pupil_diameter"]
+
+    @property
+    def validity(self):
+        '''Gets the validity of the pupil data as an (N,) bool array.
+        '''
+        return self.__columns[self.__eye + "_pupil_validity"]
+
+
+class GazeOriginArray(object):
+    '''Provides the gaze origin columns of a GazeDataArray.
+
+    Mirrors GazeOrigin. A GazeOriginArray object is used as value for EyeDataArray.gaze_origin.
+    '''
+
+    def __init__(self, columns, eye):
+        self.__columns = columns
+        self.__eye = eye
+
+    @property
+    def position_in_user_coordinates(self):
+        '''Gets the gaze origin positions in 3D in the user coordinate system as an (N, 3) array.
+        '''
+        return self.__columns[self.__eye + "_gaze_origin_in_user_coordinate_system"]
+
+    @property
+    def position_in_track_box_coordinates(self):
+        '''Gets the normalized gaze origins in track box coordinate system as an (N, 3) array.
+        '''
+        return self.__columns[self.__eye + "_gaze_origin_in_trackbox_coordinate_system"]
+
+    @property
+    def validity(self):
+        '''Gets the validity of the gaze origin data as an (N,) bool array.
+        '''
+        return self.__columns[self.__eye + "_gaze_origin_validity"]
+
+
+class EyeDataArray(object):
+    '''Provides the columns for one eye of a GazeDataArray.
+
+    Mirrors EyeData. EyeDataArray objects are used as values for GazeDataArray.left_eye and GazeDataArray.right_eye.
+    '''
+
+    def __init__(self, columns, eye):
+        self.__gaze_point = GazePointArray(columns, eye)
+        self.__pupil_data = PupilDataArray(columns, eye)
+        self.__gaze_origin = GazeOriginArray(columns, eye)
+
+    @property
+    def gaze_point(self):
+        '''Gets the gaze point data as a GazePointArray object.
+        '''
+        return self.__gaze_point
+
+    @property
+    def pupil(self):
+        '''Gets the pupil data as a PupilDataArray object.
+        '''
+        return self.__pupil_data
+
+    @property
+    def gaze_origin(self):
+        '''Gets the gaze origin data as a GazeOriginArray object.
+        '''
+        return self.__gaze_origin
+
+
+class GazeDataArray(object):
+    '''Holds any number of gaze data samples as NumPy columns.
+
+    Provides the same properties as GazeData, but every value is an array with one row per sample. For example
+    left_eye.gaze_point.position_on_display_area is an (N, 2) array and left_eye.pupil.validity an (N,) bool array.
+
+    Create objects with GazeDataArray.from_dictionaries or GazeDataArray.concatenate.
+    '''
+
+    def __init__(self, columns):
+        if not isinstance(columns, dict) or set(columns) != set(name for name, _, _ in _columns):
+            raise ValueError("A GazeDataArray must be created from a dictionary with all gaze data columns.")
+
+        self.__columns = columns
+        self.__left = EyeDataArray(columns, "left")
+        self.__right = EyeDataArray(columns, "right")
+
+    @classmethod
+    def from_dictionaries(cls, dictionaries):
+        '''Creates a GazeDataArray from gaze data dictionaries.
+
+        Args:
+        dictionaries: Sequence of the dictionaries delivered for @ref EYETRACKER_GAZE_DATA when subscribing with
+        as_dictionary=True, e.g. a batch delivered in batched mode.
+
+        Returns:
+        A GazeDataArray object.
+        '''
+        length = len(dictionaries)
+        columns = {}
+        for name, dtype, width in _columns:
+            columns[name] = numpy.array([dictionary[name] for dictionary in dictionaries],
+                                        dtype=dtype).reshape(_shape(length, width))
+        return cls(columns)
+
+    @classmethod
+    def concatenate(cls, arrays):
+        '''Joins several GazeDataArray objects into one, in the given order.
+
+        Returns:
+        A GazeDataArray object.
+        '''
+        arrays = list(arrays)
+        if len(arrays) == 0:
+            return cls.from_dictionaries(())
+        return cls(dict((name, numpy.concatenate([array.column(name) for array in arrays]))
+                        for name, _, _ in _columns))
+
+    @classmethod
+    def load(cls, filename):
+        '''Loads a GazeDataArray written with GazeDataArray.save.
+
+        Returns:
+        A GazeDataArray object.
+        '''
+        with numpy.load(filename) as archive:
+            return cls(dict((name, archive[name]) for name in archive.files))
+
+    def save(self, filename):
+        '''Writes all columns to an uncompressed NumPy .npz archive.
+        '''
+        with open(filename, "wb") as archive:
+            numpy.savez(archive, **self.__columns)
+
+    def __len__(self):
+        return len(self.__columns["system_time_stamp"])
+
+    def __getitem__(self, index):
+        '''Selects samples by index, slice, index array or bool mask.
+
+        Returns:
+        A GazeDataArray object. Slices share their data with this object.
+        '''
+        if isinstance(index, (int, long, numpy.integer)):
+            index = operator.index(index)
+            length = len(self)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError("GazeDataArray index out of range.")
+            index = slice(index, index + 1)
+        return GazeDataArray(dict((name, column[index]) for name, column in self.__columns.iteritems()))
+
+    def column(self, name):
+        '''Gets a column by its gaze data dictionary key, e.g. "left_pupil_diameter".
+        '''
+        return self.__columns[name]
+
+    def between(self, start, stop, time_stamp="system_time_stamp"):
+        '''Selects the samples with start <= time stamp < stop.
+
+        Time stamps are expected to increase monotonically, as they do in recorded data.
+
+        Args:
+        start: First time stamp to include.
+        stop: First time stamp not to include.
+        time_stamp: "system_time_stamp" or "device_time_stamp".
+
+        Returns:
+        A GazeDataArray object sharing its data with this object.
+        '''
+        time_stamps = self.__columns[time_stamp]
+        return self[numpy.searchsorted(time_stamps, start, "left"):numpy.searchsorted(time_stamps, stop, "left")]
+
+    @property
+    def left_eye(self):
+        '''Gets the gaze data for the left eye as an EyeDataArray object.
+        '''
+        return self.__left
+
+    @property
+    def right_eye(self):
+        '''Gets the gaze data for the right eye as an EyeDataArray object.
+        '''
+        return self.__right
+
+    @property
+    def device_time_stamp(self):
+        '''Gets the time stamps according to the eye tracker's internal clock as an (N,) array.
+        '''
+        return self.__columns["device_time_stamp"]
+
+    @property
+    def system_time_stamp(self):
+        '''Gets the time stamps according to the computer's internal clock as an (N,) array.
+        '''
+        return self.__columns["system_time_stamp"]
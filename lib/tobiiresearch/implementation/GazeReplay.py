@@ -0,0 +1,279 @@
+import bisect
+import threading
+import time
+
+from tobiiresearch.implementation.EyeTracker import EyeTracker, EYETRACKER_GAZE_DATA, _subscription_types
+from tobiiresearch.implementation.Errors import _on_error_raise_exception
+from tobiiresearch.implementation.GazeDataArray import _columns
+from tobiiresearch.interop import tobii_pro
+from tobiiresearch.interop import tobii_pro_simulated
+
+_invalid_operation = 11  # __TobiiProStatus.invalid_operation
+
+_gaze_type_index = _subscription_types[EYETRACKER_GAZE_DATA]["type_index"]
+
+_validity_columns = frozenset(eye + "_" + name for eye in ("left", "right")
+                              for name in ("gaze_point_validity", "pupil_validity", "gaze_origin_validity"))
+
+
+class GazeReplay(object):
+    '''Plays a recorded GazeDataArray back through the @ref EYETRACKER_GAZE_DATA subscriptions of an eye tracker.
+
+    Requires the simulated backend (TOBII_RESEARCH_BACKEND=simulated). The replay gets its own simulated eye tracker,
+    available as GazeReplay.eyetracker, whose own gaze generation is switched off. Callbacks subscribed to it receive
+    exactly the recorded samples, through the same path as live data.
+
+    Samples can be delivered in real time, at a multiple of real time or as fast as possible from a thread, see
+    GazeReplay.start, or synchronously on the calling thread with GazeReplay.run. run never looks at the clock, so
+    it delivers the same samples in the same order every time, which makes callback side measurements reproducible.
+
+    The recorded time stamps are kept. When looping, every pass is shifted by the length of the recording, so time
+    stamps keep increasing.
+    '''
+
+    def __init__(self, gaze_data_array, speed=1.0, loop=False):
+        '''Creates a replay of a recording.
+
+        Args:
+        gaze_data_array: GazeDataArray holding the recording, e.g. from GazeDataArray.load. Sessions recorded by
+        TobiiController are loaded with gazerecording.GazeRecording(filename).toGazeDataArray() for binary data files
+        and gazerecording.gazeDataArray(gazerecording.readCsv(filename)) for comma separated ones.
+        speed: 1.0 for the original timing, 2.0 for twice as fast, and so on. None delivers as fast as possible.
+        loop: Start over at the end of the recording.
+
+        Raises:
+        EyeTrackerInvalidOperationError
+        ValueError
+        '''
+        if tobii_pro.tobii_pro_internal is not tobii_pro_simulated:
+            _on_error_raise_exception(_invalid_operation)
+        if len(gaze_data_array) == 0:
+            raise ValueError("A GazeReplay needs at least one sample.")
+        if speed is not None and speed <= 0:
+            raise ValueError("The replay speed must be larger than 0.")
+
+        # Plain Python values per column; the native module delivers validities as integers.
+        self.__columns = []
+        for name, _, _ in _columns:
+            if name in ("system_time_stamp", "device_time_stamp"):
+                continue
+            values = gaze_data_array.column(name).tolist()
+            if name in _validity_columns:
+                values = [int(value) for value in values]
+            elif isinstance(values[0], list):
+                values = [tuple(value) for value in values]
+            self.__columns.append((name, values))
+        self.__system_time_stamps = gaze_data_array.system_time_stamp.tolist()
+        self.__device_time_stamps = gaze_data_array.device_time_stamp.tolist()
+        # One sample interval is added after the last sample before a loop starts over.
+        count = len(self.__system_time_stamps)
+        interval = ((self.__system_time_stamps[-1] - self.__system_time_stamps[0]) // (count - 1)
+                    if count > 1 else 0)
+        self.__span = self.__system_time_stamps[-1] - self.__system_time_stamps[0] + interval
+
+        self.__speed = speed
+        self.__loop = loop
+        self.__index = 0
+        self.__pass = 0
+        self.__delivered = 0
+        self.__paused = False
+        # counts seeks, so the playback thread notices one while it waits for a sample to be due
+        self.__seeks = 0
+        self.__lock = threading.RLock()
+        self.__thread = None
+        self.__stop = None
+        # wall clock time and recorded time stamp that were current when playback was last (re)started
+        self.__anchor = None
+
+        self.__address = tobii_pro_simulated.add_device(serial_number="REPLAY-{0:x}".format(id(self)),
+                                                        streaming=False)
+        self.__eyetracker = EyeTracker(self.__address)
+
+    def close(self):
+        '''Stops playback and removes the simulated eye tracker.
+        '''
+        self.stop()
+        tobii_pro_simulated.remove_device(self.__address)
+
+    @property
+    def eyetracker(self):
+        '''Gets the EyeTracker object the recording is played back on.
+        '''
+        return self.__eyetracker
+
+    @property
+    def position(self):
+        '''Gets the index of the next sample to deliver.
+        '''
+        return self.__index
+
+    @property
+    def delivered(self):
+        '''Gets the number of samples delivered so far, over all passes.
+        '''
+        return self.__delivered
+
+    @property
+    def finished(self):
+        '''Gets whether the end of the recording was reached without looping.
+        '''
+        return self.__index >= len(self.__system_time_stamps)
+
+    @property
+    def running(self):
+        '''Gets whether the playback thread is running.
+        '''
+        return self.__thread is not None and self.__thread.is_alive()
+
+    @property
+    def speed(self):
+        '''Gets or sets the playback speed, None is as fast as possible.
+        '''
+        return self.__speed
+
+    @speed.setter
+    def speed(self, speed):
+        if speed is not None and speed <= 0:
+            raise ValueError("The replay speed must be larger than 0.")
+        with self.__lock:
+            self.__speed = speed
+            self.__anchor = None
+
+    def __sample(self, index):
+        data = dict((name, values[index]) for name, values in self.__columns)
+        offset = self.__pass * self.__span
+        data["system_time_stamp"] = self.__system_time_stamps[index] + offset
+        data["device_time_stamp"] = self.__device_time_stamps[index] + offset
+        return data
+
+    def __next(self):
+        # returns the next sample, or None at the end; must be called with the lock held
+        if self.__index >= len(self.__system_time_stamps):
+            if not self.__loop:
+                return None
+            self.__index = 0
+            self.__pass += 1
+        data = self.__sample(self.__index)
+        self.__index += 1
+        return data
+
+    def seek(self, time_stamp=None, index=None):
+        '''Moves playback to the first sample at or after a recorded system time stamp, or to a sample index.
+
+        Args:
+        time_stamp: Recorded system time stamp.
+        index: Sample index, used if time_stamp is None.
+        '''
+        with self.__lock:
+            if time_stamp is not None:
+                index = bisect.bisect_left(self.__system_time_stamps, time_stamp)
+            if index is None or not 0 <= index <= len(self.__system_time_stamps):
+                raise ValueError("Seek needs a time stamp or a sample index within the recording.")
+            self.__index = index
+            self.__seeks += 1
+            self.__anchor = None
+
+    def pause(self):
+        '''Halts playback from the thread until GazeReplay.resume is called.
+        '''
+        with self.__lock:
+            self.__paused = True
+
+    def resume(self):
+        with self.__lock:
+            self.__paused = False
+            self.__anchor = None
+
+    def run(self, count=None):
+        '''Delivers samples on the calling thread, without any waiting.
+
+        Args:
+        count: Number of samples to deliver, or None to deliver until the end of the recording. Must be given when
+        looping.
+
+        Returns:
+        The number of samples delivered.
+        '''
+        if count is None and self.__loop:
+            raise ValueError("A looping replay can only run a given number of samples.")
+        delivered = 0
+        while count is None or delivered < count:
+            with self.__lock:
+                data = self.__next()
+            if data is None:
+                break
+            tobii_pro_simulated.emit(_gaze_type_index, self.__address, data)
+            delivered += 1
+        self.__delivered += delivered
+        return delivered
+
+    def start(self):
+        '''Starts delivering samples from a thread at the set speed.
+        '''
+        with self.__lock:
+            if self.running:
+                return
+            self.__paused = False
+            self.__anchor = None
+            self.__stop = threading.Event()
+            self.__thread = threading.Thread(target=self.__run, args=(self.__stop,), name="GazeReplay")
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def stop(self):
+        '''Stops the playback thread. Playback can be started again from the current position.
+        '''
+        thread = self.__thread
+        if thread is not None:
+            self.__stop.set()
+            if thread is not threading.current_thread():
+                thread.join()
+            self.__thread = None
+
+    def wait(self, timeout=None):
+        '''Waits until the playback thread reached the end of the recording or was stopped.
+
+        Returns:
+        True if playback is over, False if the timeout ran out first.
+        '''
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def __run(self, stop):
+        while not stop.is_set():
+            with self.__lock:
+                if self.__paused:
+                    data = None
+                else:
+                    seeks = self.__seeks
+                    data = self.__next()
+                    if data is None:
+                        return
+                    speed = self.__speed
+                    if speed is not None:
+                        now = time.time()
+                        if self.__anchor is None:
+                            self.__anchor = (now, data["system_time_stamp"])
+                        due = self.__anchor[0] + (data["system_time_stamp"] - self.__anchor[1]) / (speed * 1e6)
+            if data is None:
+                time.sleep(0.01)
+                continue
+            if speed is not None:
+                # sleep in short steps, so pause, seek and stop take effect quickly
+                delay = due - time.time()
+                while delay > 0 and not stop.is_set() and not self.__paused and self.__seeks == seeks:
+                    time.sleep(min(delay, 0.01))
+                    delay = due - time.time()
+            with self.__lock:
+                if self.__seeks != seeks:
+                    # playback moved while the sample was waiting
+                    continue
+                if self.__paused or stop.is_set():
+                    # the sample goes out after resume or start instead
+                    self.__index -= 1
+                    continue
+            tobii_pro_simulated.emit(_gaze_type_index, self.__address, data)
+            self.__delivered += 1
@@ -1,6 +1,24 @@
 ##
 # @namespace tobii_research All functionality is in this module.
 
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from concurrent.futures import Future, TimeoutError
+except ImportError:
+    # Python 2 without the futures package; only the asynchronous methods need it.
+    Future = None
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 from tobiiresearch.implementation.EyeTracker import EyeTracker
 from tobiiresearch.interop import tobii_pro
 
@@ -38,6 +56,92 @@ VALIDITY_VALID_AND_USED = "validity_valid_and_used"
 _calibration_status = (CALIBRATION_STATUS_FAILURE, CALIBRATION_STATUS_SUCCESS)
 
 
+class _DeviceIO(object):
+    '''Runs calls for one eye tracker one after the other on a dedicated thread.
+
+    There is one _DeviceIO per eye tracker address, shared by all ScreenBasedCalibration objects for it, so
+    asynchronous calls reach the eye tracker in the order they were made.
+    '''
+
+    __lock = threading.Lock()
+    __instances = {}
+
+    @classmethod
+    def for_address(cls, address):
+        with cls.__lock:
+            if address not in cls.__instances:
+                cls.__instances[address] = cls(address)
+            return cls.__instances[address]
+
+    def __init__(self, address):
+        self.__queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name="DeviceIO " + address)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def submit(self, function, args, timeout):
+        if Future is None:
+            raise ImportError("The asynchronous calibration methods need concurrent.futures "
+                              "(the futures package on Python 2).")
+        future = Future()
+        # Serializes completing the future between the I/O thread and the timer.
+        lock = threading.Lock()
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, self.__expire, (future, lock, timeout))
+            timer.daemon = True
+            timer.start()
+        self.__queue.put((future, lock, timer, function, args))
+        return future
+
+    @staticmethod
+    def __expire(future, lock, timeout):
+        with lock:
+            if future.done():
+                return
+            # A call that has not started yet never will; one that is running can not be interrupted,
+            # its result is dropped when it returns.
+            if future.running() or future.set_running_or_notify_cancel():
+                future.set_exception(TimeoutError("The call did not complete within {0} s.".format(timeout)))
+
+    def __run(self):
+        while True:
+            future, lock, timer, function, args = self.__queue.get()
+            with lock:
+                start = not future.done() and future.set_running_or_notify_cancel()
+            if start:
+                try:
+                    result = function(*args)
+                except Exception as error:
+                    with lock:
+                        if not future.done():
+                            future.set_exception(error)
+                else:
+                    with lock:
+                        if not future.done():
+                            future.set_result(result)
+            if timer is not None:
+                timer.cancel()
+
+
+def as_awaitable(future, loop=None):
+    '''Wraps a future returned by the asynchronous ScreenBasedCalibration methods for use with asyncio.
+
+    Args:
+    future: concurrent.futures.Future, e.g. from ScreenBasedCalibration.collect_data_async.
+    loop: Event loop the result is delivered to, the current one if None.
+
+    Raises:
+    ImportError
+
+    Returns:
+    An asyncio future that can be awaited.
+    '''
+    if asyncio is None:
+        raise ImportError("as_awaitable needs asyncio (Python 3).")
+    return asyncio.wrap_future(future, loop=loop)
+
+
 class CalibrationEyeData(object):
     '''Represents the calibration sample data collected for one eye.
 
@@ -162,8 +266,53 @@ class CalibrationResult(object):
         return self.__calibration_points
 
 
+def find_weak_calibration_points(calibration_result, points, min_used=0.5):
+    '''Finds the calibration points that need their data collected again.
+
+    A point is weak if for either eye less than min_used of its samples were @ref VALIDITY_VALID_AND_USED, or if
+    the calibration result has no data for it at all. A failed calibration result makes every point weak.
+
+    Args:
+    calibration_result: CalibrationResult from ScreenBasedCalibration.compute_and_apply.
+    points: The (x, y) calibration points that were collected, in normalized display area coordinates.
+    min_used: Fraction of the samples of a point that has to be used in the calibration, for each eye.
+
+    Returns:
+    The weak points as a list of (x, y) tuples, in the order of points.
+    '''
+    used = {}
+    for calibration_point in calibration_result.calibration_points:
+        samples = calibration_point.calibration_samples
+        if not samples:
+            continue
+        fractions = [sum(1 for sample in samples if getattr(sample, eye).validity == VALIDITY_VALID_AND_USED) /
+                     float(len(samples)) for eye in ("left_eye", "right_eye")]
+        used[_point_key(calibration_point.position_on_display_area)] = min(fractions)
+    return [tuple(point) for point in points if used.get(_point_key(point), 0.0) < min_used]
+
+
+def _point_key(point):
+    # Collected positions come back as floats from the eye tracker.
+    return (round(point[0], 4), round(point[1], 4))
+
+
 class ScreenBasedCalibration(object):
     '''Provides methods and properties for managing calibrations for screen based eye trackers.
+
+    The methods block until the eye tracker is done. Each also has an asynchronous variant ending in _async that
+    returns a concurrent.futures.Future at once and makes the call on an I/O thread dedicated to the eye tracker,
+    so a render loop can keep drawing while data is collected or a calibration is computed:
+
+        future = calibration.collect_data_async(0.5, 0.5, timeout=5.0)
+        while not future.done():
+            draw_target()
+            win.flip()
+        status = future.result()
+
+    Asynchronous calls run one after the other in the order they were made. A call that has not started yet can
+    be cancelled with Future.cancel. If a timeout is given and the call has not completed by then, the future
+    fails with concurrent.futures.TimeoutError; a call that is already running on the eye tracker still finishes
+    there, and later calls wait for it. Use @ref as_awaitable to await the futures with asyncio.
     '''
 
     def __init__(self, eyetracker):
@@ -173,6 +322,12 @@ class ScreenBasedCalibration(object):
             raise ValueError("A ScreenBasedCalibration object must be initialized with an EyeTracker.")
 
         self.__address = eyetracker.address
+        self.__io = None
+
+    def __submit(self, function, args, timeout):
+        if self.__io is None:
+            self.__io = _DeviceIO.for_address(self.__address)
+        return self.__io.submit(function, args, timeout)
 
     def enter_calibration_mode(self):
         '''Enters the calibration mode and the eye tracker is made ready for
@@ -290,3 +445,112 @@ class ScreenBasedCalibration(object):
         calibration_points.append(CalibrationPoint(position, tuple(calibration_samples)))
 
         return CalibrationResult(CALIBRATION_STATUS_SUCCESS, tuple(calibration_points))
+
+    def enter_calibration_mode_async(self, timeout=None):
+        '''Asynchronous variant of ScreenBasedCalibration.enter_calibration_mode.
+
+        Args:
+        timeout: Seconds after which the future fails with TimeoutError, or None to wait as long as it takes.
+
+        Raises:
+        ImportError
+
+        Returns:
+        A concurrent.futures.Future with the result None, or one of the exceptions of enter_calibration_mode.
+        '''
+        return self.__submit(self.enter_calibration_mode, (), timeout)
+
+    def leave_calibration_mode_async(self, timeout=None):
+        '''Asynchronous variant of ScreenBasedCalibration.leave_calibration_mode.
+
+        Args:
+        timeout: Seconds after which the future fails with TimeoutError, or None to wait as long as it takes.
+
+        Raises:
+        ImportError
+
+        Returns:
+        A concurrent.futures.Future with the result None, or one of the exceptions of leave_calibration_mode.
+        '''
+        return self.__submit(self.leave_calibration_mode, (), timeout)
+
+    def collect_data_async(self, x, y, timeout=None):
+        '''Asynchronous variant of ScreenBasedCalibration.collect_data.
+
+        If the future times out while the eye tracker is collecting, the data may still be added to the
+        calibration; call discard_data for the point to be sure it is not used.
+
+        Args:
+        x: Normalized x coordinate on the active display area.
+        y: Normalized y coordinate on the active display area.
+        timeout: Seconds after which the future fails with TimeoutError, or None to wait as long as it takes.
+
+        Raises:
+        ImportError
+
+        Returns:
+        A concurrent.futures.Future with the result @ref CALIBRATION_STATUS_SUCCESS or
+        @ref CALIBRATION_STATUS_FAILURE, or one of the exceptions of collect_data.
+        '''
+        return self.__submit(self.collect_data, (x, y), timeout)
+
+    def discard_data_async(self, x, y, timeout=None):
+        '''Asynchronous variant of ScreenBasedCalibration.discard_data.
+
+        Args:
+        x: Normalized x coordinate on the active display area.
+        y: Normalized y coordinate on the active display area.
+        timeout: Seconds after which the future fails with TimeoutError, or None to wait as long as it takes.
+
+        Raises:
+        ImportError
+
+        Returns:
+        A concurrent.futures.Future with the result None, or one of the exceptions of discard_data.
+        '''
+        return self.__submit(self.discard_data, (x, y), timeout)
+
+    def compute_and_apply_async(self, timeout=None):
+        '''Asynchronous variant of ScreenBasedCalibration.compute_and_apply.
+
+        Args:
+        timeout: Seconds after which the future fails with TimeoutError, or None to wait as long as it takes.
+
+        Raises:
+        ImportError
+
+        Returns:
+        A concurrent.futures.Future with a CalibrationResult object, or one of the exceptions of compute_and_apply.
+        '''
+        return self.__submit(self.compute_and_apply, (), timeout)
+
+    def recalibrate_points(self, points, before_collect=None):
+        '''Collects the data for some points of the current calibration again and computes a new calibration.
+
+        For each point the data collected earlier is discarded and new data is collected, the data of all other
+        points is kept. Use @ref find_weak_calibration_points to find the points worth collecting again, so a
+        calibration with one bad point does not have to be repeated as a whole. Must be called in calibration mode.
+
+        Args:
+        points: The (x, y) points to collect again, in normalized display area coordinates.
+        before_collect: Called as before_collect(x, y) before the data for a point is collected, e.g. to show the
+        target and wait until it is looked at.
+
+        Raises:
+        EyeTrackerConnectionFailedError
+        EyeTrackerFeatureNotSupportedError
+        EyeTrackerInvalidOperationError
+        EyeTrackerLicenseError
+        EyeTrackerInternalError
+
+        Returns:
+        A CalibrationResult object.
+        '''
+        for x, y in points:
+            self.discard_data(x, y)
+            if before_collect is not None:
+                before_collect(x, y)
+            if self.collect_data(x, y) != CALIBRATION_STATUS_SUCCESS:
+                # Try once more, as the calibration procedure in the SDK examples does.
+                self.collect_data(x, y)
+        return self.compute_and_apply()
@@ -1,3 +1,3 @@
-__all__ = ("DisplayArea", "Errors", "ExternalSignalData", "EyeImageData", "EyeTracker", "GazeData",
-           "License", "_LogEntry", "Notifications", "ScreenBasedCalibration", "StreamErrorData",
-           "TimeSynchronizationData", "TrackBox")
+__all__ = ("DeviceDiscovery", "DisplayArea", "Errors", "ExternalSignalData", "EyeImageData", "EyeTracker",
+           "GazeData", "GazeDataArray", "GazeReplay", "License", "_LogEntry", "Notifications",
+           "ScreenBasedCalibration", "StreamErrorData", "TimeSynchronizationData", "TrackBox")
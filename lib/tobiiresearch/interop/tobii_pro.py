@@ -4,9 +4,15 @@ Created on 29 juli 2016
 '''
 
 import atexit
+import os
 import threading
+import time
 
-from tobiiresearch.interop import tobii_pro_internal
+# TOBII_RESEARCH_BACKEND=simulated replaces the native module with a pure Python simulation of an eye tracker.
+if os.environ.get("TOBII_RESEARCH_BACKEND", "native") == "simulated":
+    from tobiiresearch.interop import tobii_pro_simulated as tobii_pro_internal
+else:
+    from tobiiresearch.interop import tobii_pro_internal
 from tobiiresearch.implementation.DisplayArea import DisplayArea
 from tobiiresearch.implementation.TrackBox import TrackBox
 from tobiiresearch.implementation.Errors import EyeTrackerOperationFailedError
@@ -56,19 +62,72 @@ class TobiiProCallback(object):
                                         format(self.__stream_name, type(e).__name__, str(e)))
 
 
+class TobiiProBatchCallback(TobiiProCallback):
+    '''Collects samples and calls the user callback with a list of them.
+
+    A batch is delivered when it holds batch_size samples, or by a timer when its oldest sample has waited
+    max_latency seconds, whether more samples arrive or not. Batches are delivered one at a time and in order.
+    '''
+
+    def __init__(self, address, stream_name, user_callback, batch_size, max_latency):
+        super(TobiiProBatchCallback, self).__init__(address, stream_name, user_callback)
+        self.__batch_size = batch_size
+        self.__max_latency = max_latency
+        self.__batch = []
+        # Counts the batches taken, so a timer that fires late can tell its batch was delivered already.
+        self.__batch_number = 0
+        self.__timer = None
+        self.__lock = threading.Lock()
+        self.__delivery_lock = threading.Lock()
+
+    def __call__(self, dictionary_with_data):
+        with self.__lock:
+            self.__batch.append(dictionary_with_data)
+            if len(self.__batch) == 1 and self.__max_latency is not None:
+                self.__timer = threading.Timer(self.__max_latency, self.__deliver, (self.__batch_number,))
+                self.__timer.daemon = True
+                self.__timer.start()
+            if len(self.__batch) < self.__batch_size:
+                return
+        self.__deliver()
+
+    def __deliver(self, batch_number=None):
+        with self.__delivery_lock:
+            with self.__lock:
+                if batch_number is not None and batch_number != self.__batch_number:
+                    return
+                batch, self.__batch = self.__batch, []
+                self.__batch_number += 1
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    self.__timer = None
+            if len(batch) > 0:
+                super(TobiiProBatchCallback, self).__call__(batch)
+
+    def flush(self):
+        self.__deliver()
+
+
 __callbacks = {}
+# Immutable tuples of the callbacks in __callbacks. They are replaced, never modified, whenever __callbacks changes,
+# so the per sample dispatch can read them without taking any lock.
+__callback_snapshots = {}
 __callback_lock = threading.RLock()
 __subscribe_lock = threading.RLock()
 
 
-def __subscription_callback(subscription_type, address, data):
+def __update_callback_snapshot(subscription_tuple):
     global __callbacks
-    global __callback_lock
-    callbacks = []
-    with __callback_lock:
-        for callback in __callbacks.get((subscription_type, address), {}).itervalues():
-            callbacks.append(callback)
-    for callback in callbacks:
+    global __callback_snapshots
+    callbacks = __callbacks.get(subscription_tuple)
+    if callbacks:
+        __callback_snapshots[subscription_tuple] = tuple(callbacks.itervalues())
+    else:
+        __callback_snapshots.pop(subscription_tuple, None)
+
+
+def __subscription_callback(subscription_type, address, data):
+    for callback in __callback_snapshots.get((subscription_type, address), ()):
         callback(data)
 
 
@@ -84,16 +143,20 @@ def get_device(address):
     return TobiiProEyeTrackerData(result[1])
 
 
-def subscribe_to(subscription_type, stream_name, tracker, callback):
+def subscribe_to(subscription_type, stream_name, tracker, callback, batch_size=None, max_latency=None):
     global __callbacks
     global __callback_lock
     global __subscribe_lock
     with __subscribe_lock:
         address = "" if tracker is None else tracker.address
         subscription_tuple = (subscription_type, address)
+        if batch_size is None:
+            tobii_pro_callback = TobiiProCallback(address, stream_name, callback)
+        else:
+            tobii_pro_callback = TobiiProBatchCallback(address, stream_name, callback, batch_size, max_latency)
         with __callback_lock:
-            __callbacks.setdefault(subscription_tuple, {})[tracker] =\
-                TobiiProCallback(address, stream_name, callback)
+            __callbacks.setdefault(subscription_tuple, {})[tracker] = tobii_pro_callback
+            __update_callback_snapshot(subscription_tuple)
             count = len(__callbacks[subscription_tuple])
         if count == 1:
             status = tobii_pro_internal.subscribe_to(subscription_type, address,
@@ -116,11 +179,22 @@ def unsubscribe_from(subscription_type, tracker):
                 if len(__callbacks[subscription_tuple]) == 0:
                     del __callbacks[subscription_tuple]
                     unsubscribe = True
+                __update_callback_snapshot(subscription_tuple)
         if unsubscribe:
             status = tobii_pro_internal.unsubscribe_from(subscription_type, address)
             _on_error_raise_exception(status[0])
 
 
+def flush_subscription(subscription_type, tracker):
+    global __callbacks
+    global __callback_lock
+    address = "" if tracker is None else tracker.address
+    with __callback_lock:
+        callback = __callbacks.get((subscription_type, address), {}).get(tracker)
+    if isinstance(callback, TobiiProBatchCallback):
+        callback.flush()
+
+
 def apply_licenses(address, licenses):
     result = tobii_pro_internal.apply_licenses(address, licenses)
     _on_error_raise_exception(result[0])
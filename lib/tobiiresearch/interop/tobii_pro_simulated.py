@@ -0,0 +1,750 @@
+'''
+Pure Python stand-in for the native tobii_pro_internal module.
+
+Set the environment variable TOBII_RESEARCH_BACKEND to "simulated" before tobiiresearch is imported to use it. Every
+function has the same signature and (status, value) return convention as its native counterpart, so EyeTracker,
+ScreenBasedCalibration and everything built on them run unchanged without a device.
+
+One simulated eye tracker is available after startup. More can be added with add_device and tuned with configure.
+Gaze is synthesized from a simple model of a participant looking at the display: fixations with measurement noise,
+main sequence saccades, blinks and single eye dropouts, plus a systematic offset that calibrating reduces. With
+streaming enabled (the default) a thread per device delivers the subscribed streams in real time; with streaming
+disabled nothing is delivered on its own and generate or emit push data synchronously, e.g. for benchmarks.
+'''
+
+import json
+import math
+import random
+import threading
+import time
+
+# These must match __TobiiProStatus in Errors.py
+_ok = 0
+_invalid_parameter = 10
+_invalid_operation = 11
+_se_connection_failed = 204
+_se_calibration_already_started = 210
+_se_calibration_not_started = 211
+_se_already_subscribed = 212
+_se_not_subscribed = 213
+_se_operation_failed = 215
+
+# These must match the type_index values in EyeTracker.py
+_log = 0
+_gaze_data = 1
+_external_signal = 2
+_time_synchronization_data = 3
+_stream_errors = 4
+_notifications = 5
+_eye_images = 6
+
+_device_streams = (_gaze_data, _external_signal, _time_synchronization_data, _stream_errors, _notifications,
+                   _eye_images)
+
+GAZE_OUTPUT_FREQUENCIES = (30.0, 60.0, 120.0, 150.0, 250.0, 300.0, 600.0, 1200.0)
+EYE_TRACKING_MODES = ("Default", "Infant")
+
+# Settings of a simulated eye tracker, see configure.
+DEFAULT_SETTINGS = {
+    "gaze_output_frequency": 120.0,
+    "eye_tracking_mode": "Default",
+    # RMS measurement noise in degrees, per eye and axis
+    "noise": 0.1,
+    # blinks per second and their duration in seconds
+    "blink_rate": 0.3,
+    "blink_duration": 0.15,
+    # probability that a single eye is lost for one sample
+    "dropout": 0.01,
+    # saccades per second; fixations are at least 0.1 s long
+    "saccade_rate": 2.5,
+    # systematic gaze error in degrees before and after calibration
+    "offset": 1.5,
+    "calibrated_offset": 0.3,
+    # eye distance from the display in mm
+    "distance": 650.0,
+    "eye_image_frequency": 30.0,
+    # seconds between time synchronization packets
+    "time_synchronization_interval": 1.0,
+    # deliver subscribed streams from a thread in real time
+    "streaming": True,
+    # seed for the random generator, None for a random seed
+    "seed": None,
+}
+
+_capabilities = ("capability_can_set_display_area", "capability_has_external_signal", "capability_has_eye_images")
+
+# A 23 inch 16:9 display standing on the eye tracker, in user coordinates (mm)
+_display_area = {"top_left": (-254.9, 302.8, 0.0),
+                 "top_right": (254.9, 302.8, 0.0),
+                 "bottom_left": (-254.9, 16.0, 0.0),
+                 "bottom_right": (254.9, 16.0, 0.0),
+                 "width": 509.8,
+                 "height": 286.8}
+
+_track_box = {"back_lower_left": (-220.0, 0.0, 850.0),
+              "back_lower_right": (220.0, 0.0, 850.0),
+              "back_upper_left": (-220.0, 350.0, 850.0),
+              "back_upper_right": (220.0, 350.0, 850.0),
+              "front_lower_left": (-150.0, 60.0, 450.0),
+              "front_lower_right": (150.0, 60.0, 450.0),
+              "front_upper_left": (-150.0, 290.0, 450.0),
+              "front_upper_right": (150.0, 290.0, 450.0)}
+
+# A 1x1 pixel GIF used as eye image payload
+_eye_image = bytearray(b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,"
+                       b"\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;")
+
+_nan = float("nan")
+
+_lock = threading.RLock()
+_callbacks = {}
+_devices = {}
+_started = False
+
+
+def _system_time_stamp():
+    return int(time.time() * 1000000)
+
+
+def _deliver(subscription_type, address, data):
+    callback = _callbacks.get((subscription_type, address))
+    if callback is not None:
+        callback(data)
+
+
+def _is_subscribed(subscription_type, address):
+    return (subscription_type, address) in _callbacks
+
+
+class _GazeModel(object):
+    '''Synthesizes the gaze of one participant, sample by sample.
+
+    Positions are tracked in normalized display area coordinates; angles are converted with the eye distance.
+    '''
+
+    def __init__(self, settings, rng):
+        self.__settings = settings
+        self.__rng = rng
+        self.__position = (0.5, 0.5)
+        self.__saccade = None
+        self.__next_saccade = None
+        self.__blink_until = None
+        self.__next_blink = None
+        self.calibrated = False
+        # direction of the systematic error per eye
+        self.__offset_angles = (rng.uniform(0.0, 2 * math.pi), rng.uniform(0.0, 2 * math.pi))
+
+    def __interval(self, rate, minimum):
+        if rate <= 0:
+            return float("inf")
+        return minimum + self.__rng.expovariate(rate) * 1000000
+
+    def __degrees_to_display(self, degrees):
+        millimeters = self.__settings["distance"] * math.tan(math.radians(degrees))
+        return (millimeters / _display_area["width"], millimeters / _display_area["height"])
+
+    def blinking(self, time_stamp):
+        return self.__blink_until is not None and time_stamp < self.__blink_until
+
+    def __update_position(self, time_stamp):
+        rng = self.__rng
+        if self.__next_saccade is None:
+            self.__next_saccade = time_stamp + self.__interval(self.__settings["saccade_rate"], 100000)
+            self.__next_blink = time_stamp + self.__interval(self.__settings["blink_rate"], 0)
+
+        if self.__saccade is not None:
+            start, duration, origin, target = self.__saccade
+            progress = (time_stamp - start) / duration
+            if progress >= 1.0:
+                self.__position = target
+                self.__saccade = None
+                self.__next_saccade = time_stamp + self.__interval(self.__settings["saccade_rate"], 100000)
+            else:
+                # smooth velocity profile, fastest in the middle
+                progress = progress * progress * (3 - 2 * progress)
+                self.__position = (origin[0] + (target[0] - origin[0]) * progress,
+                                   origin[1] + (target[1] - origin[1]) * progress)
+        elif time_stamp >= self.__next_saccade:
+            target = (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9))
+            per_degree = self.__degrees_to_display(1.0)
+            amplitude = math.hypot((target[0] - self.__position[0]) / per_degree[0],
+                                   (target[1] - self.__position[1]) / per_degree[1])
+            # main sequence: 2.2 ms per degree plus 21 ms
+            self.__saccade = (time_stamp, (2.2 * amplitude + 21.0) * 1000, self.__position, target)
+
+        if time_stamp >= self.__next_blink:
+            self.__blink_until = time_stamp + self.__settings["blink_duration"] * 1000000
+            self.__next_blink = self.__blink_until + self.__interval(self.__settings["blink_rate"], 0)
+
+    def look_at(self, position):
+        '''Ends any saccade and fixates position, e.g. a calibration target.'''
+        self.__position = position
+        self.__saccade = None
+
+    def eye_sample(self, eye, time_stamp, position=None):
+        '''Returns the measured gaze point of one eye, or None if the eye is lost.'''
+        rng = self.__rng
+        if self.blinking(time_stamp) or rng.random() < self.__settings["dropout"]:
+            return None
+        if position is None:
+            position = self.__position
+        offset = self.__settings["calibrated_offset" if self.calibrated else "offset"]
+        offset_x, offset_y = self.__degrees_to_display(offset)
+        noise_x, noise_y = self.__degrees_to_display(self.__settings["noise"])
+        angle = self.__offset_angles[eye]
+        return (position[0] + offset_x * math.cos(angle) + rng.gauss(0.0, noise_x),
+                position[1] + offset_y * math.sin(angle) + rng.gauss(0.0, noise_y))
+
+    def gaze_data(self, time_stamp, device_time_stamp):
+        self.__update_position(time_stamp)
+        data = {"device_time_stamp": device_time_stamp, "system_time_stamp": time_stamp}
+        seconds = time_stamp / 1000000.0
+        # slow head movement
+        head = (15.0 * math.sin(seconds * 0.3), 160.0 + 8.0 * math.sin(seconds * 0.2),
+                self.__settings["distance"] + 20.0 * math.sin(seconds * 0.1))
+        for eye, name, side in ((0, "left", -1), (1, "right", 1)):
+            point = self.eye_sample(eye, time_stamp)
+            if point is None:
+                data[name + "_gaze_point_on_display_area"] = (_nan, _nan)
+                data[name + "_gaze_point_in_user_coordinate_system"] = (_nan, _nan, _nan)
+                data[name + "_gaze_point_validity"] = 0
+                data[name + "_pupil_diameter"] = _nan
+                data[name + "_pupil_validity"] = 0
+                data[name + "_gaze_origin_in_user_coordinate_system"] = (_nan, _nan, _nan)
+                data[name + "_gaze_origin_in_trackbox_coordinate_system"] = (_nan, _nan, _nan)
+                data[name + "_gaze_origin_validity"] = 0
+                continue
+            origin = (head[0] + side * 32.0, head[1], head[2])
+            data[name + "_gaze_point_on_display_area"] = point
+            data[name + "_gaze_point_in_user_coordinate_system"] = _display_area_point(point)
+            data[name + "_gaze_point_validity"] = 1
+            data[name + "_pupil_diameter"] = 3.2 + 0.3 * math.sin(seconds * 0.6) + self.__rng.gauss(0.0, 0.02)
+            data[name + "_pupil_validity"] = 1
+            data[name + "_gaze_origin_in_user_coordinate_system"] = origin
+            data[name + "_gaze_origin_in_trackbox_coordinate_system"] = _track_box_point(origin)
+            data[name + "_gaze_origin_validity"] = 1
+        return data
+
+
+def _display_area_point(point):
+    top_left = _display_area["top_left"]
+    top_right = _display_area["top_right"]
+    bottom_left = _display_area["bottom_left"]
+    return tuple(top_left[i] + point[0] * (top_right[i] - top_left[i]) + point[1] * (bottom_left[i] - top_left[i])
+                 for i in range(3))
+
+
+def _track_box_point(origin):
+    # normalized within the back face of the track box, which is good enough for a simulation
+    lower_left = _track_box["back_lower_left"]
+    upper_right = _track_box["back_upper_right"]
+    front = _track_box["front_lower_left"][2]
+    return ((upper_right[0] - origin[0]) / (upper_right[0] - lower_left[0]),
+            (upper_right[1] - origin[1]) / (upper_right[1] - lower_left[1]),
+            (origin[2] - front) / (lower_left[2] - front))
+
+
+class SimulatedEyeTracker(object):
+    '''State of one simulated device. Use the module functions rather than this class directly.
+    '''
+
+    def __init__(self, address, serial_number, settings):
+        self.address = address
+        self.serial_number = serial_number
+        self.device_name = "Simulated Eye Tracker"
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings)
+        self.rng = random.Random(self.settings["seed"])
+        self.model = _GazeModel(self.settings, self.rng)
+        self.connected = True
+        self.calibrating = False
+        # (position, left sample, left validity, right sample, right validity) tuples
+        self.calibration_samples = []
+        self.calibration = None
+        self.display_area = dict(_display_area)
+        self.external_signal = 0
+        self.licenses = []
+        # device clock started an hour ago
+        self.device_clock_offset = _system_time_stamp() - 3600 * 1000000
+        self.generated_time_stamp = None
+        self.lock = threading.RLock()
+        self.__thread = None
+        self.__stop = None
+
+    def data(self):
+        return {"address": self.address,
+                "device_name": self.device_name,
+                "serial_number": self.serial_number,
+                "model": "Simulated",
+                "firmware_version": "0.0.0-simulated",
+                "device_capabilities": _capabilities}
+
+    def gaze_data(self, time_stamp):
+        with self.lock:
+            return self.model.gaze_data(time_stamp, time_stamp - self.device_clock_offset)
+
+    def notify(self, notification_type, **values):
+        values["notification_type"] = notification_type
+        values["system_time_stamp"] = _system_time_stamp()
+        _deliver(_notifications, self.address, values)
+
+    def update_streaming(self):
+        '''Starts or stops the delivery thread to match the subscriptions and settings.'''
+        streaming = self.settings["streaming"] and any(_is_subscribed(subscription_type, self.address)
+                                                       for subscription_type in _device_streams)
+        if streaming and self.__thread is None:
+            self.__stop = threading.Event()
+            self.__thread = threading.Thread(target=self.__run, args=(self.__stop,),
+                                             name="Simulated eye tracker " + self.serial_number)
+            self.__thread.daemon = True
+            self.__thread.start()
+        elif not streaming and self.__thread is not None:
+            self.__stop.set()
+            if self.__thread is not threading.current_thread():
+                self.__thread.join()
+            self.__thread = None
+
+    def __run(self, stop):
+        now = _system_time_stamp()
+        next_gaze = next_image = next_synchronization = now
+        camera_id = 0
+        while not stop.is_set():
+            now = _system_time_stamp()
+            frequency = self.settings["gaze_output_frequency"]
+            if _is_subscribed(_gaze_data, self.address) and self.connected:
+                # samples that are due keep their regular time stamps even if the thread was late
+                while next_gaze <= now:
+                    _deliver(_gaze_data, self.address, self.gaze_data(int(next_gaze)))
+                    next_gaze += 1000000.0 / frequency
+            else:
+                next_gaze = now + 1000000.0 / frequency
+
+            if _is_subscribed(_eye_images, self.address) and self.connected and next_image <= now:
+                cropped = _is_subscribed(_gaze_data, self.address)
+                _deliver(_eye_images, self.address,
+                          {"device_time_stamp": now - self.device_clock_offset,
+                           "system_time_stamp": now,
+                           "camera_id": camera_id,
+                           "image_type": "eye_image_type_cropped" if cropped else "eye_image_type_full",
+                           "image_data": bytes(_eye_image)})
+                camera_id = 1 - camera_id
+                next_image = now + 1000000.0 / self.settings["eye_image_frequency"]
+
+            if _is_subscribed(_time_synchronization_data, self.address) and next_synchronization <= now:
+                response = _system_time_stamp()
+                _deliver(_time_synchronization_data, self.address,
+                          {"system_request_time_stamp": now,
+                           "device_time_stamp": (now + response) // 2 - self.device_clock_offset,
+                           "system_response_time_stamp": response})
+                next_synchronization = now + self.settings["time_synchronization_interval"] * 1000000
+
+            wake = min(next_gaze, next_image, next_synchronization)
+            delay = (wake - _system_time_stamp()) / 1000000.0
+            # Event.wait polls coarsely on Python 2, sleep is far more precise at high frequencies
+            time.sleep(min(max(delay, 0.0), 0.05))
+
+
+def _device(address):
+    return _devices.get(address)
+
+
+def _log_entry(message):
+    _deliver(_log, "", {"system_time_stamp": _system_time_stamp(),
+                         "source": "simulated",
+                         "level": "information",
+                         "message": message})
+
+
+def add_device(serial_number=None, **settings):
+    '''Adds a simulated eye tracker and returns its address. See DEFAULT_SETTINGS for the settings.'''
+    with _lock:
+        if serial_number is None:
+            serial_number = "SIM-{0:04d}".format(len(_devices) + 1)
+        address = "tobii-sim://" + serial_number
+        if address in _devices:
+            raise ValueError("There already is a simulated eye tracker {0}.".format(serial_number))
+        _check_settings(settings)
+        _devices[address] = SimulatedEyeTracker(address, serial_number, settings)
+        _log_entry("Added simulated eye tracker " + address)
+        return address
+
+
+def remove_device(address):
+    '''Removes a simulated eye tracker, as if it had been unplugged.'''
+    with _lock:
+        device = _devices.pop(address)
+        for subscription_type in _device_streams:
+            _callbacks.pop((subscription_type, address), None)
+        device.update_streaming()
+
+
+def _check_settings(settings):
+    for key in settings:
+        if key not in DEFAULT_SETTINGS:
+            raise ValueError("Unknown simulation setting {0}.".format(key))
+
+
+def configure(address=None, **settings):
+    '''Changes the settings of one simulated eye tracker, or of all if address is None.'''
+    _check_settings(settings)
+    with _lock:
+        devices = _devices.values() if address is None else [_devices[address]]
+        for device in devices:
+            with device.lock:
+                device.settings.update(settings)
+                if "seed" in settings:
+                    # start over, so generate repeats its output
+                    device.rng.seed(settings["seed"])
+                    device.model = _GazeModel(device.settings, device.rng)
+                    device.generated_time_stamp = None
+            device.update_streaming()
+
+
+def devices():
+    '''Returns the addresses of all simulated eye trackers.'''
+    with _lock:
+        return sorted(_devices.keys())
+
+
+def emit(subscription_type, address, data):
+    '''Delivers data to the callback subscribed to subscription_type, if any, on the calling thread.
+
+    Returns True if there was a subscriber.
+    '''
+    callback = _callbacks.get((subscription_type, address))
+    if callback is None:
+        return False
+    callback(data)
+    return True
+
+
+def generate(address, count):
+    '''Synthesizes count gaze samples and delivers them on the calling thread.
+
+    Time stamps continue from the previous call at the configured gaze output frequency, independent of the wall
+    clock, so the output is reproducible with a fixed seed. Returns the number of samples delivered.
+    '''
+    device = _devices[address]
+    callback = _callbacks.get((_gaze_data, address))
+    with device.lock:
+        time_stamp = device.generated_time_stamp
+        if time_stamp is None:
+            time_stamp = device.device_clock_offset + 3600 * 1000000
+        step = 1000000.0 / device.settings["gaze_output_frequency"]
+        samples = []
+        for i in xrange(count):
+            time_stamp += step
+            samples.append(device.gaze_data(int(time_stamp)))
+        device.generated_time_stamp = time_stamp
+    if callback is None:
+        return 0
+    for sample in samples:
+        callback(sample)
+    return len(samples)
+
+
+def trigger_external_signal(address, value):
+    '''Simulates a change on the external signal (TTL) port.'''
+    device = _devices[address]
+    device.external_signal = value
+    now = _system_time_stamp()
+    _deliver(_external_signal, address, {"value": value,
+                                          "change_type": "external_signal_change_type_value_changed",
+                                          "device_time_stamp": now - device.device_clock_offset,
+                                          "system_time_stamp": now})
+
+
+def simulate_connection_lost(address):
+    '''Stops all data from the eye tracker until simulate_connection_restored is called.'''
+    device = _devices[address]
+    device.connected = False
+    device.notify("eyetracker_notification_connection_lost")
+
+
+def simulate_connection_restored(address):
+    device = _devices[address]
+    device.connected = True
+    device.notify("eyetracker_notification_connection_restored")
+    now = _system_time_stamp()
+    _deliver(_external_signal, address, {"value": device.external_signal,
+                                          "change_type": "external_signal_change_type_connection_restored",
+                                          "device_time_stamp": now - device.device_clock_offset,
+                                          "system_time_stamp": now})
+
+
+def startup():
+    global _started
+    with _lock:
+        if not _started:
+            _started = True
+            if len(_devices) == 0:
+                add_device()
+
+
+def cleanup():
+    global _started
+    with _lock:
+        _started = False
+        _callbacks.clear()
+        for device in _devices.values():
+            device.update_streaming()
+
+
+def report_stream_error(address, message):
+    _deliver(_stream_errors, address, {"system_time_stamp": _system_time_stamp(),
+                                        "error": "stream_error_user_error",
+                                        "source": "stream_error_source_user",
+                                        "message": message})
+
+
+def find_all_eyetrackers():
+    with _lock:
+        return (_ok, [_devices[address].data() for address in sorted(_devices.keys())])
+
+
+def get_device(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    return (_ok, device.data())
+
+
+def subscribe_to(subscription_type, address, callback):
+    device = None
+    with _lock:
+        if subscription_type != _log:
+            device = _device(address)
+            if device is None:
+                return (_se_connection_failed,)
+        if (subscription_type, address) in _callbacks:
+            return (_se_already_subscribed,)
+        _callbacks[(subscription_type, address)] = callback
+    if subscription_type == _external_signal:
+        now = _system_time_stamp()
+        callback({"value": device.external_signal,
+                  "change_type": "external_signal_change_type_initial_value",
+                  "device_time_stamp": now - device.device_clock_offset,
+                  "system_time_stamp": now})
+    if device is not None:
+        device.update_streaming()
+    return (_ok,)
+
+
+def unsubscribe_from(subscription_type, address):
+    with _lock:
+        if _callbacks.pop((subscription_type, address), None) is None:
+            return (_se_not_subscribed,)
+        device = _device(address)
+    if device is not None:
+        device.update_streaming()
+    return (_ok,)
+
+
+def apply_licenses(address, licenses):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    device.licenses.extend(licenses)
+    return (_ok, [0] * len(licenses))
+
+
+def clear_applied_licenses(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    del device.licenses[:]
+    return (_ok,)
+
+
+def get_all_gaze_output_frequencies(address):
+    if _device(address) is None:
+        return (_se_connection_failed,)
+    return (_ok, GAZE_OUTPUT_FREQUENCIES)
+
+
+def get_gaze_output_frequency(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    return (_ok, device.settings["gaze_output_frequency"])
+
+
+def set_gaze_output_frequency(address, frame_rate):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    if float(frame_rate) not in GAZE_OUTPUT_FREQUENCIES:
+        return (_invalid_parameter,)
+    device.settings["gaze_output_frequency"] = float(frame_rate)
+    device.notify("eyetracker_notification_gaze_output_frequency_changed", gaze_output_frequency=float(frame_rate))
+    return (_ok,)
+
+
+def get_all_eye_tracking_modes(address):
+    if _device(address) is None:
+        return (_se_connection_failed,)
+    return (_ok, EYE_TRACKING_MODES)
+
+
+def get_eye_tracking_mode(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    return (_ok, device.settings["eye_tracking_mode"])
+
+
+def set_eye_tracking_mode(address, eye_tracking_mode):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    if eye_tracking_mode not in EYE_TRACKING_MODES:
+        return (_invalid_parameter,)
+    device.settings["eye_tracking_mode"] = eye_tracking_mode
+    return (_ok,)
+
+
+def screen_based_calibration_enter_calibration_mode(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if device.calibrating:
+            return (_se_calibration_already_started,)
+        device.calibrating = True
+        del device.calibration_samples[:]
+    device.notify("eyetracker_notification_calibration_mode_entered")
+    return (_ok,)
+
+
+def screen_based_calibration_leave_calibration_mode(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if not device.calibrating:
+            return (_se_calibration_not_started,)
+        device.calibrating = False
+    device.notify("eyetracker_notification_calibration_mode_left")
+    return (_ok,)
+
+
+def screen_based_calibration_collect_data(address, x, y):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if not device.calibrating:
+            return (_se_calibration_not_started,)
+        position = (float(x), float(y))
+        now = _system_time_stamp()
+        # the participant looks at the target while a few samples are collected
+        device.model.look_at(position)
+        samples = []
+        for i in range(8):
+            time_stamp = now + i * 8000
+            left = device.model.eye_sample(0, time_stamp, position)
+            right = device.model.eye_sample(1, time_stamp, position)
+            samples.append((position,
+                            left or (_nan, _nan), -1 if left is None else 1,
+                            right or (_nan, _nan), -1 if right is None else 1))
+        if all(sample[2] == -1 and sample[4] == -1 for sample in samples):
+            return (_se_operation_failed,)
+        device.calibration_samples.extend(samples)
+    return (_ok,)
+
+
+def screen_based_calibration_discard_data(address, x, y):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if not device.calibrating:
+            return (_se_calibration_not_started,)
+        device.calibration_samples[:] = [sample for sample in device.calibration_samples
+                                         if abs(sample[0][0] - x) > 1e-6 or abs(sample[0][1] - y) > 1e-6]
+    return (_ok,)
+
+
+def screen_based_calibration_compute_and_apply(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if not device.calibrating:
+            return (_se_calibration_not_started,)
+        if len(device.calibration_samples) == 0:
+            return (_se_operation_failed,)
+        device.calibration = list(device.calibration_samples)
+        device.model.calibrated = True
+    return (_ok,)
+
+
+def screen_based_calibration_get_calibration_points(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if device.calibration is None:
+            return (_se_operation_failed,)
+        return (_ok, [{"position": position,
+                       "left_sample_position": left,
+                       "left_validity": left_validity,
+                       "right_sample_position": right,
+                       "right_validity": right_validity}
+                      for position, left, left_validity, right, right_validity in device.calibration])
+
+
+def calibration_retrieve(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    with device.lock:
+        if device.calibration is None:
+            return (_ok, None)
+        return (_ok, bytearray(json.dumps({"serial_number": device.serial_number,
+                                           "samples": device.calibration})))
+
+
+def calibration_apply(address, data):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    try:
+        samples = json.loads(str(data))["samples"]
+        calibration = [(tuple(position), tuple(left), left_validity, tuple(right), right_validity)
+                       for position, left, left_validity, right, right_validity in samples]
+    except (ValueError, KeyError, TypeError):
+        return (_invalid_parameter,)
+    with device.lock:
+        device.calibration = calibration
+        device.model.calibrated = True
+    return (_ok,)
+
+
+def get_display_area(address):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    return (_ok, dict(device.display_area))
+
+
+def get_track_box(address):
+    if _device(address) is None:
+        return (_se_connection_failed,)
+    return (_ok, dict(_track_box))
+
+
+def get_system_time_stamp():
+    return (_ok, _system_time_stamp())
+
+
+def get_sdk_version():
+    return (_ok, "simulated")
+
+
+def set_device_name(address, device_name):
+    device = _device(address)
+    if device is None:
+        return (_se_connection_failed,)
+    device.device_name = device_name
+    return (_ok,)
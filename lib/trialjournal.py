@@ -0,0 +1,253 @@
+#!/usr/bin/python
+#
+# Append-only trial data journal
+# - trials are queued by the experiment and written, flushed and fsynced
+#   by a background thread, so a slow disk never delays the next trial
+# - fsyncs are batched by a durability policy: after every N trials,
+#   every T seconds, or both; closing always syncs
+# - the journal is tab separated text with one complete line per trial,
+#   written with a single write call; a line cut short by a crash has no
+#   newline, it is skipped when reading and cut off when the journal is
+#   opened again, so everything before it survives
+# - once a write or sync fails the journal is not written any more; the
+#   error is raised from the next write, sync or close, and the rows that
+#   did not make it are kept and saved to a .unwritten file on close
+# - after the session the journal can be exported to a clean .tsv or a
+#   real .xlsx (needs openpyxl)
+#
+
+import atexit
+import os
+import threading
+import time
+import Queue
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class TrialJournal(threading.Thread):
+    """Writes trials (dictionaries) as rows of the given columns.
+
+    An existing journal is appended to; the header line is only written to
+    an empty file. syncEvery is the number of trials after which the file
+    is fsynced (1 syncs every trial, None never by count) and syncInterval
+    the number of seconds after which written trials are fsynced at the
+    latest (None for no time limit). With echo every row is also printed,
+    from the writer thread.
+
+    After a write or sync error the rows that were not written are kept in
+    unwritten and the error is raised from write, sync and close."""
+
+    def __init__(self, fileName, columns, syncEvery=1, syncInterval=None,
+                 echo=False):
+        threading.Thread.__init__(self, name='TrialJournal')
+        self.daemon = True
+        if syncEvery is not None and syncEvery < 1:
+            raise ValueError("syncEvery must be 1 or more trials, or None.")
+        self.fileName = fileName
+        self.columns = list(columns)
+        self.syncEvery = syncEvery
+        self.syncInterval = syncInterval
+        self.echo = echo
+        self.error = None
+        self.unwritten = []
+        self.unwrittenFile = None
+        self.written = 0
+        self.synced = 0
+        self.closed = False
+        self._queue = Queue.Queue()
+        if os.path.exists(fileName):
+            # the next trial must not run into a line a crash cut short
+            _truncatePartialLine(fileName)
+        self._file = open(fileName, 'a')
+        if self._file.tell() == 0:
+            self._writeLines(['\t'.join(self.columns) + '\n'])
+            self._sync()
+        atexit.register(self.close)
+        self.start()
+
+    def write(self, trial):
+        # takes the values now, formatting and writing happens on the
+        # writer thread; a missing column raises KeyError right here
+        if self.closed:
+            raise ValueError("The trial journal %s is closed." %
+                             self.fileName)
+        # queued even after an error, so unwritten keeps the trial order
+        self._queue.put(tuple(trial[column] for column in self.columns))
+        if self.error is not None:
+            raise self.error
+
+    def sync(self):
+        # fsyncs everything written so far, whatever the policy
+        if self.error is not None:
+            raise self.error
+        self._queue.put('sync')
+
+    def close(self):
+        # writes and syncs everything still queued and waits for the
+        # writer thread to finish
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(None)
+        self.join()
+        if self.unwritten:
+            try:
+                self._saveUnwritten()
+            except EnvironmentError:
+                # the rows stay in unwritten, the first error is raised
+                pass
+        if self.error is not None:
+            raise self.error
+
+    def _saveUnwritten(self):
+        # a new file next to the journal, the journal itself may end with
+        # a line cut short by the error
+        fileName = self.fileName + '.unwritten'
+        lines = [_line(row) for row in self.unwritten]
+        with open(fileName, 'w') as f:
+            f.write(''.join(['\t'.join(self.columns) + '\n'] + lines))
+            f.flush()
+            os.fsync(f.fileno())
+        self.unwritten = []
+        self.unwrittenFile = fileName
+
+    def _writeLines(self, lines):
+        self._file.write(''.join(lines))
+        self._file.flush()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self.synced = self.written
+        self._lastSync = time.time()
+
+    def _due(self):
+        unsynced = self.written - self.synced
+        if not unsynced:
+            return False
+        if self.syncEvery is not None and unsynced >= self.syncEvery:
+            return True
+        return (self.syncInterval is not None and
+                time.time() - self._lastSync >= self.syncInterval)
+
+    def run(self):
+        self._lastSync = time.time()
+        done = False
+        while not done:
+            timeout = None
+            if self.syncInterval is not None and self.written > self.synced:
+                timeout = max(self._lastSync + self.syncInterval -
+                              time.time(), 0)
+            try:
+                items = [self._queue.get(timeout=timeout)]
+            except Queue.Empty:
+                items = []
+            # take whatever else is queued, it goes out in the same write
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except Queue.Empty:
+                    break
+            rows = [item for item in items if isinstance(item, tuple)]
+            syncNow = 'sync' in items or None in items
+            done = None in items
+            if self.error is not None:
+                self.unwritten.extend(rows)
+                continue
+            try:
+                if rows:
+                    lines = [_line(row) for row in rows]
+                    try:
+                        self._writeLines(lines)
+                    except Exception:
+                        # even if a part of them reached the file
+                        self.unwritten.extend(rows)
+                        raise
+                    self.written += len(rows)
+                    if self.echo:
+                        print ''.join(lines),
+                if syncNow or self._due():
+                    self._sync()
+            except Exception as e:
+                # raised again from the next write, sync or close
+                self.error = e
+        try:
+            self._file.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+
+
+def _line(row):
+    return '\t'.join([_field(value) for value in row]) + '\n'
+
+
+def _field(value):
+    # a tab or newline inside a value would shift the columns
+    return str(value).replace('\t', ' ').replace('\n', ' ')
+
+
+def _truncatePartialLine(fileName, blockSize=4096):
+    # cuts off whatever follows the last newline, all of the file if it
+    # has none
+    with open(fileName, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        position = end
+        while position > 0:
+            start = max(position - blockSize, 0)
+            f.seek(start)
+            newline = f.read(position - start).rfind('\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def readJournal(fileName):
+    # returns (columns, rows), rows as lists of strings; a last line without
+    # its newline (cut short by a crash) and lines that do not have a value
+    # for every column are skipped
+    with open(fileName) as f:
+        lines = f.read().split('\n')
+    columns = lines[0].split('\t')
+    # the last element is either '' or a line without its newline
+    rows = [line.split('\t') for line in lines[1:-1]]
+    return columns, [row for row in rows if len(row) == len(columns)]
+
+
+def exportTsv(journalName, fileName):
+    columns, rows = readJournal(journalName)
+    with open(fileName, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        f.write(''.join(['\t'.join(row) + '\n' for row in rows]))
+
+
+def _cellValue(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def exportXlsx(journalName, fileName, sheetTitle='trials'):
+    # numbers are stored as numbers, everything else as text
+    if openpyxl is None:
+        raise ImportError("Exporting to .xlsx needs openpyxl.")
+    columns, rows = readJournal(journalName)
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = sheetTitle
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([_cellValue(value) for value in row])
+    workbook.save(fileName)
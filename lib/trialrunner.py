@@ -0,0 +1,374 @@
+#!/usr/bin/python
+#
+# Trial runner for the choice experiments
+# - a session is instructions, practice trials, final instructions and
+#   experimental trials; every trial runs through the states
+#   ready -> fixation -> stimulus -> response -> confidence -> log
+# - while a trial is logged, the next trial's stimuli are prepared (in the
+#   inter-trial interval, before its ready screen), so the stimulus state
+#   only draws and flips
+# - rows go to a TrialJournal, which writes them on a background thread
+# - an experiment is a subclass of Experiment that sets the texts, keys
+#   and output columns and says what the stimuli look like
+#
+
+import abc
+import os
+import random
+
+from psychopy import core, visual, event, gui, misc, data
+
+from frametiming import FrameTimer
+from stimuluslayout import boxLayouts, assignLayouts, subjectSeed, \
+    saveTrialList
+from stimuluspool import StimulusPool
+from trialjournal import TrialJournal, exportXlsx
+
+
+READY = 'ready'
+FIXATION = 'fixation'
+STIMULUS = 'stimulus'
+RESPONSE = 'response'
+CONFIDENCE = 'confidence'
+LOG = 'log'
+
+# general variables that are always written, before the experiment
+# specific ones
+OVERALL_ORDER = ['subject', 'subInitials', 'date', 'experimenter',
+                 'totalTime', 'trialNum']
+
+# frames before the target appears
+CHOICE_LATENCIES = [3, 5, 10, 15, 20, 30, 60]
+
+CONFIDENCE_QUESTION = ('On a scale from 1 to 5, how confident are you in '
+                       'your response (1=not at all confident, '
+                       '5=extremely confident)?')
+
+
+def enterSubInfo(expName, experimenter='asb'):
+    # brings up a GUI in which to enter all the subject info
+    try:
+        expInfo = misc.fromFile(expName + '_lastParams.pickle')
+    except:
+        expInfo = {'ExpTitle': expName, 'Subject': 's99',
+                   'Subject Initials': 'asb', 'Start at trial': 0,
+                   'Experimenter Initials': experimenter}
+    expInfo['dateStr'] = data.getDateStr()
+    dlg = gui.DlgFromDict(expInfo, title=expName + ' Exp',
+                          fixed=['dateStr'])
+    if dlg.OK:
+        misc.toFile(expName + '_lastParams.pickle', expInfo)
+    else:
+        core.quit()
+    return expInfo
+
+
+def generateTrials(reps, latencies=CHOICE_LATENCIES, askConf=(0, 1)):
+    # every latency with and without the confidence question, reps times,
+    # in random order
+    trials = []
+    for rep in xrange(reps):
+        for latency in latencies:
+            for asked in askConf:
+                trials.append({'latency': int(latency),
+                               'avgChoiceTime': 'NA', 'askConf': asked})
+    random.shuffle(trials)
+    return trials
+
+
+class Experiment(object):
+    """Configuration of a choice experiment.
+
+    Subclasses set the class attributes and override prepare and
+    drawTarget; prepare is called for a trial while the previous one is
+    logged, and everything it returns is handed to the draw methods and to
+    trialVariables of that trial. drawTarget is abstract, so a subclass
+    without it cannot be instantiated."""
+
+    __metaclass__ = abc.ABCMeta
+
+    name = 'Choice'
+    experimenter = 'asb'
+    windowSize = [1200, 1200]
+    numCircles = 2
+    circleSize = 70
+    # stimuluslayout function giving the circle positions of all trials
+    layouts = staticmethod(boxLayouts)
+    responseKeys = ['y', 'n', 'd']
+    # answer for "could not choose in time", no confidence question follows
+    noChoiceKey = 'd'
+    confidenceKeys = ['1', '2', '3', '4', '5']
+    confidenceQuestion = CONFIDENCE_QUESTION
+    overallOrder = OVERALL_ORDER
+    expVarOrder = ['latency', 'avgChoiceTime', 'circlePositions',
+                   'response', 'responseTime', 'choiceTime', 'confAnswer',
+                   'presentedFrames', 'presentedDuration', 'droppedFrames']
+    # screens before practice: a text, or a pair of texts shown above and
+    # below each other
+    instructions = []
+    finalInstructions = ''
+    practiceReps = 1
+    reps = 14
+
+    def prepare(self, trial, stimuli, slot):
+        # builds the trial's stimuli from the pool; slot alternates between
+        # 0 and 1 so the next trial never takes over the current one's
+        # objects. Returns a dictionary, by default {'circles': [...]}.
+        circles = [stimuli.circle(('circle', slot, i), size=self.circleSize,
+                                  units='pix', pos=trial['layout'][i],
+                                  fillColor=[1, 1, 1])
+                   for i in xrange(self.numCircles)]
+        return {'circles': circles}
+
+    def drawStimulus(self, win, prepared):
+        # the screen the subject chooses a circle on
+        for circle in prepared['circles']:
+            circle.draw(win)
+
+    @abc.abstractmethod
+    def drawTarget(self, win, prepared):
+        # the screen the subject answers on
+        pass
+
+    def trialVariables(self, prepared):
+        # experiment specific values to write, besides the responses
+        return {'circlePositions': [str(circle.pos)
+                                    for circle in prepared['circles']]}
+
+
+class TrialRunner(object):
+    """Runs an Experiment: opens the window and data journal and steps
+    every trial through its states."""
+
+    def __init__(self, experiment, expInfo=None):
+        self.experiment = experiment
+        if expInfo is None:
+            expInfo = enterSubInfo(experiment.name, experiment.experimenter)
+        self.expInfo = expInfo
+        self.dataFile = self.makeDataFile()
+        self.baseName = os.path.splitext(self.dataFile.fileName)[0]
+
+        self.win = visual.Window(experiment.windowSize, color=[-1, -1, -1],
+                                 fullscr=True, monitor='testMonitor')
+        # measures the refresh rate, before any stimulus is shown
+        self.frameTimer = FrameTimer(self.win)
+        self.stimuli = StimulusPool(self.win)
+        self.ready = visual.TextStim(self.win, text='Ready?', height=.3,
+                                     color=[1, 1, 1])
+        self.fixation = visual.TextStim(self.win, text='+', height=.07,
+                                        color=[1, 1, 1])
+        self.quitQuestion = visual.TextStim(
+            self.win, text='Quit experiment now (y/n)?', height=.1,
+            color=[1, 1, 1])
+        self.confQuestion = visual.TextStim(
+            self.win, color='#fdfdfd', wrapWidth=1.2, height=.06,
+            text=experiment.confidenceQuestion)
+        self.mouse = event.Mouse(visible=False, win=self.win)
+
+        self.expClock = core.Clock()
+        self.responseClock = core.Clock()
+
+        self._states = {READY: self.readyState,
+                        FIXATION: self.fixationState,
+                        STIMULUS: self.stimulusState,
+                        RESPONSE: self.responseState,
+                        CONFIDENCE: self.confidenceState,
+                        LOG: self.logState}
+        self.state = None
+
+    def makeDataFile(self):
+        # an append-only journal that never overwrites existing data
+        experiment = self.experiment
+        fileName = self.expInfo['Subject'] + '_' + self.expInfo['ExpTitle']
+        ext = ''
+        i = 1
+        while os.path.exists(fileName + ext + '.tsv'):
+            ext = '-' + str(i)
+            i += 1
+        # rows are written and fsynced after every trial by a background
+        # thread
+        return TrialJournal(fileName + ext + '.tsv',
+                            experiment.overallOrder + experiment.expVarOrder,
+                            syncEvery=1, echo=True)
+
+    ########################################################################
+    # session
+    ########################################################################
+
+    def run(self):
+        experiment = self.experiment
+        for screen in experiment.instructions:
+            if isinstance(screen, tuple):
+                self.showInstructions(*screen)
+            else:
+                self.showText(screen)
+
+        practiceTrials = self.addLayouts(
+            generateTrials(experiment.practiceReps), 'practice')
+        self.runTrials(practiceTrials, log=False)
+
+        self.showText(experiment.finalInstructions)
+
+        trials = self.addLayouts(generateTrials(experiment.reps),
+                                 'experimental')
+        saveTrialList(self.baseName + '_trials.json', trials,
+                      subject=self.expInfo['Subject'],
+                      practiceTrials=practiceTrials)
+        self.runTrials(trials)
+        self.close()
+
+    def addLayouts(self, trials, phase):
+        # non-overlapping circle positions for every trial, seeded by
+        # subject so they are reproducible
+        experiment = self.experiment
+        layouts = experiment.layouts(
+            len(trials), experiment.numCircles, size=experiment.circleSize,
+            seed=subjectSeed(self.expInfo['Subject'], phase))
+        return assignLayouts(trials, layouts)
+
+    def showInstructions(self, text1, text2, pos=(0, .3), waitKeys=True):
+        # two texts, the second mirrored below the first
+        for key, text, textPos in (('instructs1', text1, pos),
+                                   ('instructs2', text2,
+                                    [coord * -.8 for coord in pos])):
+            self.stimuli.text(key, color='#fdfdfd', pos=textPos,
+                              wrapWidth=1.2, height=.06, text=text).draw()
+        self.win.flip()
+        if waitKeys:
+            event.waitKeys()
+
+    def showText(self, text):
+        self.stimuli.text('instruct', color='#fdfdfd', pos=[0, 0],
+                          wrapWidth=1.2, height=.06, text=text).draw()
+        self.win.flip()
+        event.waitKeys()
+
+    def runTrials(self, trials, log=True):
+        self.trials = trials
+        self.logging = log
+        self.nextPrepared = self.prepare(0)
+        for trialNum, trial in enumerate(trials):
+            self.trialNum = trialNum
+            self.trial = trial
+            self.prepared = self.nextPrepared
+            self.nextPrepared = None
+            self.state = READY
+            while self.state is not None:
+                self.state = self._states[self.state]()
+
+    def prepare(self, trialNum):
+        # prepares a trial's stimuli in one of the two pool slots, timed as
+        # the trial's setup
+        self.frameTimer.startSetup()
+        prepared = self.experiment.prepare(self.trials[trialNum],
+                                           self.stimuli, trialNum % 2)
+        self.frameTimer.endSetup()
+        return prepared
+
+    def close(self):
+        self.dataFile.close()
+        self.frameTimer.saveLog(self.baseName + '_frames.txt')
+        # a real spreadsheet next to the journal, if openpyxl is installed
+        try:
+            exportXlsx(self.dataFile.fileName, self.baseName + '.xlsx')
+        except ImportError:
+            pass
+
+    def quit(self):
+        self.close()
+        self.win.close()
+        core.quit()
+
+    ########################################################################
+    # trial states
+    ########################################################################
+
+    def readyState(self):
+        # "Ready?" and the trial number until space is pressed; q asks
+        # whether to quit
+        self.ready.draw()
+        self.stimuli.text('trialDisplay', text=self.trialNum + 1, height=.08,
+                          pos=(0, -.8), color=[1, 1, 1]).draw()
+        self.win.flip()
+        if ['q'] == event.waitKeys(keyList=['space', 'q']):
+            self.quitQuestion.draw()
+            self.win.flip()
+            if ['y'] == event.waitKeys(keyList=['y', 'n']):
+                self.quit()
+            self.ready.draw()
+            self.win.flip()
+            event.waitKeys(keyList=['space'])
+        return FIXATION
+
+    def fixationState(self):
+        self.fixation.draw()
+        self.win.flip()
+        core.wait(.5)
+        return STIMULUS
+
+    def stimulusState(self):
+        # the stimulus for the trial's latency in frames, then the target;
+        # every flip is timed to catch dropped frames
+        experiment = self.experiment
+        prepared = self.prepared
+        latency = self.trial['latency']
+        frameTimer = self.frameTimer
+        # setupTime is how long the trial's prepare took
+        frameTimer.startTrial(latency, label=self.trialNum + 1)
+        for n in xrange(latency):
+            experiment.drawStimulus(self.win, prepared)
+            frameTimer.flip()
+        experiment.drawStimulus(self.win, prepared)
+        experiment.drawTarget(self.win, prepared)
+        # takes the stimulus off the screen, ends the timed latency
+        frameTimer.flip()
+        frameTimer.endTrial()
+        self.responseClock.reset()
+        return RESPONSE
+
+    def responseState(self):
+        # whether the subject chose the target circle, and when
+        self.response = event.waitKeys(keyList=self.experiment.responseKeys)
+        self.responseTime = self.responseClock.getTime()
+        self.confAnswer = 'NA'
+        if (self.trial['askConf'] and
+                self.response != [self.experiment.noChoiceKey]):
+            return CONFIDENCE
+        return LOG
+
+    def confidenceState(self):
+        self.confQuestion.draw(self.win)
+        self.win.flip()
+        self.confAnswer = event.waitKeys(
+            keyList=self.experiment.confidenceKeys)
+        return LOG
+
+    def logState(self):
+        # hands the row to the journal's writer thread, then prepares the
+        # next trial during the inter-trial interval
+        if self.logging:
+            self.addTrialVariables()
+            self.dataFile.write(self.trial)
+        nextNum = self.trialNum + 1
+        if nextNum < len(self.trials):
+            self.nextPrepared = self.prepare(nextNum)
+        return None
+
+    def addTrialVariables(self):
+        # adds extra trial details to the row written to the data file
+        trial = self.trial
+        frames = self.frameTimer.lastTrial
+        trial['subject'] = self.expInfo['Subject']
+        trial['subInitials'] = self.expInfo['Subject Initials']
+        trial['experimenter'] = self.expInfo['Experimenter Initials']
+        trial['date'] = self.expInfo['dateStr']
+        trial['totalTime'] = self.expClock.getTime()
+        trial['trialNum'] = self.trialNum + 1
+        trial['response'] = self.response
+        trial['responseTime'] = self.responseTime
+        trial['choiceTime'] = 'NA'
+        trial['confAnswer'] = self.confAnswer
+        trial['presentedFrames'] = frames.presentedFrames
+        trial['presentedDuration'] = frames.presentedDuration
+        trial['droppedFrames'] = frames.droppedFrames
+        trial.update(self.experiment.trialVariables(self.prepared))